@@ -1,4 +1,17 @@
 from .core import from_path, from_str, SQLOperationType
-from .exceptions import SQLLoadException, SQLParseException
+from .exceptions import (
+    SQLLoadException,
+    SQLParameterException,
+    SQLParseException,
+    SQLRowLimitException,
+)
 
-__all__ = ["from_path", "from_str", "SQLOperationType", "SQLLoadException", "SQLParseException"]
+__all__ = [
+    "from_path",
+    "from_str",
+    "SQLOperationType",
+    "SQLLoadException",
+    "SQLParameterException",
+    "SQLParseException",
+    "SQLRowLimitException",
+]
@@ -0,0 +1,133 @@
+from __future__ import absolute_import
+
+import itertools
+from contextlib import contextmanager
+
+from .sqlite3 import progress_deadline, plan_steps
+
+try:
+    import apsw
+except ImportError:
+    apsw = None
+
+
+class APSWCursor(object):
+    """A DB-API style view of an ``apsw.Cursor``, yielded by ``select_cursor``.
+
+    ``apsw`` only describes the columns of a statement while it is running, so the description is
+    read right after executing. It is ``None`` for a query without rows.
+    """
+
+    __slots__ = ("cursor", "description")
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        try:
+            self.description = cursor.description
+        except apsw.ExecutionCompleteError:
+            self.description = None
+
+    def __iter__(self):
+        return self.cursor
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchmany(self, size=1):
+        return list(itertools.islice(self.cursor, size))
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+
+class APSWDriverAdapter(object):
+    """Adapter for ``apsw`` SQLite connections.
+
+    ``apsw`` leaves transactions to the caller: outside of ``with conn:`` blocks or explicit
+    ``begin`` statements every statement commits on its own. ``*!`` queries run in one
+    transaction, or savepoint when already in one.
+
+    It isn't faster than ``sqlite3`` across the board: in ``benchmarks/sqlite_adapters.py`` writes
+    (``<!``, ``*!`` and ``!`` queries) are usually somewhat faster, while selects, and
+    ``<name>_cursor`` calls in particular, are often slower.
+    """
+
+    paramstyle = "named"
+
+    @staticmethod
+    def process_sql(_query_name, _op_type, sql):
+        """Pass through function because ``apsw`` handles the :var_name "named style" syntax used
+        by anosql variables, like ``sqlite3``.
+        """
+        return sql
+
+    @staticmethod
+    def select(conn, _query_name, sql, parameters):
+        return conn.execute(sql, parameters).fetchall()
+
+    @staticmethod
+    @contextmanager
+    def select_cursor(conn, _query_name, sql, parameters):
+        cur = APSWCursor(conn.execute(sql, parameters))
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+    @staticmethod
+    def insert_update_delete(conn, _query_name, sql, parameters):
+        conn.execute(sql, parameters).close()
+
+    @staticmethod
+    def insert_update_delete_many(conn, _query_name, sql, parameters):
+        with conn:
+            conn.executemany(sql, parameters).close()
+
+    @staticmethod
+    def insert_returning(conn, _query_name, sql, parameters):
+        conn.execute(sql, parameters).close()
+        return conn.last_insert_rowid()
+
+    @staticmethod
+    def execute_script(conn, sql):
+        # Statements run as the cursor is iterated, past any which return rows.
+        for _ in conn.execute(sql):
+            pass
+
+    @staticmethod
+    @contextmanager
+    def statement_timeout(conn, seconds):
+        """Interrupts statements running longer than ``seconds`` within the block, which then
+        raise ``apsw.InterruptError``. Replaces any progress handler of the connection.
+        """
+        with progress_deadline(conn.setprogresshandler, seconds):
+            yield
+
+    @staticmethod
+    def is_transient_error(_conn, error):
+        """Whether the error is a busy or locked database, which another connection holds."""
+        return isinstance(error, (apsw.BusyError, apsw.LockedError))
+
+    @staticmethod
+    def explain(conn, _query_name, sql, parameters):
+        """Returns the steps of the ``EXPLAIN QUERY PLAN`` of the sql, without running it.
+
+        Returns:
+            list(tuple): ``(depth, detail, table, full_scan)`` for each step, see
+                         :func:`anosql.adapters.sqlite3.plan_steps`.
+        """
+        rows = conn.execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        return plan_steps(sql, rows)
+
+    @staticmethod
+    def count_rows(conn, table):
+        """Returns the number of rows of a table, or ``None`` if there is no such table."""
+        try:
+            return conn.execute(
+                'select count(*) from "{}"'.format(table.replace('"', '""'))
+            ).fetchone()[0]
+        except apsw.SQLError:
+            return None
@@ -0,0 +1,100 @@
+from __future__ import absolute_import
+
+import re
+from contextlib import contextmanager
+
+from .psycopg2 import PsycoPG2Adapter
+
+_insert_values_pattern = re.compile(
+    r"^\s*insert\s+into\s+(?P<table>[\w.\"]+)\s*\((?P<columns>[^()]*)\)\s*"
+    r"values\s*\((?P<values>(?:[^()]|\(\w+\))*)\)\s*;?\s*$",
+    re.IGNORECASE,
+)
+"""
+Pattern: Identifies single row ``insert ... values`` statements, which can be run as ``COPY``.
+"""
+
+_placeholder_pattern = re.compile(r"^%(?:\((?P<name>\w+)\))?[sbt]$")
+"""
+Pattern: Identifies a single ``%s`` or ``%(name)s`` placeholder.
+"""
+
+
+def copy_statement(sql):
+    """Returns the ``COPY ... FROM STDIN`` equivalent of a single row ``insert ... values``
+    statement with only placeholders as values, or ``None`` for other statements.
+
+    Returns:
+        tuple: The ``COPY`` statement, and the name (or index, for positional placeholders) of the
+               parameter of each copied column.
+    """
+    match = _insert_values_pattern.match(sql)
+    if match is None:
+        return None
+    columns = [column.strip() for column in match.group("columns").split(",")]
+    values = [value.strip() for value in match.group("values").split(",")]
+    if len(columns) != len(values):
+        return None
+
+    keys = []
+    position = 0
+    for value in values:
+        placeholder = _placeholder_pattern.match(value)
+        if placeholder is None:
+            return None
+        if placeholder.group("name") is not None:
+            keys.append(placeholder.group("name"))
+        else:
+            keys.append(position)
+            position += 1
+    if position and position != len(keys):
+        # Named and positional placeholders can't be mixed.
+        return None
+
+    copy_sql = "COPY {} ({}) FROM STDIN".format(match.group("table"), ", ".join(columns))
+    return copy_sql, tuple(keys)
+
+
+class PsycopgAdapter(PsycoPG2Adapter):
+    """Adapter for psycopg 3 connections.
+
+    The SQL is the same as for ``psycopg2``, but parameters are bound by the server instead of
+    interpolated into the statement, and results are read in the binary format. ``*!`` queries
+    which insert a single row of placeholders are run with ``COPY``, and others with the
+    pipelined ``executemany`` of psycopg 3.
+    """
+
+    paramstyle = "pyformat"
+
+    def __init__(self):
+        # COPY statement of each *! query, or None when it can't be copied, by processed SQL.
+        self._copy_statements = {}
+
+    @staticmethod
+    def select(conn, _query_name, sql, parameters):
+        with conn.cursor(binary=True) as cur:
+            cur.execute(sql, parameters)
+            return cur.fetchall()
+
+    @staticmethod
+    @contextmanager
+    def select_cursor(conn, _query_name, sql, parameters):
+        with conn.cursor(binary=True) as cur:
+            cur.execute(sql, parameters)
+            yield cur
+
+    def insert_update_delete_many(self, conn, _query_name, sql, parameters):
+        try:
+            statement = self._copy_statements[sql]
+        except KeyError:
+            statement = self._copy_statements[sql] = copy_statement(sql)
+
+        with conn.cursor() as cur:
+            if statement is None:
+                cur.executemany(sql, parameters)
+                return
+
+            copy_sql, keys = statement
+            with cur.copy(copy_sql) as copy:
+                for row in parameters:
+                    copy.write_row([row[key] for key in keys])
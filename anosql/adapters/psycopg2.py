@@ -1,8 +1,17 @@
+import json
+import math
 from contextlib import contextmanager
 
 from ..patterns import var_pattern
 
 
+# SQLSTATEs of serialization failures and deadlocks, after which the transaction can be run again.
+_TRANSIENT_SQLSTATES = frozenset(["40001", "40P01"])
+
+# Transaction status of a connection in a failed transaction, in psycopg2 and psycopg 3.
+_TRANSACTION_STATUS_INERROR = 3
+
+
 def replacer(match):
     gd = match.groupdict()
     if gd['dblquote'] is not None:
@@ -18,6 +27,8 @@ def replacer(match):
 
 
 class PsycoPG2Adapter(object):
+    paramstyle = "pyformat"
+
     @staticmethod
     def process_sql(_query_name, _op_type, sql):
         return var_pattern.sub(replacer, sql)
@@ -59,3 +70,99 @@ class PsycoPG2Adapter(object):
     def execute_script(conn, sql):
         with conn.cursor() as cur:
             cur.execute(sql)
+
+    @staticmethod
+    @contextmanager
+    def statement_timeout(conn, seconds):
+        """Cancels statements running longer than ``seconds`` within the block, with
+        ``statement_timeout``.
+
+        In a transaction the setting is ``SET LOCAL``, and restored after the block unless it
+        raises, since the transaction must be rolled back then, which restores it. In autocommit
+        mode it is set for the session and always restored.
+        """
+        local = not conn.autocommit
+        with conn.cursor() as cur:
+            cur.execute(
+                "select current_setting('statement_timeout') as previous, "
+                "set_config('statement_timeout', %s, %s)",
+                ("{}ms".format(int(math.ceil(seconds * 1000))), local),
+            )
+            row = cur.fetchone()
+        previous = row["previous"] if isinstance(row, dict) else row[0]
+
+        restore = not local
+        try:
+            yield
+            restore = True
+        finally:
+            if restore:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "select set_config('statement_timeout', %s, %s)", (previous, local)
+                    )
+
+    @staticmethod
+    def is_transient_error(conn, error):
+        """Whether the error is a serialization failure or deadlock, and the connection isn't in
+        the transaction it aborted, which must be rolled back and run again as a whole.
+        """
+        # psycopg2 errors have a pgcode, psycopg 3 errors a sqlstate.
+        code = getattr(error, "pgcode", None) or getattr(error, "sqlstate", None)
+        if code not in _TRANSIENT_SQLSTATES:
+            return False
+        info = getattr(conn, "info", None)
+        return getattr(info, "transaction_status", None) != _TRANSACTION_STATUS_INERROR
+
+    @staticmethod
+    def explain(conn, _query_name, sql, parameters):
+        """Returns the steps of the ``EXPLAIN (FORMAT JSON)`` plan of the sql, without running it.
+
+        Returns:
+            list(tuple): ``(depth, detail, table, full_scan)`` for each plan node, where
+                         ``full_scan`` is whether the node is a sequential scan.
+        """
+        # A failing statement aborts the transaction, so explain in a savepoint when in one.
+        savepoint = not conn.autocommit
+        with conn.cursor() as cur:
+            if savepoint:
+                cur.execute("SAVEPOINT anosql_explain")
+            try:
+                cur.execute("EXPLAIN (FORMAT JSON) " + sql, parameters)
+                row = cur.fetchone()
+            except Exception:
+                if savepoint:
+                    cur.execute("ROLLBACK TO SAVEPOINT anosql_explain")
+                raise
+            if savepoint:
+                cur.execute("RELEASE SAVEPOINT anosql_explain")
+        plan = row["QUERY PLAN"] if isinstance(row, dict) else row[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        steps = []
+        nodes = [(0, plan[0]["Plan"])]
+        while nodes:
+            depth, node = nodes.pop()
+            detail = node["Node Type"]
+            if "Index Name" in node:
+                detail += " using " + node["Index Name"]
+            table = node.get("Relation Name")
+            if table is not None:
+                detail += " on " + table
+            steps.append((depth, detail, table, node["Node Type"] == "Seq Scan"))
+            nodes.extend((depth + 1, child) for child in reversed(node.get("Plans", ())))
+        return steps
+
+    @staticmethod
+    def count_rows(conn, table):
+        """Returns the planner's estimate of the rows of a table, or ``None`` if unknown."""
+        with conn.cursor() as cur:
+            cur.execute(
+                "select reltuples from pg_class where oid = to_regclass(%s)", (table,)
+            )
+            row = cur.fetchone()
+        if row is None:
+            return None
+        rows = row["reltuples"] if isinstance(row, dict) else row[0]
+        return int(rows) if rows is not None and rows >= 0 else None
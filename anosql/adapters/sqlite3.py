@@ -1,7 +1,99 @@
+from __future__ import absolute_import
+
+import re
+import sqlite3
 from contextlib import contextmanager
 
+from ..timing import perf_counter
+
+# Table names and their aliases, as ``EXPLAIN QUERY PLAN`` reports steps on aliases.
+_table_alias_pattern = re.compile(
+    r"\b(?:from|join)\s+(?P<table>[\w.]+)(?:\s+(?:as\s+)?(?P<alias>\w+))?", re.IGNORECASE
+)
+
+
+def plan_steps(sql, rows):
+    """Converts ``EXPLAIN QUERY PLAN`` rows of the sql to ``(depth, detail, table, full_scan)``
+    steps, with table aliases resolved to table names.
+    """
+    aliases = dict(
+        (match.group("alias") or match.group("table"), match.group("table"))
+        for match in _table_alias_pattern.finditer(sql)
+    )
+    depths = {}
+    steps = []
+    for node_id, parent_id, _, detail in rows:
+        depth = depths[node_id] = depths.get(parent_id, -1) + 1
+        words = detail.split()
+        table = None
+        if words[0] in ("SCAN", "SEARCH") and len(words) > 1:
+            table = words[2] if words[1] == "TABLE" and len(words) > 2 else words[1]
+            table = aliases.get(table, table)
+        full_scan = words[0] == "SCAN" and table is not None and "USING" not in words
+        steps.append((depth, detail, table, full_scan))
+    return steps
+
+
+# Primary result codes of errors from another connection holding a lock.
+_SQLITE_BUSY = 5
+_SQLITE_LOCKED = 6
+
+PROGRESS_STEPS = 1000
+"""SQLite virtual machine instructions between checks of a statement timeout."""
+
+
+@contextmanager
+def progress_deadline(set_progress_handler, seconds):
+    """Installs a progress handler aborting statements after ``seconds`` for the block."""
+    deadline = perf_counter() + seconds
+    set_progress_handler(lambda: perf_counter() > deadline, PROGRESS_STEPS)
+    try:
+        yield
+    finally:
+        set_progress_handler(None, 0)
+
+
+# Attribute of the cursor reused for a connection.
+_CURSOR_ATTRIBUTE = "_anosql_cursor"
+
 
 class SQLite3DriverAdapter(object):
+    """Adapter for the standard library ``sqlite3`` driver.
+
+    Args:
+        reuse_cursors (bool): Whether ``select`` and ``insert_returning`` reuse one cursor per
+                              connection rather than creating one per call. The cursor is kept
+                              on the connection, so only connections which take attributes,
+                              instances of ``sqlite3.Connection`` subclasses, reuse one. Plain
+                              ``sqlite3.connect()`` connections don't, and the option does
+                              nothing for them. ``benchmarks/sqlite_cursor_reuse.py`` measures
+                              no gain beyond run-to-run noise even where it applies.
+    """
+
+    paramstyle = "named"
+
+    def __init__(self, reuse_cursors=False):
+        self.reuse_cursors = reuse_cursors
+
+    def _cursor(self, conn):
+        """Returns the cursor to run a fully consumed statement on, ``conn`` itself if cursors
+        aren't reused as ``conn.execute`` creates one.
+        """
+        if not self.reuse_cursors:
+            return conn
+        cur = getattr(conn, _CURSOR_ATTRIBUTE, None)
+        if cur is None:
+            cur = conn.cursor()
+            try:
+                # Not in a dict weakly keyed by connection, which the cursor's own reference to
+                # its connection would keep alive; the cycle is collected with the connection.
+                setattr(conn, _CURSOR_ATTRIBUTE, cur)
+            except AttributeError:
+                return conn
+        if cur.row_factory is not conn.row_factory:
+            cur.row_factory = conn.row_factory
+        return cur
+
     @staticmethod
     def process_sql(_query_name, _op_type, sql):
         """Pass through function because the ``sqlite3`` driver already handles the :var_name
@@ -18,13 +110,8 @@ class SQLite3DriverAdapter(object):
         """
         return sql
 
-    @staticmethod
-    def select(conn, _query_name, sql, parameters):
-        cur = conn.cursor()
-        cur.execute(sql, parameters)
-        results = cur.fetchall()
-        cur.close()
-        return results
+    def select(self, conn, _query_name, sql, parameters):
+        return self._cursor(conn).execute(sql, parameters).fetchall()
 
     @staticmethod
     @contextmanager
@@ -44,14 +131,60 @@ class SQLite3DriverAdapter(object):
     def insert_update_delete_many(conn, _query_name, sql, parameters):
         conn.executemany(sql, parameters)
 
-    @staticmethod
-    def insert_returning(conn, _query_name, sql, parameters):
-        cur = conn.cursor()
-        cur.execute(sql, parameters)
-        results = cur.lastrowid
-        cur.close()
-        return results
+    def insert_returning(self, conn, _query_name, sql, parameters):
+        return self._cursor(conn).execute(sql, parameters).lastrowid
 
     @staticmethod
     def execute_script(conn, sql):
         conn.executescript(sql)
+
+    @staticmethod
+    @contextmanager
+    def statement_timeout(conn, seconds):
+        """Interrupts statements running longer than ``seconds`` within the block, which then
+        raise ``sqlite3.OperationalError``. Replaces any progress handler of the connection.
+        """
+        with progress_deadline(conn.set_progress_handler, seconds):
+            yield
+
+    @staticmethod
+    def is_transient_error(_conn, error):
+        """Whether the error is a busy or locked database, which another connection holds."""
+        if not isinstance(error, sqlite3.OperationalError):
+            return False
+        code = getattr(error, "sqlite_errorcode", None)
+        if code is not None:
+            return code & 0xFF in (_SQLITE_BUSY, _SQLITE_LOCKED)
+        # Python < 3.11
+        return str(error).startswith(("database is locked", "database table is locked"))
+
+    @staticmethod
+    def explain(conn, _query_name, sql, parameters):
+        """Returns the steps of the ``EXPLAIN QUERY PLAN`` of the sql, without running it.
+
+        Returns:
+            list(tuple): ``(depth, detail, table, full_scan)`` for each step, where ``full_scan``
+                         is whether the step reads the whole table without an index.
+        """
+        cur = conn.cursor()
+        cur.row_factory = None
+        try:
+            cur.execute("EXPLAIN QUERY PLAN " + sql, parameters)
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+
+        return plan_steps(sql, rows)
+
+    @staticmethod
+    def count_rows(conn, table):
+        """Returns the number of rows of a table, or ``None`` if there is no such table."""
+        cur = conn.cursor()
+        cur.row_factory = None
+        try:
+            cur.execute('select count(*) from "{}"'.format(table.replace('"', '""')))
+            return cur.fetchone()[0]
+        except conn.OperationalError:
+            return None
+        finally:
+            cur.close()
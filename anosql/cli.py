@@ -0,0 +1,401 @@
+import argparse
+import io
+import json
+import os
+import sys
+
+from .core import Query, SQLOperationType, from_path
+from .importer import FORMATS, import_file
+from .parallel import call_with_parameters
+from .plans import check_plans, save_baseline
+from .timing import PERCENTILES, latency_summary, perf_counter
+from .workload import replay
+
+_OP_TYPE_NAMES = {
+    SQLOperationType.INSERT_RETURNING: "insert returning",
+    SQLOperationType.INSERT_UPDATE_DELETE: "insert/update/delete",
+    SQLOperationType.INSERT_UPDATE_DELETE_MANY: "insert/update/delete many",
+    SQLOperationType.SCRIPT: "script",
+    SQLOperationType.SELECT: "select",
+    SQLOperationType.SELECT_ONE_ROW: "select one row",
+}
+
+
+def _add_connection_arguments(parser):
+    parser.add_argument("sql_path", help="A .sql file or a directory of .sql files.")
+    database = parser.add_mutually_exclusive_group(required=True)
+    database.add_argument("--sqlite", metavar="DB_FILE", help="Path of a SQLite database.")
+    database.add_argument("--dsn", help="PostgreSQL connection string, used with psycopg2.")
+
+
+def _connection_factory(args):
+    """Returns the driver name and a connection factory for the database arguments."""
+    if args.sqlite is not None:
+        import sqlite3
+
+        return "sqlite3", lambda: sqlite3.connect(args.sqlite)
+
+    import psycopg2
+
+    return "psycopg2", lambda: psycopg2.connect(args.dsn)
+
+
+def _connect(args):
+    """Returns the driver name and a connection for the database arguments."""
+    driver_name, connect = _connection_factory(args)
+    return driver_name, connect()
+
+
+def _get_query(queries, query_name):
+    obj = queries.find_query(query_name)
+    if not isinstance(obj, Query):
+        raise LookupError("Unknown query: {}".format(query_name))
+    return obj
+
+
+def _parse_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _parse_parameters(entries):
+    """Parses query parameters, ``name=value`` for named or ``value`` for positional.
+
+    Values are read as JSON when possible, and as strings otherwise.
+    """
+    named = ["=" in entry for entry in entries]
+    if all(named) and entries:
+        return dict(
+            (name, _parse_value(value))
+            for name, value in (entry.split("=", 1) for entry in entries)
+        )
+    if not any(named):
+        return [_parse_value(entry) for entry in entries]
+    raise ValueError("Parameters must all be name=value, or all be values")
+
+
+def _count_rows(op_type, result):
+    if op_type == SQLOperationType.SELECT:
+        return len(result)
+    if op_type == SQLOperationType.SELECT_ONE_ROW:
+        return 0 if result is None else 1
+    return 0
+
+
+def _format_row(row):
+    if isinstance(row, (tuple, list)):
+        return "\t".join("" if value is None else str(value) for value in row)
+    return repr(row)
+
+
+def _parse_mapping(entries):
+    """Parses ``--map`` entries, ``param=column`` for named or ``column`` for positional."""
+    if not entries:
+        return None
+
+    def column(value):
+        return int(value) if value.isdigit() else value
+
+    named = ["=" in entry for entry in entries]
+    if all(named):
+        return dict(
+            (name, column(value)) for name, value in (entry.split("=", 1) for entry in entries)
+        )
+    if not any(named):
+        return [column(entry) for entry in entries]
+    raise ValueError("--map entries must all be param=column, or all be column")
+
+
+def _load(args):
+    mapping = _parse_mapping(args.map)
+    driver_name, conn = _connect(args)
+    try:
+        query = _get_query(from_path(args.sql_path, driver_name), args.query)
+
+        def progress(stats):
+            if not args.quiet:
+                sys.stderr.write(
+                    "\r{} rows in {} batches, {:.0f} rows/s".format(
+                        stats.rows, stats.batches, stats.rows_per_second
+                    )
+                )
+                sys.stderr.flush()
+
+        stats = import_file(
+            query,
+            conn,
+            args.data_file,
+            data_format=args.format,
+            header=args.header,
+            mapping=mapping,
+            batch_size=args.batch_size,
+            progress=progress,
+        )
+    finally:
+        conn.close()
+
+    if not args.quiet:
+        sys.stderr.write("\n")
+    print(
+        "Loaded {} rows in {} batches in {:.2f}s ({:.0f} rows/s)".format(
+            stats.rows, stats.batches, stats.seconds, stats.rows_per_second
+        )
+    )
+    return 0
+
+
+def _list(args):
+    queries = from_path(args.sql_path, args.driver)
+    for query_name in queries.available_queries:
+        obj = queries.find_query(query_name)
+        if not isinstance(obj, Query):
+            continue
+        summary = obj.docs.splitlines()[0] if obj.docs else ""
+        print("{}  ({}){}".format(
+            query_name, _OP_TYPE_NAMES[obj.op_type], "  " + summary if summary else ""
+        ))
+    return 0
+
+
+def _run(args):
+    parameters = _parse_parameters(args.parameters)
+    driver_name, conn = _connect(args)
+    try:
+        query = _get_query(from_path(args.sql_path, driver_name), args.query)
+        result = call_with_parameters(query, conn, parameters)
+        if query.op_type == SQLOperationType.SELECT:
+            for row in result:
+                print(_format_row(row))
+        elif query.op_type == SQLOperationType.SELECT_ONE_ROW:
+            if result is not None:
+                print(_format_row(result))
+        else:
+            conn.commit()
+            if result is not None:
+                print(_format_row(result))
+    finally:
+        conn.close()
+    return 0
+
+
+def _bench(args):
+    if args.number < 1:
+        raise ValueError("--number must be at least 1")
+    parameters = _parse_parameters(args.parameters)
+    driver_name, conn = _connect(args)
+    try:
+        query = _get_query(from_path(args.sql_path, driver_name), args.query)
+        for _ in range(args.warmup):
+            call_with_parameters(query, conn, parameters)
+
+        samples = []
+        rows = 0
+        for _ in range(args.number):
+            started = perf_counter()
+            result = call_with_parameters(query, conn, parameters)
+            samples.append(perf_counter() - started)
+            rows += _count_rows(query.op_type, result)
+
+        # Benchmarked changes are not kept.
+        conn.rollback()
+    finally:
+        conn.close()
+
+    summary = latency_summary(samples)
+    print("{}: {} runs after {} warmup runs".format(args.query, args.number, args.warmup))
+    print("  mean  {:10.3f} ms".format(summary["mean"] * 1000))
+    print("  min   {:10.3f} ms".format(summary["min"] * 1000))
+    for pct in PERCENTILES:
+        print("  p{:<4d} {:10.3f} ms".format(pct, summary["p{}".format(pct)] * 1000))
+    print("  max   {:10.3f} ms".format(summary["max"] * 1000))
+    print("  {:.1f} calls/s, {:.1f} rows/s".format(
+        summary["count"] / summary["total"] if summary["total"] else 0.0,
+        rows / summary["total"] if summary["total"] else 0.0,
+    ))
+    return 0
+
+
+def _plans(args):
+    if args.update_baseline and args.baseline is None:
+        raise ValueError("--update-baseline needs a --baseline file")
+    baseline = None if args.update_baseline else args.baseline
+    if baseline is not None and not os.path.exists(baseline):
+        raise ValueError(
+            "Baseline file does not exist: {}, create it with --update-baseline".format(baseline)
+        )
+    samples = None
+    if args.samples is not None:
+        with io.open(args.samples, encoding="utf-8") as fp:
+            samples = json.load(fp)
+
+    driver_name, conn = _connect(args)
+    try:
+        report = check_plans(
+            from_path(args.sql_path, driver_name),
+            conn,
+            samples=samples,
+            baseline=baseline,
+            min_table_rows=args.min_rows,
+        )
+    finally:
+        conn.close()
+
+    if args.update_baseline:
+        save_baseline(report.plans, args.baseline)
+        print("Wrote the plans of {} queries to {}".format(len(report.plans), args.baseline))
+    problems = report.problems
+    for problem in problems:
+        print(problem)
+    print("Checked {} queries, {} problems".format(len(report.plans), len(problems)))
+    return 1 if problems else 0
+
+
+def _replay(args):
+    if args.concurrency < 1:
+        raise ValueError("--concurrency must be at least 1")
+    if args.speed < 0:
+        raise ValueError("--speed must not be negative")
+    driver_name, connect = _connection_factory(args)
+    report = replay(
+        args.workload_file,
+        from_path(args.sql_path, driver_name),
+        connect,
+        concurrency=args.concurrency,
+        speed=args.speed,
+    )
+
+    print("{} calls in {:.2f}s on {} connections, {:.1f} calls/s, {} errors".format(
+        report.calls, report.elapsed, args.concurrency, report.throughput, report.errors
+    ))
+    print("{:<32} {:>8} {:>7} {:>10} {:>10} {:>10} {:>10}".format(
+        "query", "calls", "errors", "mean ms", "p50 ms", "p90 ms", "p99 ms"
+    ))
+    for name in sorted(report.queries):
+        summary = report.queries[name]
+        print("{:<32} {:>8} {:>7} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}".format(
+            name,
+            summary["count"],
+            summary["errors"],
+            summary["mean"] * 1000,
+            summary["p50"] * 1000,
+            summary["p90"] * 1000,
+            summary["p99"] * 1000,
+        ))
+    print("start lag p99 {:.3f} ms, max {:.3f} ms".format(
+        report.lag["p99"] * 1000, report.lag["max"] * 1000
+    ))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="anosql", description="Run anosql queries.")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.required = True
+
+    list_ = commands.add_parser("list", help="List the available queries.")
+    list_.add_argument("sql_path", help="A .sql file or a directory of .sql files.")
+    list_.add_argument(
+        "--driver", default="sqlite3", help="Driver adapter to load the queries with."
+    )
+    list_.set_defaults(handler=_list)
+
+    parameters_help = (
+        "Query parameters, all name=value or all positional values. "
+        "Values are parsed as JSON when possible, else used as strings."
+    )
+
+    run = commands.add_parser("run", help="Run a query and print its results.")
+    _add_connection_arguments(run)
+    run.add_argument("query", help="Dot-separated name of the query.")
+    run.add_argument("parameters", nargs="*", metavar="PARAM", help=parameters_help)
+    run.set_defaults(handler=_run)
+
+    bench = commands.add_parser(
+        "bench", help="Time repeated runs of a query and print latency percentiles."
+    )
+    _add_connection_arguments(bench)
+    bench.add_argument("query", help="Dot-separated name of the query.")
+    bench.add_argument("parameters", nargs="*", metavar="PARAM", help=parameters_help)
+    bench.add_argument(
+        "-n", "--number", type=int, default=1000, help="Number of timed runs."
+    )
+    bench.add_argument("--warmup", type=int, default=10, help="Number of untimed runs first.")
+    bench.set_defaults(handler=_bench)
+
+    plans = commands.add_parser(
+        "plans",
+        help="Explain every query and report full scans of large tables and plan changes.",
+    )
+    _add_connection_arguments(plans)
+    plans.add_argument(
+        "--baseline", metavar="FILE", help="JSON file of known plans to compare the plans with."
+    )
+    plans.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Write the current plans to the --baseline file instead of comparing.",
+    )
+    plans.add_argument(
+        "--samples",
+        metavar="FILE",
+        help="JSON file of parameters to explain queries with, by dot-separated query name.",
+    )
+    plans.add_argument(
+        "--min-rows",
+        type=int,
+        default=1000,
+        help="Smallest table, in rows, reported when read with a full scan.",
+    )
+    plans.set_defaults(handler=_plans)
+
+    replay_ = commands.add_parser(
+        "replay", help="Run a workload recorded with anosql.workload again and report latencies."
+    )
+    _add_connection_arguments(replay_)
+    replay_.add_argument("workload_file", help="The workload file to replay.")
+    replay_.add_argument(
+        "-c", "--concurrency", type=int, default=1, help="Number of connections running calls."
+    )
+    replay_.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Speed multiplier of the recorded schedule, 0 to run calls as fast as possible.",
+    )
+    replay_.set_defaults(handler=_replay)
+
+    load = commands.add_parser(
+        "load", help="Stream a CSV or JSON-lines file into a *! query, in batches."
+    )
+    _add_connection_arguments(load)
+    load.add_argument("query", help="Dot-separated name of a *! query.")
+    load.add_argument("data_file", help="The CSV or JSON-lines file to load.")
+    load.add_argument(
+        "--format", choices=FORMATS, help="Data file format, by default from its extension."
+    )
+    load.add_argument(
+        "--header", action="store_true", help="The first CSV row names the columns."
+    )
+    load.add_argument(
+        "--map",
+        action="append",
+        metavar="PARAM=COLUMN",
+        help="Map a column (index or name) to a query parameter. Repeat for every parameter, "
+        "or give only columns to pass them as positional parameters in order.",
+    )
+    load.add_argument("--batch-size", type=int, default=1000, help="Rows per batch and commit.")
+    load.add_argument("--quiet", action="store_true", help="Don't report progress.")
+    load.set_defaults(handler=_load)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args)
+    except (LookupError, ValueError) as e:
+        parser.error(str(e))
@@ -1,31 +1,81 @@
+import copy
+import importlib
+import mmap
 import os
-
-from .adapters.psycopg2 import PsycoPG2Adapter
-from .adapters.sqlite3 import SQLite3DriverAdapter
-from .exceptions import SQLLoadException, SQLParseException
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+from .exceptions import (
+    SQLLoadException,
+    SQLParameterException,
+    SQLParseException,
+    SQLRowLimitException,
+)
+from .parallel import map_query
 from .patterns import (
-    query_name_definition_pattern,
+    block_definition_bytes_pattern,
+    conditional_clause_pattern,
+    fragment_include_pattern,
     empty_pattern,
     doc_comment_pattern,
+    directive_pattern,
+    duration_pattern,
     valid_query_name_pattern,
+    var_pattern,
+    list_var_pattern,
+    pyformat_var_pattern,
 )
 
 
+try:
+    _STRING_TYPES = (basestring,)  # noqa: F821
+except NameError:  # Python 3
+    _STRING_TYPES = (str,)
+
+_DIRECTIVES = frozenset(["paginate", "timeout", "max-rows", "idempotent"])
+
+MAX_LIST_SHAPES = 64
+"""Most expanded statements cached per query with list parameters."""
+
+MAX_CONDITIONAL_CLAUSES = 6
+"""Most ``[[ ... ]]`` conditional clauses per query, each doubles the precompiled variants."""
+
+MMAP_MIN_SIZE = 1024 * 1024
+"""SQL files of at least this many bytes are memory-mapped rather than read while loading."""
+
+# Queries of the files loaded as layers by ``from_path``, by absolute path and driver adapter,
+# with the size and modification time of the file when it was parsed.
+_SHARED_FILES = {}
+_shared_files_lock = threading.Lock()
+
+ADAPTER_ENTRY_POINT_GROUP = "anosql.driver_adapters"
+"""Entry point group of driver adapters provided by other packages, see ``get_driver_adapter``."""
+
+# Adapter classes or factories by driver name, or the dotted "module:attribute" path to import
+# them from on first use, so importing anosql doesn't import every adapter and driver.
 _ADAPTERS = {
-    "psycopg2": PsycoPG2Adapter,
-    "sqlite3": SQLite3DriverAdapter,
+    "apsw": "anosql.adapters.apsw:APSWDriverAdapter",
+    "psycopg": "anosql.adapters.psycopg:PsycopgAdapter",
+    "psycopg2": "anosql.adapters.psycopg2:PsycoPG2Adapter",
+    "sqlite3": "anosql.adapters.sqlite3:SQLite3DriverAdapter",
 }
+_ADAPTER_INSTANCES = {}
+_adapters_lock = threading.Lock()
+_entry_points_loaded = False
 
 
 def register_driver_adapter(driver_name, driver_adapter):
     """Registers custom driver adapter classes to extend ``anosql`` to to handle additional drivers.
 
     For details on how to create a new driver adapter see :ref:`driver-adapters` documentation.
+    Packages can also provide adapters with entry points instead, see ``get_driver_adapter``.
 
     Args:
         driver_name (str): The driver type name.
         driver_adapter (callable): Either n class or function which creates an instance of a
-                                   driver adapter.
+                                   driver adapter, or its dotted ``"module:attribute"`` path to
+                                   import it from on first use.
 
     Returns:
         None
@@ -68,24 +118,112 @@ def register_driver_adapter(driver_name, driver_adapter):
             anosql.register_driver_adapter("mydb", adapter_factory)
 
     """
-    _ADAPTERS[driver_name] = driver_adapter
+    with _adapters_lock:
+        _ADAPTERS[driver_name] = driver_adapter
+        _ADAPTER_INSTANCES.pop(driver_name, None)
+
+
+_OBSERVERS = ()
+_observers_lock = threading.Lock()
+
+
+def register_observer(observer):
+    """Registers a ``QueryObserver`` notified of every query call and cursor.
+
+    Args:
+        observer (QueryObserver): The observer.
+
+    Returns:
+        None
+    """
+    global _OBSERVERS
+    # Replaced rather than appended to, so calls in other threads iterate a stable tuple.
+    with _observers_lock:
+        _OBSERVERS = _OBSERVERS + (observer,)
+
+
+def unregister_observer(observer):
+    """Removes an observer added with ``register_observer``.
+
+    Args:
+        observer (QueryObserver): The observer.
+
+    Returns:
+        None
+    """
+    global _OBSERVERS
+    with _observers_lock:
+        _OBSERVERS = tuple(o for o in _OBSERVERS if o is not observer)
+
+
+def _iter_entry_points(group):
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # Python < 3.8
+        try:
+            from pkg_resources import iter_entry_points
+        except ImportError:
+            return []
+        return iter_entry_points(group)
+
+    eps = entry_points()
+    if hasattr(eps, "select"):
+        return eps.select(group=group)
+    return eps.get(group, [])  # Python < 3.10
+
+
+def _load_entry_points():
+    global _entry_points_loaded
+    for entry_point in _iter_entry_points(ADAPTER_ENTRY_POINT_GROUP):
+        # Adapters registered with register_driver_adapter take precedence.
+        _ADAPTERS.setdefault(entry_point.name, entry_point)
+    _entry_points_loaded = True
+
+
+def _import_adapter(path):
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
 
 
 def get_driver_adapter(driver_name):
     """Get the driver adapter instance registered by the ``driver_name``.
 
+    Adapters are imported and created on first use, and the instance is shared by all later
+    queries of the driver. Driver names which are not registered are looked up in the
+    ``anosql.driver_adapters`` entry points of installed packages, for example in ``setup.py``::
+
+        entry_points={
+            "anosql.driver_adapters": ["mydb = anosql_mydb:MyDbAdapter"],
+        }
+
     Args:
         driver_name (str): The database driver name.
 
     Returns:
-        object: A driver adapter class.
+        object: A driver adapter instance.
     """
     try:
-        driver_adapter = _ADAPTERS[driver_name]
+        return _ADAPTER_INSTANCES[driver_name]
     except KeyError:
-        raise ValueError("Encountered unregistered driver_name: {}".format(driver_name))
-
-    return driver_adapter()
+        pass
+
+    with _adapters_lock:
+        if driver_name in _ADAPTER_INSTANCES:
+            return _ADAPTER_INSTANCES[driver_name]
+        if driver_name not in _ADAPTERS and not _entry_points_loaded:
+            _load_entry_points()
+        try:
+            driver_adapter = _ADAPTERS[driver_name]
+        except KeyError:
+            raise ValueError("Encountered unregistered driver_name: {}".format(driver_name))
+
+        if isinstance(driver_adapter, str):
+            driver_adapter = _import_adapter(driver_adapter)
+        elif not callable(driver_adapter):
+            # An entry point, loaded on first use like the dotted paths.
+            driver_adapter = driver_adapter.load()
+        instance = _ADAPTER_INSTANCES[driver_name] = driver_adapter()
+    return instance
 
 
 class SQLOperationType(object):
@@ -99,11 +237,741 @@ class SQLOperationType(object):
     SELECT_ONE_ROW = 5
 
 
+class QuerySource(namedtuple("QuerySource", ["path", "offset", "length", "lineno"])):
+    """Location of a query definition in the SQL content it was loaded from.
+
+    Attributes:
+        path (str): Path of the SQL file, or ``None`` for queries loaded from a string.
+        offset (int): Byte offset of the ``-- name:`` definition in the UTF-8 encoded content.
+        length (int): Length in bytes of the query block, up to the next definition.
+        lineno (int): Line number of the ``-- name:`` definition, starting at 1.
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        return "{}:{}".format(self.path or "<string>", self.lineno)
+
+
+_POSITIONAL_PARAMSTYLES = ("qmark", "format")
+
+
+class BindingPlan(object):
+    """Checks and converts keyword parameters of a query before they reach the driver.
+
+    The plan is computed once when the query is loaded. Calls with keyword arguments must name
+    exactly the parameters of the query, otherwise ``SQLParameterException`` is raised without
+    touching the database. For driver adapters which produce positional placeholders (the
+    ``qmark`` and ``format`` DB-API paramstyles) the keyword arguments are converted to a tuple in
+    placeholder order, otherwise they are passed on as they are.
+
+    Attributes:
+        names (frozenset): The parameter names of the query.
+        order (tuple): Parameter name of each placeholder for positional drivers, else ``None``.
+    """
+
+    __slots__ = ("names", "order")
+
+    def __init__(self, names, order=None):
+        self.names = names
+        self.order = order
+
+    def bind(self, query_name, kwargs):
+        # Compared as sets: on Python 2 keys() is a list, which never equals a frozenset.
+        if len(kwargs) != len(self.names) or not self.names.issuperset(kwargs):
+            missing = sorted(self.names.difference(kwargs))
+            unexpected = sorted(set(kwargs).difference(self.names))
+            message = "{} got invalid parameters.".format(query_name)
+            if missing:
+                message += " Missing: {}.".format(", ".join(missing))
+            if unexpected:
+                message += " Unexpected: {}.".format(", ".join(unexpected))
+            raise SQLParameterException(message)
+        if self.order is None:
+            return kwargs
+        return tuple([kwargs[name] for name in self.order])
+
+    def bind_many(self, query_name, rows):
+        if self.order is None:
+            return rows
+        return (self.bind(query_name, row) if isinstance(row, dict) else row for row in rows)
+
+
+def parse_parameters(sql):
+    """Returns the names of the named parameters in SQL, in order of appearance.
+
+    Both anosql ``:name`` variables and psycopg2 style ``%(name)s`` variables are recognized.
+    Names used more than once appear once for each use.
+    """
+    names = [
+        match.group("var_name")
+        for match in var_pattern.finditer(sql)
+        if match.group("var_name") is not None
+    ]
+    if not names:
+        names = pyformat_var_pattern.findall(sql)
+    return names
+
+
+def _create_binding_plan(op_type, sql, driver_adapter):
+    if op_type == SQLOperationType.SCRIPT:
+        return (), None
+
+    order = parse_parameters(sql)
+    parameters = tuple(OrderedDict.fromkeys(order))
+    if not parameters:
+        return parameters, None
+
+    if getattr(driver_adapter, "paramstyle", "named") in _POSITIONAL_PARAMSTYLES:
+        return parameters, BindingPlan(frozenset(parameters), tuple(order))
+    return parameters, BindingPlan(frozenset(parameters))
+
+
+class ConnectionRouter(object):
+    """Base class of objects which can be passed to queries in place of a connection.
+
+    When a query is called with a router, ``route`` is called with the query and returns the
+    connection to execute it on. See :class:`anosql.routing.ReadWriteRouter`.
+    """
+
+    def route(self, query):
+        raise NotImplementedError
+
+
+class QueryObserver(object):
+    """Base class of observers of query execution, see ``register_observer``.
+
+    Observers are called on the thread running the query. Without registered observers, queries
+    run without any observer overhead.
+    """
+
+    def before(self, query, parameters):
+        """Called before a query or cursor runs, returns state passed to the other methods.
+
+        Args:
+            query (Query): The query.
+            parameters (object): The parameters passed to the driver adapter.
+        """
+        return None
+
+    def arguments(self, query, state, args, kwargs):
+        """Called after ``before`` with the arguments the query was called with.
+
+        Args:
+            query (Query): The query.
+            state (object): What ``before`` returned.
+            args (tuple): The positional arguments after the connection.
+            kwargs (dict): The keyword arguments.
+        """
+
+    def cursor(self, query, state, cursor):
+        """Called with the cursor of a ``<name>_cursor`` call, returns the cursor to yield."""
+        return cursor
+
+    def retry(self, query, state, attempt, error, delay):
+        """Called when a failed query is about to be retried, see ``Queries.set_retry_policy``.
+
+        Args:
+            query (Query): The query.
+            state (object): What ``before`` returned.
+            attempt (int): The number of the attempt which failed, from 1.
+            error (Exception): The transient error it failed with.
+            delay (float): Seconds until the next attempt.
+        """
+
+    def after(self, query, state, result, error):
+        """Called after a query runs, or when the block using its cursor exits.
+
+        Args:
+            query (Query): The query.
+            state (object): What ``before`` returned.
+            result (object): The result of the query, or the cursor returned by ``cursor``.
+            error (Exception): The error raised, or ``None``.
+        """
+
+
+class _QueryDoc(object):
+    """Descriptor giving each query instance its own docstring from the SQL comments."""
+
+    def __init__(self, class_doc):
+        self.class_doc = class_doc
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self.class_doc
+        return obj.docs
+
+
+class Query(object):
+    __doc__ = _QueryDoc(
+        """A callable query loaded from SQL content.
+
+        Calling a query executes its SQL with the connection and parameters given, using the
+        driver adapter it was loaded with. Select queries also have a ``cursor`` method, which
+        ``Queries`` exposes as the ``<name>_cursor`` method, and a ``map`` method.
+
+        Attributes:
+            name (str): The method name of the query.
+            op_type (int): The ``SQLOperationType`` of the query.
+            docs (str): Documentation from the SQL comments.
+            sql (str): The SQL processed by the driver adapter.
+            driver_adapter (object): The driver adapter executing the query.
+            source (QuerySource): Where the query was defined.
+            parameters (tuple): Names of the named parameters, in order of first appearance.
+            binding (BindingPlan): How keyword parameters are checked and passed to the driver,
+                                   or ``None`` for queries without named parameters.
+            pagination (KeysetPagination): Keyset pagination of an ``@paginate`` select query,
+                                           or ``None``.
+            timeout (float): Seconds the statement may run, from ``@timeout``, or ``None``.
+            max_rows (int): Most rows a call of a select query may return, from ``@max-rows``,
+                            or ``None``.
+            idempotent (bool): Whether the query is declared ``@idempotent``, so it can be run
+                               again when it fails.
+            retry_policy (RetryPolicy): How calls are retried on transient errors, or ``None``.
+                                        See ``Queries.set_retry_policy``.
+        """
+    )
+
+    __slots__ = (
+        "name",
+        "op_type",
+        "docs",
+        "sql",
+        "driver_adapter",
+        "source",
+        "parameters",
+        "binding",
+        "pagination",
+        "timeout",
+        "max_rows",
+        "idempotent",
+        "retry_policy",
+    )
+
+    def __init__(
+        self,
+        name,
+        op_type,
+        docs,
+        sql,
+        driver_adapter,
+        source=None,
+        parameters=(),
+        binding=None,
+        pagination=None,
+    ):
+        self.name = name
+        self.op_type = op_type
+        self.docs = docs
+        self.sql = sql
+        self.driver_adapter = driver_adapter
+        self.source = source
+        self.parameters = parameters
+        self.binding = binding
+        self.pagination = pagination
+        self.timeout = None
+        self.max_rows = None
+        self.idempotent = False
+        self.retry_policy = None
+
+    def __copy__(self):
+        # Slot by slot, several times faster than the generic copy protocol for slotted classes.
+        query = object.__new__(type(self))
+        for cls in type(self).__mro__:
+            for slot in cls.__dict__.get("__slots__", ()):
+                setattr(query, slot, getattr(self, slot))
+        return query
+
+    @property
+    def methods(self):
+        """Names of the extra methods of this query, exposed as ``<name>_<method>``."""
+        if self.op_type != SQLOperationType.SELECT:
+            return ()
+        if self.pagination is None:
+            return ("cursor",)
+        return ("cursor", "pages")
+
+    def _prepare(self, args, kwargs):
+        """Returns the SQL and driver parameters for a call."""
+        if not kwargs:
+            return self.sql, args
+        if self.binding is None:
+            return self.sql, kwargs
+        return self.sql, self.binding.bind(self.name, kwargs)
+
+    @property
+    def __name__(self):
+        return self.name
+
+    def __repr__(self):
+        return "<Query {}>".format(self.name)
+
+    def __call__(self, conn, *args, **kwargs):
+        if isinstance(conn, ConnectionRouter):
+            conn = conn.route(self)
+        sql, parameters = self._prepare(args, kwargs)
+        if _OBSERVERS:
+            return self._observed_call(_OBSERVERS, conn, sql, parameters, args, kwargs)
+        if self.retry_policy is not None:
+            return self._retried(conn, sql, parameters)
+        return self._execute(conn, sql, parameters)
+
+    def _retried(self, conn, sql, parameters, observers=(), states=()):
+        def on_retry(attempt, error, delay):
+            for observer, state in zip(observers, states):
+                observer.retry(self, state, attempt, error, delay)
+
+        return self.retry_policy.run(
+            lambda: self._execute(conn, sql, parameters),
+            lambda error: self.driver_adapter.is_transient_error(conn, error),
+            on_retry,
+        )
+
+    def _execute(self, conn, sql, parameters):
+        if self.timeout is None:
+            return self._run(conn, sql, parameters)
+        with self.driver_adapter.statement_timeout(conn, self.timeout):
+            return self._run(conn, sql, parameters)
+
+    def _run(self, conn, sql, parameters):
+        op_type = self.op_type
+        driver_adapter = self.driver_adapter
+        if op_type == SQLOperationType.SELECT:
+            if self.max_rows is not None:
+                return self._select_limited(conn, sql, parameters)
+            return driver_adapter.select(conn, self.name, sql, parameters)
+        elif op_type == SQLOperationType.SELECT_ONE_ROW:
+            res = driver_adapter.select(conn, self.name, sql, parameters)
+            return res[0] if len(res) == 1 else None
+        elif op_type == SQLOperationType.INSERT_RETURNING:
+            return driver_adapter.insert_returning(conn, self.name, sql, parameters)
+        elif op_type == SQLOperationType.INSERT_UPDATE_DELETE:
+            return driver_adapter.insert_update_delete(conn, self.name, sql, parameters)
+        elif op_type == SQLOperationType.INSERT_UPDATE_DELETE_MANY:
+            (rows,) = parameters
+            if self.binding is not None:
+                rows = self.binding.bind_many(self.name, rows)
+            return driver_adapter.insert_update_delete_many(conn, self.name, sql, rows)
+        elif op_type == SQLOperationType.SCRIPT:
+            return driver_adapter.execute_script(conn, sql)
+        else:
+            raise ValueError("Unknown op_type: {}".format(op_type))
+
+    def _select_limited(self, conn, sql, parameters):
+        """Selects at most ``max_rows`` rows, fetching one more to tell whether there are more."""
+        with self.driver_adapter.select_cursor(conn, self.name, sql, parameters) as cur:
+            rows = cur.fetchmany(self.max_rows + 1)
+        if len(rows) > self.max_rows:
+            raise SQLRowLimitException(
+                "{} returned more than {} rows.".format(self.name, self.max_rows)
+            )
+        return rows
+
+    def _select_cursor(self, conn, sql, parameters):
+        if self.timeout is None:
+            return self.driver_adapter.select_cursor(conn, self.name, sql, parameters)
+        return self._timed_cursor(conn, sql, parameters)
+
+    @contextmanager
+    def _timed_cursor(self, conn, sql, parameters):
+        with self.driver_adapter.statement_timeout(conn, self.timeout):
+            with self.driver_adapter.select_cursor(conn, self.name, sql, parameters) as cur:
+                yield cur
+
+    def _observe(self, observers, parameters, args, kwargs):
+        states = [observer.before(self, parameters) for observer in observers]
+        for observer, state in zip(observers, states):
+            observer.arguments(self, state, args, kwargs)
+        return states
+
+    def _observed_call(self, observers, conn, sql, parameters, args, kwargs):
+        states = self._observe(observers, parameters, args, kwargs)
+        try:
+            if self.retry_policy is None:
+                result = self._execute(conn, sql, parameters)
+            else:
+                result = self._retried(conn, sql, parameters, observers, states)
+        except Exception as e:
+            for observer, state in zip(observers, states):
+                observer.after(self, state, None, e)
+            raise
+        for observer, state in zip(observers, states):
+            observer.after(self, state, result, None)
+        return result
+
+    @contextmanager
+    def _observed_cursor(self, observers, conn, sql, parameters, args, kwargs):
+        states = self._observe(observers, parameters, args, kwargs)
+        # The cursor returned by each observer, which it gets back as the result.
+        cursors = []
+        try:
+            with self._select_cursor(conn, sql, parameters) as cur:
+                for observer, state in zip(observers, states):
+                    cur = observer.cursor(self, state, cur)
+                    cursors.append(cur)
+                yield cur
+        except Exception as e:
+            for observer, state in zip(observers, states):
+                observer.after(self, state, None, e)
+            raise
+        for observer, state, cur in zip(observers, states, cursors):
+            observer.after(self, state, cur, None)
+
+    def cursor(self, conn, *args, **kwargs):
+        """Execute a select query and return a context manager yielding the driver cursor."""
+        if self.op_type != SQLOperationType.SELECT:
+            raise ValueError("Only select queries have a cursor, not {}".format(self.name))
+        if isinstance(conn, ConnectionRouter):
+            conn = conn.route(self)
+        sql, parameters = self._prepare(args, kwargs)
+        if _OBSERVERS:
+            return self._observed_cursor(_OBSERVERS, conn, sql, parameters, args, kwargs)
+        return self._select_cursor(conn, sql, parameters)
+
+    def pages(self, conn, page_size, **kwargs):
+        """Iterate over the results of an ``@paginate`` select query one page at a time.
+
+        Pages are fetched with keyset predicates on the pagination keys of the query, so fetching
+        a page costs the same no matter how deep into the results it is.
+
+        Args:
+            conn: A database connection.
+            page_size (int): Maximum number of rows per page.
+            kwargs: The named parameters of the query.
+
+        Returns:
+            generator: Lists of rows, none of them empty.
+        """
+        pagination = self.pagination
+        if pagination is None:
+            raise ValueError("Query {} is not declared with @paginate".format(self.name))
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1, got {}".format(page_size))
+        if self.binding is not None:
+            self.binding.bind(self.name, kwargs)
+        if isinstance(conn, ConnectionRouter):
+            conn = conn.route(self)
+        return pagination.pages(self, conn, page_size, kwargs)
+
+    def map(self, source, parameters, workers=4, max_pending=None):
+        """Run a select query for many parameter sets concurrently.
+
+        See :func:`anosql.parallel.map_query`.
+        """
+        if self.op_type not in (SQLOperationType.SELECT, SQLOperationType.SELECT_ONE_ROW):
+            raise ValueError("Only select queries can be mapped, not {}".format(self.name))
+        return map_query(self, source, parameters, workers, max_pending)
+
+
+class ExpandingQuery(Query):
+    __doc__ = _QueryDoc(
+        """A query with ``:*name`` list parameters.
+
+        Each list parameter is expanded to one placeholder per item when the query is called.
+        List lengths are rounded up to the next power of two, padding with the last item, so a
+        query only ever runs as a few distinct statements. The expanded statements are processed
+        by the driver adapter once and cached, up to ``MAX_LIST_SHAPES`` per query.
+
+        Attributes:
+            template (str): The SQL before expansion and processing by the driver adapter.
+            list_parameters (tuple): Names of the list parameters.
+        """
+    )
+
+    __slots__ = ("template", "list_parameters", "_shapes")
+
+    def __init__(self, name, op_type, docs, template, driver_adapter, source=None):
+        list_parameters = tuple(OrderedDict.fromkeys(
+            match.group("var_name")
+            for match in list_var_pattern.finditer(template)
+            if match.group("var_name") is not None
+        ))
+        # Parameter names in order, with list parameters written like ordinary ones.
+        parameters = tuple(OrderedDict.fromkeys(
+            parse_parameters(list_var_pattern.sub(_expand_list_var(None), template))
+        ))
+        super(ExpandingQuery, self).__init__(
+            name,
+            op_type,
+            docs,
+            driver_adapter.process_sql(name, op_type, template),
+            driver_adapter,
+            source,
+            parameters,
+            BindingPlan(frozenset(parameters)),
+        )
+        self.template = template
+        self.list_parameters = list_parameters
+        self._shapes = {}
+
+    def _prepare(self, args, kwargs):
+        if args or not kwargs:
+            raise SQLParameterException(
+                "{} has list parameters and must be called with keyword arguments.".format(
+                    self.name
+                )
+            )
+        self.binding.bind(self.name, kwargs)
+
+        values = dict(kwargs)
+        sizes = []
+        for list_name in self.list_parameters:
+            items = values.pop(list_name)
+            if isinstance(items, _STRING_TYPES + (bytes, dict)):
+                raise SQLParameterException(
+                    "{} list parameter {} must be a sequence of values.".format(
+                        self.name, list_name
+                    )
+                )
+            items = list(items)
+            if not items:
+                raise SQLParameterException(
+                    "{} list parameter {} must not be empty.".format(self.name, list_name)
+                )
+            size = 1 << (len(items) - 1).bit_length()
+            items.extend([items[-1]] * (size - len(items)))
+            for i, item in enumerate(items):
+                values["{}__{}".format(list_name, i)] = item
+            sizes.append(size)
+
+        sql, binding = self._shape(tuple(sizes))
+        if binding is None:
+            return sql, values
+        return sql, binding.bind(self.name, values)
+
+    def _shape(self, sizes):
+        shape = self._shapes.get(sizes)
+        if shape is None:
+            expanded = list_var_pattern.sub(
+                _expand_list_var(dict(zip(self.list_parameters, sizes))), self.template
+            )
+            _, binding = _create_binding_plan(self.op_type, expanded, self.driver_adapter)
+            shape = (self.driver_adapter.process_sql(self.name, self.op_type, expanded), binding)
+            if len(self._shapes) < MAX_LIST_SHAPES:
+                self._shapes[sizes] = shape
+        return shape
+
+
+def _expand_list_var(sizes):
+    """Returns a replacement function for ``list_var_pattern`` matches.
+
+    List variables are replaced by a named variable for each item, following the ``sizes`` mapping
+    of list parameter names to lengths, or by a single variable of the same name when it is None.
+    """
+    def replacer(match):
+        gd = match.groupdict()
+        if gd["var_name"] is None:
+            return match.group(0)
+        if sizes is None:
+            return "{}:{}".format(gd["lead"], gd["var_name"])
+        return gd["lead"] + ", ".join(
+            ":{}__{}".format(gd["var_name"], i) for i in range(sizes[gd["var_name"]])
+        )
+
+    return replacer
+
+
+class ConditionalQuery(Query):
+    __doc__ = _QueryDoc(
+        """A query with ``[[ ... ]]`` conditional clauses.
+
+        A clause is part of the SQL run only when every parameter it uses is given and not
+        ``None``. Parameters used only in clauses are optional. Every combination of clauses is
+        processed by the driver adapter when the query is loaded, so a call only picks the
+        statement for the parameters given.
+
+        Attributes:
+            template (str): The SQL with its clauses, before processing by the driver adapter.
+            clause_parameters (tuple): Names of the parameters of each clause.
+            optional_parameters (frozenset): Names of the parameters used only in clauses.
+        """
+    )
+
+    __slots__ = ("template", "clause_parameters", "optional_parameters", "_variants")
+
+    def __init__(self, name, op_type, docs, template, driver_adapter, source=None):
+        clauses = [match.group("clause") for match in conditional_clause_pattern.finditer(template)]
+        self.template = template
+        self.clause_parameters = tuple(
+            tuple(OrderedDict.fromkeys(parse_parameters(clause))) for clause in clauses
+        )
+        required = set(parse_parameters(conditional_clause_pattern.sub("", template)))
+        self.optional_parameters = frozenset(
+            name for names in self.clause_parameters for name in names if name not in required
+        )
+
+        self._variants = []
+        for key in range(1 << len(clauses)):
+            included = iter(range(len(clauses)))
+            variant = conditional_clause_pattern.sub(
+                lambda match: match.group("clause") if key & (1 << next(included)) else "",
+                template,
+            )
+            _, binding = _create_binding_plan(op_type, variant, driver_adapter)
+            if binding is None:
+                # Variants without parameters still reject unexpected ones.
+                positional = getattr(driver_adapter, "paramstyle", "named") in (
+                    _POSITIONAL_PARAMSTYLES
+                )
+                binding = BindingPlan(frozenset(), () if positional else None)
+            self._variants.append((driver_adapter.process_sql(name, op_type, variant), binding))
+
+        parameters, _ = _create_binding_plan(
+            op_type, conditional_clause_pattern.sub(r"\g<clause>", template), driver_adapter
+        )
+        sql, binding = self._variants[-1]
+        super(ConditionalQuery, self).__init__(
+            name, op_type, docs, sql, driver_adapter, source, parameters, binding
+        )
+
+    def _prepare(self, args, kwargs):
+        if args:
+            raise SQLParameterException(
+                "{} has conditional clauses and must be called with keyword arguments.".format(
+                    self.name
+                )
+            )
+        key = 0
+        for i, names in enumerate(self.clause_parameters):
+            for name in names:
+                if kwargs.get(name) is None:
+                    break
+            else:
+                key |= 1 << i
+
+        sql, binding = self._variants[key]
+        if len(kwargs) != len(binding.names) or not binding.names.issuperset(kwargs):
+            # Optional parameters of excluded clauses may be given as None.
+            kwargs = dict(
+                (name, value)
+                for name, value in kwargs.items()
+                if name in binding.names or name not in self.optional_parameters
+            )
+        return sql, binding.bind(self.name, kwargs)
+
+
+class KeysetPagination(object):
+    """Keyset pagination of a select query, declared with an ``@paginate`` directive.
+
+    The query is wrapped in an outer select which orders by the key columns and limits the rows
+    to a page. Every page after the first starts after the key values of the last row of the
+    previous page. Both statements are processed by the driver adapter when the query is loaded.
+
+    Attributes:
+        keys (tuple): Names of the key columns in the select list of the query.
+        descending (bool): Whether pages walk the keys in descending order.
+        first_sql (str): The SQL for the first page.
+        next_sql (str): The SQL for the following pages.
+    """
+
+    __slots__ = ("keys", "descending", "first_sql", "first_binding", "next_sql", "next_binding")
+
+    def __init__(self, query_name, op_type, sql, directive, driver_adapter):
+        keys = []
+        directions = set()
+        for key in directive.split(","):
+            parts = key.split()
+            if not parts or len(parts) > 2 or parts[1:] not in ([], ["asc"], ["desc"]):
+                raise ValueError("Invalid @paginate key: {!r}".format(key.strip()))
+            keys.append(parts[0])
+            directions.add(parts[1:] == ["desc"])
+        if len(directions) != 1:
+            raise ValueError("@paginate keys must all be ascending or all descending")
+
+        self.keys = tuple(keys)
+        self.descending = directions.pop()
+
+        inner = sql.rstrip().rstrip(";")
+        order_by = ", ".join(
+            "{} {}".format(key, "desc" if self.descending else "asc") for key in self.keys
+        )
+        if len(self.keys) == 1:
+            columns, values = self.keys[0], ":anosql_last_0"
+        else:
+            columns = "({})".format(", ".join(self.keys))
+            values = "({})".format(
+                ", ".join(":anosql_last_{}".format(i) for i in range(len(self.keys)))
+            )
+
+        first_sql = "select * from (\n{}\n) anosql_page order by {} limit :anosql_page_size".format(
+            inner, order_by
+        )
+        next_sql = (
+            "select * from (\n{}\n) anosql_page where {} {} {} "
+            "order by {} limit :anosql_page_size"
+        ).format(inner, columns, "<" if self.descending else ">", values, order_by)
+
+        _, self.first_binding = _create_binding_plan(op_type, first_sql, driver_adapter)
+        _, self.next_binding = _create_binding_plan(op_type, next_sql, driver_adapter)
+        self.first_sql = driver_adapter.process_sql(query_name, op_type, first_sql)
+        self.next_sql = driver_adapter.process_sql(query_name, op_type, next_sql)
+
+    def pages(self, query, conn, page_size, kwargs):
+        parameters = dict(kwargs, anosql_page_size=page_size)
+        sql, binding = self.first_sql, self.first_binding
+        while True:
+            bound = binding.bind(query.name, parameters)
+            with query._select_cursor(conn, sql, bound) as cur:
+                rows = cur.fetchall()
+                columns = [column[0] for column in cur.description or ()]
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+
+            last = rows[-1]
+            for i, key in enumerate(self.keys):
+                if isinstance(last, (tuple, list)):
+                    value = last[columns.index(key)]
+                else:
+                    value = last[key]
+                parameters["anosql_last_{}".format(i)] = value
+            sql, binding = self.next_sql, self.next_binding
+
+
+class QueryMethod(object):
+    """An extra ``<name>_<method>`` method of a query, like ``<name>_cursor``.
+
+    These are created when accessed on ``Queries`` rather than stored.
+    """
+
+    __slots__ = ("query", "method")
+
+    def __init__(self, query, method):
+        self.query = query
+        self.method = method
+
+    def __call__(self, conn, *args, **kwargs):
+        return getattr(self.query, self.method)(conn, *args, **kwargs)
+
+    @property
+    def __name__(self):
+        return "{}_{}".format(self.query.name, self.method)
+
+    @property
+    def __doc__(self):
+        return self.query.docs
+
+    @property
+    def sql(self):
+        return self.query.sql
+
+    @property
+    def source(self):
+        return self.query.source
+
+    def __repr__(self):
+        return "<QueryMethod {}>".format(self.__name__)
+
+
 class Queries:
     """Container object with dynamic methods built from SQL queries.
 
     The ``-- name`` definition comments in the SQL content determine what the dynamic
-    methods of this class will be named.
+    methods of this class will be named. Select queries also have ``<name>_cursor`` methods, and
+    ``<name>_pages`` methods when declared with ``@paginate``.
+
+    Queries can be added and listed from many threads at once.
 
     @DynamicAttrs
     """
@@ -116,11 +984,107 @@ class Queries:
         """
         if queries is None:
             queries = []
-        self._available_queries = set()
+        # Reentrant, since merge adds queries while holding it.
+        self._lock = threading.RLock()
+        self._frozen = False
+        self._query_names = set()
+        self._child_names = set()
 
         for query_name, fn in queries:
             self.add_query(query_name, fn)
 
+    def __getattr__(self, name):
+        # Only called when normal attribute lookup fails, so this is the <name>_<method> fallback.
+        query_name, _, method = name.rpartition("_")
+        query = self.__dict__.get(query_name)
+        if isinstance(query, Query) and method in query.methods:
+            return QueryMethod(query, method)
+        raise AttributeError(
+            "'{}' object has no attribute '{}'".format(type(self).__name__, name)
+        )
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get("_frozen"):
+            raise AttributeError("Frozen queries can't be changed, tried to set {}".format(name))
+        self.__dict__[name] = value
+
+    def __delattr__(self, name):
+        if self.__dict__.get("_frozen"):
+            raise AttributeError(
+                "Frozen queries can't be changed, tried to delete {}".format(name)
+            )
+        del self.__dict__[name]
+
+    def freeze(self):
+        """Makes these queries and their child queries immutable.
+
+        Adding, replacing or removing queries afterwards raises ``AttributeError``. See
+        :func:`anosql.preload.preload` for sharing frozen queries with forked processes.
+
+        Returns:
+            Queries: These queries.
+        """
+        with self._lock:
+            for child_name in self._child_names:
+                getattr(self, child_name).freeze()
+            self._query_names = frozenset(self._query_names)
+            self._child_names = frozenset(self._child_names)
+            self._frozen = True
+        return self
+
+    @property
+    def frozen(self):
+        """Whether these queries are immutable, see ``freeze``."""
+        return self._frozen
+
+    def set_retry_policy(self, policy, idempotent_only=True):
+        """Sets how calls of these queries and their child queries are retried on transient
+        errors, like a locked SQLite database or a PostgreSQL serialization failure.
+
+        The driver adapter tells which errors are transient. A single query's policy can also be
+        set with its ``retry_policy`` attribute.
+
+        Args:
+            policy (RetryPolicy): The policy, see :class:`anosql.retry.RetryPolicy`, or ``None``
+                                  to stop retrying.
+            idempotent_only (bool): Whether to only set it for queries declared ``@idempotent``,
+                                    which are safe to run twice.
+
+        Returns:
+            None
+        """
+        query_names, child_names = self._names()
+        for query_name in query_names:
+            query = getattr(self, query_name)
+            if isinstance(query, Query) and (query.idempotent or not idempotent_only):
+                if policy is not None and not hasattr(query.driver_adapter, "is_transient_error"):
+                    raise ValueError(
+                        "The {} driver adapter of {} can't tell transient errors".format(
+                            type(query.driver_adapter).__name__, query.name
+                        )
+                    )
+                query.retry_policy = policy
+        for child_name in child_names:
+            getattr(self, child_name).set_retry_policy(policy, idempotent_only)
+
+    def _names(self):
+        """Returns lists of the query names and child names, safe to iterate while other threads
+        add queries."""
+        with self._lock:
+            return list(self._query_names), list(self._child_names)
+
+    def _iter_available_queries(self):
+        query_names, child_names = self._names()
+        for query_name in query_names:
+            yield query_name
+            query = getattr(self, query_name)
+            if isinstance(query, Query):
+                for method in query.methods:
+                    yield "{}_{}".format(query_name, method)
+        for child_name in child_names:
+            for child_query_name in getattr(self, child_name)._iter_available_queries():
+                yield "{}.{}".format(child_name, child_query_name)
+
     @property
     def available_queries(self):
         """Returns listing of all the available query methods loaded in this class.
@@ -128,7 +1092,7 @@ class Queries:
         Returns:
             list(str): List of dot-separated method accessor names.
         """
-        return sorted(self._available_queries)
+        return sorted(self._iter_available_queries())
 
     def __repr__(self):
         return "Queries(" + self.available_queries.__repr__() + ")"
@@ -143,8 +1107,42 @@ class Queries:
         Returns:
 
         """
-        setattr(self, query_name, fn)
-        self._available_queries.add(query_name)
+        with self._lock:
+            setattr(self, query_name, fn)
+            self._query_names.add(query_name)
+
+    def find_query(self, query_name):
+        """Returns a query by its dot-separated name.
+
+        Args:
+            query_name (str): A dot-separated method accessor name, as in ``available_queries``.
+
+        Returns:
+            Query: The query, a ``QueryMethod`` for ``_cursor`` and ``_pages`` names, or ``None``
+                   if there is no query of that name.
+        """
+        obj = self
+        for name in query_name.split("."):
+            if not isinstance(obj, Queries):
+                return None
+            obj = getattr(obj, name, None)
+        if not isinstance(obj, (Query, QueryMethod)):
+            return None
+        return obj
+
+    def source_of(self, query_name):
+        """Returns where a query was defined.
+
+        Args:
+            query_name (str): A dot-separated method accessor name, as in ``available_queries``.
+
+        Returns:
+            QuerySource: The location of the query in its SQL content.
+        """
+        obj = self.find_query(query_name)
+        if obj is None:
+            raise ValueError("Encountered unknown query_name: {}".format(query_name))
+        return obj.source
 
     def add_child_queries(self, child_name, child_queries):
         """Adds a Queries object as a property.
@@ -157,51 +1155,86 @@ class Queries:
             None
 
         """
-        setattr(self, child_name, child_queries)
-        for child_query_name in child_queries.available_queries:
-            self._available_queries.add("{}.{}".format(child_name, child_query_name))
+        with self._lock:
+            setattr(self, child_name, child_queries)
+            self._child_names.add(child_name)
 
+    def merge(self, other):
+        """Adds the queries and child queries of another Queries object, replacing the queries of
+        the same dot-separated name.
 
-def _create_fns(query_name, docs, op_type, sql, driver_adapter):
-    def fn(conn, *args, **kwargs):
-        parameters = kwargs if len(kwargs) > 0 else args
-        if op_type == SQLOperationType.INSERT_RETURNING:
-            return driver_adapter.insert_returning(conn, query_name, sql, parameters)
-        elif op_type == SQLOperationType.INSERT_UPDATE_DELETE:
-            return driver_adapter.insert_update_delete(conn, query_name, sql, parameters)
-        elif op_type == SQLOperationType.INSERT_UPDATE_DELETE_MANY:
-            return driver_adapter.insert_update_delete_many(conn, query_name, sql, *parameters)
-        elif op_type == SQLOperationType.SCRIPT:
-            return driver_adapter.execute_script(conn, sql)
-        elif op_type == SQLOperationType.SELECT_ONE_ROW:
-            res = driver_adapter.select(conn, query_name, sql, parameters)
-            return res[0] if len(res) == 1 else None
-        elif op_type == SQLOperationType.SELECT:
-            return driver_adapter.select(conn, query_name, sql, parameters)
-        else:
-            raise ValueError("Unknown op_type: {}".format(op_type))
+        Child queries found in both are merged rather than replaced, so ``other`` only needs the
+        queries it overrides. ``other`` itself is left unchanged and its child ``Queries``
+        objects are not shared, but its query objects are.
+
+        Args:
+            other (Queries): The queries to add.
+
+        Returns:
+            Queries: These queries.
+        """
+        # Listed before locking these queries, so merging two Queries into each other at once
+        # can't deadlock.
+        query_names, child_names = other._names()
+        with self._lock:
+            for query_name in query_names:
+                if query_name in self._child_names:
+                    raise SQLLoadException(
+                        "Can't replace the child queries {} with a query".format(query_name)
+                    )
+                self.add_query(query_name, getattr(other, query_name))
+            for child_name in child_names:
+                if child_name in self._query_names:
+                    raise SQLLoadException(
+                        "Can't replace the query {} with child queries".format(child_name)
+                    )
+                if child_name not in self._child_names:
+                    self.add_child_queries(child_name, Queries())
+                getattr(self, child_name).merge(getattr(other, child_name))
+        return self
+
+    def bind(self, connection_source):
+        """Returns these queries called without a connection, each thread running them on its own
+        connection, opened on first use.
+
+        Args:
+            connection_source (object): A connection pool or connection factory, see
+                                        :func:`anosql.parallel.open_connection`, or the
+                                        ``ThreadLocalConnections`` of other bound queries to share
+                                        their connections.
+
+        Returns:
+            BoundQueries: See :class:`anosql.threadlocal.BoundQueries`.
+        """
+        # Imported here, since the module builds on this one.
+        from .threadlocal import BoundQueries, ThreadLocalConnections
 
-    fn.__name__ = query_name
-    fn.__doc__ = docs
-    fn.sql = sql
+        if not isinstance(connection_source, ThreadLocalConnections):
+            connection_source = ThreadLocalConnections(connection_source)
+        return BoundQueries(self, connection_source)
 
-    ctx_mgr_method_name = "{}_cursor".format(query_name)
 
-    def ctx_mgr(conn, *args, **kwargs):
-        parameters = kwargs if len(kwargs) > 0 else args
-        return driver_adapter.select_cursor(conn, query_name, sql, parameters)
+def query_names(queries):
+    """Returns the dot-separated name of every query of a ``Queries`` object, by query object id.
 
-    ctx_mgr.__name__ = ctx_mgr_method_name
-    ctx_mgr.__doc__ = docs
-    ctx_mgr.sql = sql
+    Observers only get the query object, whose ``name`` is the same for queries of the same name
+    in different child queries, like ``users.get_all`` and ``blogs.get_all``.
 
-    if op_type == SQLOperationType.SELECT:
-        return [(query_name, fn), (ctx_mgr_method_name, ctx_mgr)]
+    Args:
+        queries (Queries): The queries.
 
-    return [(query_name, fn)]
+    Returns:
+        dict: Dot-separated names by ``id()`` of the query objects.
+    """
+    names = {}
+    for query_name in queries.available_queries:
+        obj = queries.find_query(query_name)
+        if isinstance(obj, Query):
+            names[id(obj)] = query_name
+    return names
 
 
-def load_methods(sql_text, driver_adapter):
+def load_methods(sql_text, driver_adapter, source=None, fragments=None):
     lines = sql_text.strip().splitlines()
     query_name = lines[0].replace("-", "_")
 
@@ -225,39 +1258,274 @@ def load_methods(sql_text, driver_adapter):
 
     if not valid_query_name_pattern.match(query_name):
         raise SQLParseException(
-            'name must convert to valid python variable, got "{}".'.format(query_name)
+            '{}: name must convert to valid python variable, got "{}".'.format(
+                source or "<string>", query_name
+            )
         )
 
-    docs = ""
-    sql = ""
+    doc_lines = []
+    sql_lines = []
+    directives = {}
     for line in lines[1:]:
         match = doc_comment_pattern.match(line)
         if match:
-            docs += match.group(1) + "\n"
+            directive = directive_pattern.match(match.group(1))
+            if directive is None:
+                doc_lines.append(match.group(1))
+            elif directive.group("name") in _DIRECTIVES:
+                directives[directive.group("name")] = (directive.group("value") or "").strip()
+            else:
+                raise SQLParseException(
+                    '{}: unknown directive "@{}" in {}.'.format(
+                        source or "<string>", directive.group("name"), query_name
+                    )
+                )
         else:
-            sql += line + "\n"
+            sql_lines.append(line)
+
+    docs = "\n".join(doc_lines).strip()
+    sql = "\n".join(sql_lines).strip()
+    options = _query_options(query_name, op_type, directives, driver_adapter, source)
+    if "{{" in sql:
+        sql = _include_fragments(sql, fragments or {}, source, query_name)
+
+    if conditional_clause_pattern.search(sql):
+        if op_type in (SQLOperationType.INSERT_UPDATE_DELETE_MANY, SQLOperationType.SCRIPT):
+            raise SQLParseException(
+                "{}: conditional clauses are not supported by {} queries.".format(
+                    source or "<string>", query_name
+                )
+            )
+        if "paginate" in directives or any(
+            match.group("var_name") for match in list_var_pattern.finditer(sql)
+        ):
+            raise SQLParseException(
+                "{}: conditional clauses are not supported with list parameters or @paginate "
+                "in {}.".format(source or "<string>", query_name)
+            )
+        if len(conditional_clause_pattern.findall(sql)) > MAX_CONDITIONAL_CLAUSES:
+            raise SQLParseException(
+                "{}: {} has more than {} conditional clauses.".format(
+                    source or "<string>", query_name, MAX_CONDITIONAL_CLAUSES
+                )
+            )
+        query = ConditionalQuery(query_name, op_type, docs, sql, driver_adapter, source)
+        query.timeout, query.max_rows, query.idempotent = options
+        return [(query_name, query)]
+
+    if any(match.group("var_name") for match in list_var_pattern.finditer(sql)):
+        if op_type in (SQLOperationType.INSERT_UPDATE_DELETE_MANY, SQLOperationType.SCRIPT):
+            raise SQLParseException(
+                "{}: list parameters are not supported by {} queries.".format(
+                    source or "<string>", query_name
+                )
+            )
+        if "paginate" in directives:
+            raise SQLParseException(
+                "{}: @paginate is not supported with list parameters in {}.".format(
+                    source or "<string>", query_name
+                )
+            )
+        query = ExpandingQuery(query_name, op_type, docs, sql, driver_adapter, source)
+        query.timeout, query.max_rows, query.idempotent = options
+        return [(query_name, query)]
+
+    pagination = None
+    if "paginate" in directives:
+        if op_type != SQLOperationType.SELECT:
+            raise SQLParseException(
+                "{}: @paginate is only supported by select queries, not {}.".format(
+                    source or "<string>", query_name
+                )
+            )
+        try:
+            pagination = KeysetPagination(
+                query_name, op_type, sql, directives["paginate"], driver_adapter
+            )
+        except ValueError as e:
+            raise SQLParseException("{}: {} in {}.".format(source or "<string>", e, query_name))
+
+    parameters, binding = _create_binding_plan(op_type, sql, driver_adapter)
+    sql = driver_adapter.process_sql(query_name, op_type, sql)
+
+    query = Query(
+        query_name, op_type, docs, sql, driver_adapter, source, parameters, binding, pagination
+    )
+    query.timeout, query.max_rows, query.idempotent = options
+    return [(query_name, query)]
+
+
+def _query_options(query_name, op_type, directives, driver_adapter, source):
+    """Returns the ``(timeout, max_rows, idempotent)`` of the ``@timeout``, ``@max-rows`` and
+    ``@idempotent`` directives.
+    """
+    timeout = None
+    if "timeout" in directives:
+        match = duration_pattern.match(directives["timeout"])
+        if match is None or float(match.group("value")) <= 0:
+            raise SQLParseException(
+                '{}: invalid @timeout "{}" in {}, expected a duration like 500ms or 2s.'.format(
+                    source or "<string>", directives["timeout"], query_name
+                )
+            )
+        timeout = float(match.group("value"))
+        if match.group("unit") == "ms":
+            timeout /= 1000
+        if not hasattr(driver_adapter, "statement_timeout"):
+            raise SQLParseException(
+                "{}: @timeout is not supported by the {} driver adapter in {}.".format(
+                    source or "<string>", type(driver_adapter).__name__, query_name
+                )
+            )
+
+    max_rows = None
+    if "max-rows" in directives:
+        if op_type != SQLOperationType.SELECT:
+            raise SQLParseException(
+                "{}: @max-rows is only supported by select queries, not {}.".format(
+                    source or "<string>", query_name
+                )
+            )
+        value = directives["max-rows"]
+        if not value.isdigit() or int(value) < 1:
+            raise SQLParseException(
+                '{}: invalid @max-rows "{}" in {}, expected a positive number.'.format(
+                    source or "<string>", value, query_name
+                )
+            )
+        max_rows = int(value)
 
-    docs = docs.strip()
-    sql = driver_adapter.process_sql(query_name, op_type, sql.strip())
+    return timeout, max_rows, "idempotent" in directives
 
-    return _create_fns(query_name, docs, op_type, sql, driver_adapter)
 
+def _include_fragments(sql, fragments, source, query_name, including=()):
+    def include(match):
+        name = match.group("name").replace("-", "_")
+        if name in including:
+            raise SQLParseException(
+                '{}: fragment "{}" includes itself in {}.'.format(
+                    source or "<string>", name, query_name
+                )
+            )
+        try:
+            fragment = fragments[name]
+        except KeyError:
+            raise SQLParseException(
+                '{}: unknown fragment "{}" in {}.'.format(source or "<string>", name, query_name)
+            )
+        return _include_fragments(fragment, fragments, source, query_name, including + (name,))
 
-def load_queries_from_sql(sql, driver_adapter):
+    return fragment_include_pattern.sub(include, sql)
+
+
+def _iter_query_blocks(content):
+    """Yields ``(offset, length, body_offset, kind)`` for each block of the encoded SQL content.
+
+    A block spans from a ``-- name:`` or ``-- fragment:`` definition to the next one, the body
+    starts after the definition comment and ``kind`` is ``b"name"`` or ``b"fragment"``. Any
+    content before the first definition is yielded as a block of its own, of kind ``None``.
+    """
+    offset = body_offset = 0
+    kind = None
+    for match in block_definition_bytes_pattern.finditer(content):
+        yield offset, match.start() - offset, body_offset, kind
+        offset, body_offset, kind = match.start(), match.end(), match.group("kind")
+    yield offset, len(content) - offset, body_offset, kind
+
+
+def _load_fragments(content, path=None):
+    """Returns the SQL of the ``-- fragment:`` blocks of the encoded SQL content, by name.
+
+    Comment lines of fragments are left out.
+    """
+    fragments = {}
+    for offset, length, body_offset, kind in _iter_query_blocks(content):
+        if kind != b"fragment":
+            continue
+        lines = content[body_offset:offset + length].decode("utf-8").strip().splitlines()
+        name = lines[0].strip().replace("-", "_") if lines else ""
+        if not valid_query_name_pattern.match(name) or name in fragments:
+            raise SQLParseException(
+                '{}: fragment names must be unique valid python variables, got "{}".'.format(
+                    path or "<string>", name
+                )
+            )
+        fragments[name] = "\n".join(
+            line for line in lines[1:] if not doc_comment_pattern.match(line)
+        ).strip()
+    return fragments
+
+
+def load_queries_from_bytes(content, driver_adapter, path=None):
+    """Load queries from UTF-8 encoded SQL content.
+
+    ``content`` may be any buffer which supports regular expressions and slicing, like ``bytes``
+    or ``mmap.mmap``. Each query block is sliced and decoded on its own, so the content is never
+    decoded as a whole. Fragments can be included by any query of the same content.
+    """
+    fragments = _load_fragments(content, path)
     queries = []
-    for query_text in query_name_definition_pattern.split(sql):
-        if not empty_pattern.match(query_text):
-            for method_pair in load_methods(query_text, driver_adapter):
+    lineno = 1
+    for offset, length, body_offset, kind in _iter_query_blocks(content):
+        query_text = content[body_offset:offset + length].decode("utf-8")
+        if kind != b"fragment" and not empty_pattern.match(query_text):
+            source = QuerySource(path, offset, length, lineno)
+            for method_pair in load_methods(query_text, driver_adapter, source, fragments):
                 queries.append(method_pair)
+        lineno += content[offset:body_offset].count(b"\n") + query_text.count("\n")
     return queries
 
 
+def load_queries_from_sql(sql, driver_adapter):
+    return load_queries_from_bytes(sql.encode("utf-8"), driver_adapter)
+
+
 def load_queries_from_file(file_path, driver_adapter):
-    with open(file_path) as fp:
-        return load_queries_from_sql(fp.read(), driver_adapter)
+    with open(file_path, "rb") as fp:
+        if os.fstat(fp.fileno()).st_size < MMAP_MIN_SIZE:
+            return load_queries_from_bytes(fp.read(), driver_adapter, file_path)
+
+        content = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return load_queries_from_bytes(content, driver_adapter, file_path)
+        finally:
+            content.close()
 
 
-def load_queries_from_dir_path(dir_path, query_loader):
+def _load_shared_file(file_path, driver_adapter):
+    """Returns the queries of a file like ``load_queries_from_file``, parsing the file only once
+    per driver adapter while its size and modification time don't change.
+
+    Every call gets shallow copies of the parsed queries, which share their SQL, binding plans and
+    caches, but not settings like the retry policy.
+    """
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), driver_adapter)
+    signature = (stat.st_size, getattr(stat, "st_mtime_ns", stat.st_mtime))
+    with _shared_files_lock:
+        cached = _SHARED_FILES.get(key)
+    if cached is None or cached[0] != signature:
+        queries = load_queries_from_file(file_path, driver_adapter)
+        with _shared_files_lock:
+            cached = _SHARED_FILES.get(key)
+            if cached is None or cached[0] != signature:
+                cached = _SHARED_FILES[key] = (signature, queries)
+            # Else parsed concurrently by another thread, copy its queries instead.
+    return [(query_name, copy.copy(query)) for query_name, query in cached[1]]
+
+
+def clear_shared_queries():
+    """Forgets the queries parsed for layers of ``from_path``, so the next load parses the files
+    again and shares no parsed SQL with earlier loads.
+
+    Returns:
+        None
+    """
+    with _shared_files_lock:
+        _SHARED_FILES.clear()
+
+
+def load_queries_from_dir_path(dir_path, query_loader, file_loader=load_queries_from_file):
     if not os.path.isdir(dir_path):
         raise ValueError("The path {} must be a directory".format(dir_path))
 
@@ -268,7 +1536,7 @@ def load_queries_from_dir_path(dir_path, query_loader):
             if os.path.isfile(item_path) and not item.endswith(".sql"):
                 continue
             elif os.path.isfile(item_path) and item.endswith(".sql"):
-                for name, fn in load_queries_from_file(item_path, query_loader):
+                for name, fn in file_loader(item_path, query_loader):
                     queries.add_query(name, fn)
             elif os.path.isdir(item_path):
                 child_queries = _recurse_load_queries(item_path)
@@ -319,11 +1587,32 @@ def from_str(sql, driver_name):
     return Queries(load_queries_from_sql(sql, driver_adapter))
 
 
+def _load_path(sql_path, driver_adapter, file_loader):
+    if not os.path.exists(sql_path):
+        raise SQLLoadException('File does not exist: {}.'.format(sql_path), sql_path)
+
+    if os.path.isdir(sql_path):
+        return load_queries_from_dir_path(sql_path, driver_adapter, file_loader)
+    elif os.path.isfile(sql_path):
+        return Queries(file_loader(sql_path, driver_adapter))
+    else:
+        raise SQLLoadException(
+            'The sql_path must be a directory or file, got {}'.format(sql_path),
+            sql_path
+        )
+
+
 def from_path(sql_path, driver_name):
     """Load queries from a sql file, or a directory of sql files.
 
+    Given a list of paths, each path is loaded as a layer over the previous ones: its queries
+    replace those of the same dot-separated name, see ``Queries.merge``. The files of layers are
+    parsed once per process and driver, until they change or ``clear_shared_queries`` is called.
+    Every load gets its own query objects, sharing the parsed SQL of the others.
+
     Args:
-        sql_path (str): Path to a ``.sql`` file or directory containing ``.sql`` files.
+        sql_path (str): Path to a ``.sql`` file or directory containing ``.sql`` files, or a list
+                        of them loaded as layers.
         driver_name (str): The database driver to use to load and execute queries.
 
     Returns:
@@ -338,18 +1627,23 @@ def from_path(sql_path, driver_name):
             queries = anosql.from_path("./greetings.sql", driver_name="sqlite3")
             queries2 = anosql.from_path("./sql_dir", driver_name="sqlite3")
 
+        Overriding some queries of a shared library::
+
+            queries = anosql.from_path(["./base_sql", "./service_sql"], "sqlite3")
+
     """
+    if isinstance(sql_path, (list, tuple)):
+        for layer_path in sql_path:
+            if not os.path.exists(layer_path):
+                raise SQLLoadException('File does not exist: {}.'.format(layer_path), layer_path)
+        driver_adapter = get_driver_adapter(driver_name)
+        queries = Queries()
+        for layer_path in sql_path:
+            queries.merge(_load_path(layer_path, driver_adapter, _load_shared_file))
+        return queries
+
     if not os.path.exists(sql_path):
         raise SQLLoadException('File does not exist: {}.'.format(sql_path), sql_path)
 
     driver_adapter = get_driver_adapter(driver_name)
-
-    if os.path.isdir(sql_path):
-        return load_queries_from_dir_path(sql_path, driver_adapter)
-    elif os.path.isfile(sql_path):
-        return Queries(load_queries_from_file(sql_path, driver_adapter))
-    else:
-        raise SQLLoadException(
-            'The sql_path must be a directory or file, got {}'.format(sql_path),
-            sql_path
-        )
+    return _load_path(sql_path, driver_adapter, load_queries_from_file)
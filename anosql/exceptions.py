@@ -4,3 +4,11 @@ class SQLLoadException(Exception):
 
 class SQLParseException(Exception):
     pass
+
+
+class SQLParameterException(Exception):
+    pass
+
+
+class SQLRowLimitException(Exception):
+    pass
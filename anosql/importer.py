@@ -0,0 +1,175 @@
+import csv
+import io
+import itertools
+import json
+import os
+
+from .core import SQLOperationType
+
+try:
+    from time import monotonic
+except ImportError:  # Python 2
+    from time import time as monotonic
+
+
+FORMATS = ("csv", "jsonl")
+"""Supported data file formats."""
+
+
+class ImportStats(object):
+    """Progress and throughput of an import.
+
+    Attributes:
+        rows (int): Rows imported so far.
+        batches (int): Batches imported so far.
+        seconds (float): Seconds since the import started.
+    """
+
+    __slots__ = ("rows", "batches", "seconds")
+
+    def __init__(self, rows=0, batches=0, seconds=0.0):
+        self.rows = rows
+        self.batches = batches
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __repr__(self):
+        return "ImportStats(rows={}, batches={}, seconds={:.3f}, rows_per_second={:.1f})".format(
+            self.rows, self.batches, self.seconds, self.rows_per_second
+        )
+
+
+def iter_csv_rows(fp, header=False):
+    """Yields the rows of a CSV file, as lists, or as dicts keyed by the header row."""
+    if header:
+        return csv.DictReader(fp)
+    return csv.reader(fp)
+
+
+def iter_jsonl_rows(fp):
+    """Yields the objects of a JSON-lines file, skipping blank lines."""
+    for line in fp:
+        if line.strip():
+            yield json.loads(line)
+
+
+def map_rows(rows, mapping):
+    """Maps data rows to query parameters.
+
+    Args:
+        rows (iterable): Rows as lists or dicts.
+        mapping (object): A dict of query parameter name to row column, to make named
+                          parameters, or a sequence of row columns, to make positional
+                          parameters. Columns are list indexes or dict keys.
+
+    Returns:
+        generator: Parameters for each row.
+    """
+    if isinstance(mapping, dict):
+        items = list(mapping.items())
+        for row in rows:
+            yield dict((name, row[column]) for name, column in items)
+    else:
+        columns = list(mapping)
+        for row in rows:
+            yield tuple(row[column] for column in columns)
+
+
+def import_rows(query, conn, rows, batch_size=1000, commit=True, progress=None):
+    """Runs a ``*!`` query with rows from an iterable, in batches.
+
+    Only one batch of rows is held in memory at a time.
+
+    Args:
+        query (Query): An ``INSERT_UPDATE_DELETE_MANY`` query.
+        conn: A database connection.
+        rows (iterable): Parameters for each row, as accepted by the query.
+        batch_size (int): Rows per ``executemany`` call.
+        commit (bool): Whether to commit the connection after each batch.
+        progress (callable): Called with the ``ImportStats`` after each batch.
+
+    Returns:
+        ImportStats: The final statistics.
+    """
+    if query.op_type != SQLOperationType.INSERT_UPDATE_DELETE_MANY:
+        raise ValueError("Rows can only be imported with *! queries, not {}".format(query.name))
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1, got {}".format(batch_size))
+
+    stats = ImportStats()
+    started = monotonic()
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        query(conn, batch)
+        if commit:
+            conn.commit()
+        stats.rows += len(batch)
+        stats.batches += 1
+        stats.seconds = monotonic() - started
+        if progress is not None:
+            progress(stats)
+
+    stats.seconds = monotonic() - started
+    return stats
+
+
+def import_file(
+    query,
+    conn,
+    path,
+    data_format=None,
+    header=False,
+    mapping=None,
+    batch_size=1000,
+    commit=True,
+    progress=None,
+):
+    """Streams a CSV or JSON-lines file into a ``*!`` query.
+
+    Args:
+        query (Query): An ``INSERT_UPDATE_DELETE_MANY`` query.
+        conn: A database connection.
+        path (str): Path of the data file.
+        data_format (str): ``"csv"`` or ``"jsonl"``. Defaults to the file extension.
+        header (bool): Whether the first row of a CSV file names its columns.
+        mapping (object): Column mapping, see :func:`map_rows`. Without one, CSV rows are passed
+                          as positional parameters and JSON objects as named parameters.
+        batch_size (int): Rows per ``executemany`` call.
+        commit (bool): Whether to commit the connection after each batch.
+        progress (callable): Called with the ``ImportStats`` after each batch.
+
+    Returns:
+        ImportStats: The final statistics.
+
+    Example:
+        Load users from a CSV file with a header row::
+
+            stats = import_file(
+                queries.users.bulk_insert,
+                conn,
+                "users.csv",
+                header=True,
+                mapping={"username": "login", "firstname": "first", "lastname": "last"},
+            )
+    """
+    if data_format is None:
+        data_format = os.path.splitext(path)[1].lstrip(".").lower()
+        if data_format == "ndjson":
+            data_format = "jsonl"
+    if data_format not in FORMATS:
+        raise ValueError("Unsupported data format: {}".format(data_format))
+
+    with io.open(path, encoding="utf-8", newline="") as fp:
+        if data_format == "csv":
+            rows = iter_csv_rows(fp, header)
+        else:
+            rows = iter_jsonl_rows(fp)
+        if mapping is not None:
+            rows = map_rows(rows, mapping)
+        return import_rows(query, conn, rows, batch_size, commit, progress)
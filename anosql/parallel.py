@@ -0,0 +1,152 @@
+import threading
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+
+def open_connection(source):
+    """Acquire a connection from a connection source.
+
+    A connection source is either a connection pool exposing ``getconn()`` and ``putconn(conn)``
+    (like the ``psycopg2.pool`` classes), or a callable which takes no arguments and returns a new
+    DB-API connection.
+
+    Args:
+        source (object): A connection pool or connection factory.
+
+    Returns:
+        tuple: The connection, and a function which releases it when called.
+    """
+    if hasattr(source, "getconn") and hasattr(source, "putconn"):
+        conn = source.getconn()
+        return conn, lambda: source.putconn(conn)
+
+    conn = source()
+    return conn, conn.close
+
+
+def call_with_parameters(fn, conn, parameters):
+    """Call a query function using one parameter set.
+
+    Mappings are passed as keyword arguments, any other sequence as positional arguments.
+    """
+    if isinstance(parameters, Mapping):
+        return fn(conn, **parameters)
+    return fn(conn, *parameters)
+
+
+def _worker(fn, source, tasks, results, stop):
+    try:
+        conn, release = open_connection(source)
+    except Exception as e:
+        # Answer every task this worker picks up with the connection error so the consumer
+        # fails at the right position instead of waiting forever.
+        conn = release = None
+        error = e
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            index, parameters = task
+            if stop.is_set():
+                continue
+            if conn is None:
+                results.put((index, False, error))
+                continue
+            try:
+                results.put((index, True, call_with_parameters(fn, conn, parameters)))
+            except Exception as e:
+                results.put((index, False, e))
+    finally:
+        if release is not None:
+            release()
+
+
+def map_query(fn, source, parameters, workers=4, max_pending=None):
+    """Run a query once per parameter set, concurrently on a pool of worker threads.
+
+    Each worker thread acquires its own connection from ``source`` when it starts and releases it
+    when the map is finished. Results are yielded in the same order as ``parameters``, as soon as
+    they are available. At most ``max_pending`` parameter sets are executing or waiting to be
+    yielded at any time, so ``parameters`` may be a long or unbounded iterator.
+
+    Args:
+        fn (callable): The query function, called as ``fn(conn, *args, **kwargs)``.
+        source (object): A connection pool or connection factory, see :func:`open_connection`.
+        parameters (iterable): Parameter sets. Mappings are passed as keyword arguments, any
+                               other sequence as positional arguments.
+        workers (int): Number of worker threads, and connections.
+        max_pending (int): Bound on in-flight parameter sets. Defaults to ``2 * workers``.
+
+    Returns:
+        generator: The result of each query call, in order.
+
+    Example:
+        Fetch many users over four SQLite connections::
+
+            connect = functools.partial(sqlite3.connect, "blogdb.db")
+            for user in queries.get_user.map(connect, ({"userid": i} for i in ids), workers=4):
+                print(user)
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1, got {}".format(workers))
+    if max_pending is None:
+        max_pending = workers * 2
+    if max_pending < 1:
+        raise ValueError("max_pending must be at least 1, got {}".format(max_pending))
+
+    return _map_query(fn, source, iter(parameters), workers, max_pending)
+
+
+def _map_query(fn, source, parameters, workers, max_pending):
+    tasks = queue.Queue()
+    results = queue.Queue()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=_worker, args=(fn, source, tasks, results, stop))
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    submitted = 0
+    yielded = 0
+    exhausted = False
+    finished = {}
+    try:
+        while True:
+            while not exhausted and submitted - yielded < max_pending:
+                try:
+                    tasks.put((submitted, next(parameters)))
+                    submitted += 1
+                except StopIteration:
+                    exhausted = True
+
+            if exhausted and yielded == submitted:
+                return
+
+            while yielded not in finished:
+                index, ok, value = results.get()
+                finished[index] = (ok, value)
+
+            ok, value = finished.pop(yielded)
+            yielded += 1
+            if not ok:
+                raise value
+            yield value
+    finally:
+        stop.set()
+        for _ in threads:
+            tasks.put(None)
+        for thread in threads:
+            thread.join()
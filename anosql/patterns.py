@@ -5,6 +5,23 @@ query_name_definition_pattern = re.compile(r"--\s*name\s*:\s*")
 Pattern: Identifies name definition comments.
 """
 
+block_definition_bytes_pattern = re.compile(
+    r"--\s*(?P<kind>name|fragment)\s*:\s*".encode()
+)
+"""
+Pattern: Identifies query name and fragment definition comments in encoded SQL content.
+"""
+
+fragment_include_pattern = re.compile(r"\{\{\s*(?P<name>[\w-]+)\s*\}\}")
+"""
+Pattern: Identifies ``{{name}}`` fragment includes in SQL code.
+"""
+
+conditional_clause_pattern = re.compile(r"\[\[(?P<clause>.*?)\]\]", re.DOTALL)
+"""
+Pattern: Identifies ``[[ ... ]]`` conditional clauses in SQL code.
+"""
+
 empty_pattern = re.compile(r"^\s*$")
 """
 Pattern: Identifies empty lines.
@@ -20,11 +37,46 @@ doc_comment_pattern = re.compile(r"\s*--\s*(.*)$")
 Pattern: Identifies SQL comments.
 """
 
+directive_pattern = re.compile(r"^@(?P<name>[\w-]+)\s*(?::\s*(?P<value>.*))?$")
+"""
+Pattern: Identifies ``@name: value`` directives in SQL comments.
+"""
+
+duration_pattern = re.compile(r"^(?P<value>\d+(?:\.\d+)?)\s*(?P<unit>ms|s)?$")
+"""
+Pattern: Identifies durations like ``500ms`` or ``2s`` (the default unit) in directive values.
+"""
+
 var_pattern = re.compile(
     r'(?P<dblquote>"[^"]+")|'
     r"(?P<quote>\'[^\']+\')|"
-    r"(?P<lead>[^:]):(?P<var_name>[\w-]+)(?P<trail>[^:]?)"
+    r"(?P<lead>[^:]):(?P<var_name>\w+)(?P<trail>)"
+)
+"""
+Pattern: Identifies variable definitions in SQL code. Names end at a minus sign, as drivers do, so
+``:page-1`` is ``page`` minus one.
+"""
+
+list_var_pattern = re.compile(
+    r'(?P<dblquote>"[^"]+")|'
+    r"(?P<quote>\'[^\']+\')|"
+    r"(?P<lead>[^:]):\*(?P<var_name>\w+)"
+)
+"""
+Pattern: Identifies ``:*name`` list variable definitions in SQL code. Names end at a minus sign,
+like those of ``var_pattern``.
+"""
+
+pyformat_var_pattern = re.compile(r"%\((?P<var_name>\w+)\)s")
+"""
+Pattern: Identifies ``%(name)s`` variables written directly in psycopg2 style.
+"""
+
+positional_placeholder_pattern = re.compile(
+    r'(?P<dblquote>"[^"]+")|'
+    r"(?P<quote>\'[^\']+\')|"
+    r"(?P<placeholder>\?|%s)"
 )
 """
-Pattern: Identifies variable definitions in SQL code.
+Pattern: Identifies ``?`` and ``%s`` positional placeholders in SQL code.
 """
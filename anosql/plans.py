@@ -0,0 +1,253 @@
+import io
+import json
+from collections import OrderedDict, namedtuple
+
+from .core import ExpandingQuery, Query, SQLOperationType
+from .patterns import positional_placeholder_pattern
+
+
+class PlanStep(namedtuple("PlanStep", ["depth", "detail", "table", "full_scan"])):
+    """A step of a query plan, as returned by a driver adapter's ``explain``.
+
+    Attributes:
+        depth (int): Nesting depth of the step in the plan tree.
+        detail (str): Description of the step, without costs or row estimates.
+        table (str): Name of the table the step reads, or ``None``.
+        full_scan (bool): Whether the step reads the whole table without an index.
+    """
+
+    __slots__ = ()
+
+
+class QueryPlan(object):
+    """The plan of a query, or the error explaining it.
+
+    Attributes:
+        query_name (str): Dot-separated name of the query.
+        steps (list(PlanStep)): The steps of the plan.
+        error (Exception): The error raised explaining the query, or ``None``.
+    """
+
+    __slots__ = ("query_name", "steps", "error")
+
+    def __init__(self, query_name, steps=(), error=None):
+        self.query_name = query_name
+        self.steps = list(steps)
+        self.error = error
+
+    @property
+    def lines(self):
+        """The steps as indented text lines, as stored in a baseline."""
+        return ["  " * step.depth + step.detail for step in self.steps]
+
+    @property
+    def full_scans(self):
+        """Names of the tables read with full scans."""
+        return [step.table for step in self.steps if step.full_scan]
+
+    def __repr__(self):
+        return "<QueryPlan {}>".format(self.query_name)
+
+
+class PlanReport(object):
+    """The result of :func:`check_plans`.
+
+    Attributes:
+        plans (OrderedDict): ``QueryPlan`` of each query, by dot-separated name.
+        large_scans (list(tuple)): ``(query_name, table, rows)`` for each full scan of a table
+                                   with at least ``min_table_rows`` rows.
+        changed (list(tuple)): ``(query_name, baseline_lines, lines)`` for each plan which differs
+                               from the baseline.
+        errors (list(tuple)): ``(query_name, error)`` for each query which could not be explained.
+    """
+
+    __slots__ = ("plans", "large_scans", "changed", "errors")
+
+    def __init__(self, plans):
+        self.plans = plans
+        self.large_scans = []
+        self.changed = []
+        self.errors = []
+
+    @property
+    def problems(self):
+        """Returns a message for every large scan, plan change and error.
+
+        Returns:
+            list(str): The messages, empty when the check passed.
+        """
+        messages = [
+            "{}: full scan of {} ({} rows)".format(query_name, table, rows)
+            for query_name, table, rows in self.large_scans
+        ]
+        for query_name, baseline_lines, lines in self.changed:
+            messages.append(
+                "{}: plan changed\n  was:\n{}\n  now:\n{}".format(
+                    query_name,
+                    "\n".join("    " + line for line in baseline_lines),
+                    "\n".join("    " + line for line in lines),
+                )
+            )
+        messages.extend(
+            "{}: could not be explained: {}".format(query_name, error)
+            for query_name, error in self.errors
+        )
+        return messages
+
+    def __repr__(self):
+        return "PlanReport(queries={}, large_scans={}, changed={}, errors={})".format(
+            len(self.plans), len(self.large_scans), len(self.changed), len(self.errors)
+        )
+
+
+def iter_queries(queries):
+    """Yields ``(query_name, query)`` for every query of a ``Queries`` object, by name."""
+    for query_name in queries.available_queries:
+        obj = queries.find_query(query_name)
+        if isinstance(obj, Query):
+            yield query_name, obj
+
+
+def placeholder_parameters(query):
+    """Returns a ``None`` value for every named parameter of a query, and one item lists for its
+    list parameters. Queries without named parameters get a tuple of a ``None`` value for every
+    ``?`` or ``%s`` placeholder.
+    """
+    if not query.parameters:
+        return (None,) * sum(
+            1
+            for match in positional_placeholder_pattern.finditer(query.sql)
+            if match.group("placeholder") is not None
+        )
+    list_parameters = query.list_parameters if isinstance(query, ExpandingQuery) else ()
+    return dict(
+        (name, [None] if name in list_parameters else None) for name in query.parameters
+    )
+
+
+def explain_query(query, conn, parameters=None):
+    """Returns the plan of a query without running it.
+
+    Args:
+        query (Query): The query, loaded with an adapter which has an ``explain`` method.
+        conn: A database connection.
+        parameters (object): Parameters of the query, a mapping for named parameters or a
+                             sequence for positional ones, or a single row for ``*!`` queries.
+                             Defaults to :func:`placeholder_parameters`.
+
+    Returns:
+        list(PlanStep): The steps of the plan.
+    """
+    if parameters is None:
+        parameters = placeholder_parameters(query)
+    if isinstance(parameters, dict):
+        sql, parameters = query._prepare((), parameters)
+    else:
+        sql, parameters = query._prepare(tuple(parameters), {})
+    return [
+        PlanStep(*step)
+        for step in query.driver_adapter.explain(conn, query.name, sql, parameters)
+    ]
+
+
+def explain_queries(queries, conn, samples=None):
+    """Explains every query of a ``Queries`` object, except ``#`` scripts.
+
+    Args:
+        queries (Queries): The loaded queries.
+        conn: A database connection.
+        samples (dict): Parameters to explain queries with, by dot-separated query name.
+
+    Returns:
+        OrderedDict: ``QueryPlan`` of each query, by dot-separated name.
+    """
+    samples = samples or {}
+    plans = OrderedDict()
+    for query_name, query in iter_queries(queries):
+        if query.op_type == SQLOperationType.SCRIPT:
+            continue
+        try:
+            plans[query_name] = QueryPlan(
+                query_name, explain_query(query, conn, samples.get(query_name))
+            )
+        except Exception as e:
+            plans[query_name] = QueryPlan(query_name, error=e)
+    return plans
+
+
+def load_baseline(path):
+    """Reads a baseline file written by :func:`save_baseline`.
+
+    Returns:
+        dict: Plan lines by dot-separated query name.
+    """
+    with io.open(path, encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def save_baseline(plans, path):
+    """Writes the plans of queries to a baseline file, for later :func:`check_plans`.
+
+    Args:
+        plans (dict): ``QueryPlan`` by query name, from :func:`explain_queries` or
+                      ``PlanReport.plans``. Queries which could not be explained are left out.
+        path (str): Path of the JSON baseline file.
+    """
+    baseline = OrderedDict(
+        (query_name, plan.lines) for query_name, plan in plans.items() if plan.error is None
+    )
+    with io.open(path, "w", encoding="utf-8") as fp:
+        fp.write(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+def check_plans(queries, conn, samples=None, baseline=None, min_table_rows=1000):
+    """Checks the plans of every query for full scans of large tables and for plan changes.
+
+    Queries are explained, not run, with parameters from ``samples`` or with placeholder ``None``
+    values. SQLite plans rarely depend on parameter values, but PostgreSQL plans do, so give
+    realistic samples when checking against PostgreSQL.
+
+    Args:
+        queries (Queries): The loaded queries, for example from ``anosql.from_path`` on a
+                           directory of SQL files.
+        conn: A database connection, with the schema and representative data.
+        samples (dict): Parameters to explain queries with, by dot-separated query name.
+        baseline (object): Plan lines by query name, or the path of a baseline file, see
+                           :func:`save_baseline`. Queries missing from it are not compared.
+        min_table_rows (int): Smallest table, in rows, reported when read with a full scan.
+
+    Returns:
+        PlanReport: The plans and the problems found.
+
+    Example:
+        Fail a test when a query starts scanning a large table or changes plan::
+
+            def test_query_plans(conn):
+                queries = anosql.from_path("sql", "sqlite3")
+                report = check_plans(queries, conn, baseline="tests/plans.json")
+                assert not report.problems, "\\n".join(report.problems)
+    """
+    if isinstance(baseline, str):
+        baseline = load_baseline(baseline)
+    report = PlanReport(explain_queries(queries, conn, samples))
+
+    driver_adapters = dict(
+        (query_name, query.driver_adapter) for query_name, query in iter_queries(queries)
+    )
+    table_rows = {}
+    for query_name, plan in report.plans.items():
+        if plan.error is not None:
+            report.errors.append((query_name, plan.error))
+            continue
+
+        for table in OrderedDict.fromkeys(plan.full_scans):
+            if table not in table_rows:
+                table_rows[table] = driver_adapters[query_name].count_rows(conn, table)
+            rows = table_rows[table]
+            if rows is not None and rows >= min_table_rows:
+                report.large_scans.append((query_name, table, rows))
+
+        if baseline is not None and query_name in baseline:
+            if baseline[query_name] != plan.lines:
+                report.changed.append((query_name, baseline[query_name], plan.lines))
+    return report
@@ -0,0 +1,54 @@
+import gc
+
+from .core import from_path
+
+
+def freeze_gc():
+    """Moves every object tracked by the garbage collector to its permanent generation.
+
+    Collections in forked children then never write to the objects of the parent, which keeps
+    their memory pages shared. Does nothing on Pythons without ``gc.freeze`` (before 3.7).
+
+    Returns:
+        bool: Whether the objects were frozen.
+    """
+    freeze = getattr(gc, "freeze", None)
+    if freeze is None:
+        return False
+    freeze()
+    return True
+
+
+def preload(sql_path, driver_name, freeze_objects=True):
+    """Loads queries in the parent process of a pre-fork server, for its workers to share.
+
+    The queries are loaded and frozen, so no worker can change them, and with ``freeze_objects``
+    everything the parent has allocated so far is moved out of reach of the garbage collector
+    with :func:`freeze_gc`. Call it last thing before the workers are forked.
+
+    For the most sharing, also disable the garbage collector early in the parent with
+    ``gc.disable()``, so it leaves no freed holes in pages that are shared later, and enable it
+    again first thing in each worker.
+
+    Args:
+        sql_path (str): Path to a ``.sql`` file or directory containing ``.sql`` files.
+        driver_name (str): The database driver to use to load and execute queries.
+        freeze_objects (bool): Whether to call :func:`freeze_gc` after loading.
+
+    Returns:
+        Queries: The frozen queries.
+
+    Example:
+        With gunicorn and ``preload_app = True``, in the application module::
+
+            queries = anosql.preload.preload("sql", "psycopg2")
+
+        and in the gunicorn configuration::
+
+            def post_fork(server, worker):
+                gc.enable()
+    """
+    queries = from_path(sql_path, driver_name).freeze()
+    if freeze_objects:
+        freeze_gc()
+    return queries
@@ -0,0 +1,123 @@
+import random
+import time
+
+from .core import get_driver_adapter
+
+
+class RetryPolicy(object):
+    """How often, and how long apart, to run something again which failed with a transient error.
+
+    The delay before attempt ``n + 1`` is drawn at random between zero and
+    ``min(max_delay, base_delay * multiplier ** (n - 1))``, so clients which failed together don't
+    retry together.
+
+    Args:
+        attempts (int): Most attempts, including the first.
+        base_delay (float): Upper bound in seconds of the delay before the second attempt.
+        max_delay (float): Upper bound in seconds of any delay.
+        multiplier (float): Growth of the upper bound per attempt.
+
+    Example:
+        Retry the ``@idempotent`` queries up to five times::
+
+            queries.set_retry_policy(RetryPolicy(attempts=5))
+    """
+
+    def __init__(self, attempts=3, base_delay=0.01, max_delay=1.0, multiplier=2.0):
+        if attempts < 1:
+            raise ValueError("attempts must be at least 1, got {}".format(attempts))
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    def __repr__(self):
+        return "RetryPolicy(attempts={}, base_delay={}, max_delay={}, multiplier={})".format(
+            self.attempts, self.base_delay, self.max_delay, self.multiplier
+        )
+
+    def backoff(self, attempt):
+        """Returns the seconds to wait after the failed attempt number ``attempt``, from 1."""
+        bound = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return random.uniform(0, bound)
+
+    def run(self, fn, is_transient, on_retry=None):
+        """Calls ``fn`` until it returns, fails with an error which isn't transient, or has been
+        called ``attempts`` times.
+
+        Args:
+            fn (callable): Called without arguments.
+            is_transient (callable): Called with an error raised by ``fn``, returns whether
+                                     calling ``fn`` again may succeed.
+            on_retry (callable): Called with the number of the failed attempt, its error and the
+                                 delay before the next attempt, or ``None``.
+
+        Returns:
+            object: What ``fn`` returned.
+        """
+        attempt = 1
+        while True:
+            try:
+                return fn()
+            except Exception as error:
+                if attempt >= self.attempts or not is_transient(error):
+                    raise
+                delay = self.backoff(attempt)
+                if on_retry is not None:
+                    on_retry(attempt, error, delay)
+                time.sleep(delay)
+                attempt += 1
+
+
+def retry_transaction(conn, fn, driver_name, policy=None, on_retry=None):
+    """Runs ``fn(conn)`` in a transaction, running it again from the start when it fails with a
+    transient error.
+
+    In PostgreSQL a serialization failure or deadlock aborts the whole transaction, so it's the
+    transaction rather than the failing statement which has to be run again. ``fn`` must only
+    change the database, as it may run several times.
+
+    The transaction is committed with ``conn.commit()`` and rolled back with ``conn.rollback()``,
+    or run in a ``with conn:`` block for connections without them, like ``apsw`` ones.
+
+    Args:
+        conn: A database connection, or a ``ConnectionRouter``.
+        fn (callable): Called with the connection, runs the queries of the transaction.
+        driver_name (str): The driver whose adapter tells which errors are transient.
+        policy (RetryPolicy): How to retry, ``RetryPolicy()`` by default.
+        on_retry (callable): Called with the number of the failed attempt, its error and the delay
+                             before the next attempt, to count retries.
+
+    Returns:
+        object: What ``fn`` returned.
+
+    Example:
+        Move a blog to another user::
+
+            def move(conn):
+                queries.remove_blog(conn, blogid=blogid)
+                return queries.publish_blog(conn, userid=userid, **blog)
+
+            retry_transaction(conn, move, "psycopg2")
+    """
+    driver_adapter = get_driver_adapter(driver_name)
+    if policy is None:
+        policy = RetryPolicy()
+    return policy.run(
+        lambda: _transaction(conn, fn),
+        lambda error: driver_adapter.is_transient_error(conn, error),
+        on_retry,
+    )
+
+
+def _transaction(conn, fn):
+    if not hasattr(conn, "commit"):
+        with conn:
+            return fn(conn)
+    try:
+        result = fn(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result
@@ -0,0 +1,74 @@
+import itertools
+import threading
+import time
+
+from .core import ConnectionRouter, SQLOperationType
+
+try:
+    from time import monotonic
+except ImportError:  # Python 2
+    monotonic = time.time
+
+
+READ_OP_TYPES = frozenset([SQLOperationType.SELECT, SQLOperationType.SELECT_ONE_ROW])
+"""Operation types which only read, and can run on a replica."""
+
+
+class ReadWriteRouter(ConnectionRouter):
+    """Sends reads to replica connections and everything else to the primary connection.
+
+    Pass the router to query methods in place of a connection. Select queries (the plain and ``?``
+    operators, including ``<name>_cursor`` and ``<name>_pages``) run on the replicas in turn, all
+    other queries run on the primary.
+
+    Replicas usually lag behind the primary. For ``read_your_writes`` seconds after a thread
+    sends a query to the primary, the reads of that thread go to the primary too, so it sees its
+    own changes.
+
+    The router commits, rolls back, and works as a context manager like the primary connection.
+
+    Args:
+        primary: Connection to the primary database.
+        replicas (list): Connections to the replica databases. Reads use the primary when empty.
+        read_your_writes (float): Seconds a thread keeps reading from the primary after a write.
+
+    Example:
+        Scale reads over two replicas::
+
+            router = ReadWriteRouter(primary, [replica1, replica2], read_your_writes=1.0)
+            queries.publish_blog(router, userid=1, title="Hi", content="...")
+            router.commit()
+            queries.get_user_blogs(router, userid=1)  # runs on the primary, for a second
+    """
+
+    def __init__(self, primary, replicas=(), read_your_writes=0.0):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.read_your_writes = read_your_writes
+        self._replica_cycle = itertools.cycle(self.replicas)
+        self._local = threading.local()
+
+    def route(self, query):
+        if query.op_type not in READ_OP_TYPES:
+            self._local.last_write = monotonic()
+            return self.primary
+        if not self.replicas:
+            return self.primary
+        if self.read_your_writes > 0:
+            last_write = getattr(self._local, "last_write", None)
+            if last_write is not None and monotonic() - last_write < self.read_your_writes:
+                return self.primary
+        return next(self._replica_cycle)
+
+    def commit(self):
+        self.primary.commit()
+
+    def rollback(self):
+        self.primary.rollback()
+
+    def __enter__(self):
+        self.primary.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.primary.__exit__(exc_type, exc_value, traceback)
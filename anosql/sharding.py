@@ -0,0 +1,272 @@
+import heapq
+import itertools
+import threading
+
+from .core import Queries, Query, SQLOperationType
+from .parallel import call_with_parameters, open_connection
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+
+_READ_OP_TYPES = (SQLOperationType.SELECT, SQLOperationType.SELECT_ONE_ROW)
+
+
+class ShardedQueries(object):
+    """Runs the queries of a ``Queries`` object against many database shards with the same schema.
+
+    Every query of the wrapped ``Queries`` is available with the same dot-separated name, but
+    called without a connection. A routed call picks the shard with ``shard_key`` and runs the
+    query on a connection from that shard's connection source. Select queries can also be run on
+    every shard at once with ``gather``.
+
+    Args:
+        queries (Queries): The loaded queries.
+        shards (dict): Connection source of each shard, by shard id. A connection source is a pool
+                       with ``getconn()`` and ``putconn(conn)`` methods, or a callable returning a
+                       new connection, see :func:`anosql.parallel.open_connection`.
+        shard_key (callable): Called with the keyword arguments (or the positional arguments when
+                              there are none) of a routed call, returns the id of the shard to use.
+
+    Example:
+        Route user queries by user id, and list users from all shards::
+
+            shards = {
+                i: functools.partial(sqlite3.connect, "users-{}.db".format(i)) for i in range(4)
+            }
+            sharded = ShardedQueries(queries, shards, lambda params: params["userid"] % 4)
+
+            sharded.users.get_by_id(userid=42)
+            for user in sharded.users.get_all.gather(key=lambda row: row[0]):
+                print(user)
+    """
+
+    def __init__(self, queries, shards, shard_key):
+        self.queries = queries
+        self.shards = shards
+        self.shard_key = shard_key
+
+    def __getattr__(self, name):
+        attr = getattr(self.queries, name)
+        if isinstance(attr, Queries):
+            return ShardedQueries(attr, self.shards, self.shard_key)
+        if isinstance(attr, Query):
+            return ShardedQuery(attr, self.shards, self.shard_key)
+        raise AttributeError("Only queries can be sharded, not {}".format(name))
+
+    @property
+    def available_queries(self):
+        """Returns listing of all the available sharded queries.
+
+        Returns:
+            list(str): List of dot-separated method accessor names.
+        """
+        return [
+            name
+            for name in self.queries.available_queries
+            if isinstance(self.queries.find_query(name), Query)
+        ]
+
+    def __repr__(self):
+        return "ShardedQueries(" + self.available_queries.__repr__() + ")"
+
+
+class ShardedQuery(object):
+    """A query of ``ShardedQueries``, see there."""
+
+    def __init__(self, query, shards, shard_key):
+        self.query = query
+        self.shards = shards
+        self.shard_key = shard_key
+
+    def __repr__(self):
+        return "<ShardedQuery {}>".format(self.query.name)
+
+    def __call__(self, *args, **kwargs):
+        return self.on(self.shard_key(kwargs if kwargs else args), *args, **kwargs)
+
+    def on(self, shard, *args, **kwargs):
+        """Run the query on the given shard.
+
+        Queries other than selects are committed before the connection is released, and rolled
+        back if they fail.
+
+        Args:
+            shard: The id of the shard.
+            args: Positional parameters of the query.
+            kwargs: Named parameters of the query.
+
+        Returns:
+            The result of the query.
+        """
+        conn, release = open_connection(self.shards[shard])
+        try:
+            if self.query.op_type in _READ_OP_TYPES:
+                return self.query(conn, *args, **kwargs)
+
+            try:
+                result = self.query(conn, *args, **kwargs)
+            except Exception:
+                conn.rollback()
+                raise
+            conn.commit()
+            return result
+        finally:
+            release()
+
+    def gather(self, parameters=(), key=None, reverse=False, limit=None, batch_size=100):
+        """Run a select query on every shard concurrently and stream the rows of all shards.
+
+        Each shard is read on its own thread with the adapter's ``select_cursor``, in batches of
+        ``batch_size`` rows. Without a ``key`` rows are yielded in the order they arrive. With a
+        ``key`` the rows of each shard must already be sorted by it (usually with an ``order by``
+        in the query) and they are merged into one sorted stream.
+
+        Args:
+            parameters (object): Parameters of the query, a mapping for named parameters or a
+                                 sequence for positional ones.
+            key (callable): Sort key of a row, for a sorted merge.
+            reverse (bool): Whether the rows of every shard are sorted in descending order.
+            limit (int): Stop after this many rows.
+            batch_size (int): Rows fetched from a shard at a time.
+
+        Returns:
+            generator: Rows from all shards.
+        """
+        if self.query.op_type not in _READ_OP_TYPES:
+            raise ValueError("Only select queries can be gathered, not {}".format(self.query.name))
+        return _gather(
+            self.query, list(self.shards.values()), parameters, key, reverse, limit, batch_size
+        )
+
+
+def _put(out, item, stop):
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _scan_shard(query, source, parameters, out, stop, batch_size):
+    try:
+        conn, release = open_connection(source)
+        try:
+            if query.op_type == SQLOperationType.SELECT:
+                with call_with_parameters(query.cursor, conn, parameters) as cur:
+                    while not stop.is_set():
+                        rows = cur.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        if not _put(out, ("rows", rows), stop):
+                            return
+            else:
+                row = call_with_parameters(query, conn, parameters)
+                if row is not None:
+                    _put(out, ("rows", [row]), stop)
+        finally:
+            release()
+    except Exception as e:
+        _put(out, ("error", e), stop)
+        return
+    _put(out, ("done", None), stop)
+
+
+def _iter_shard(out):
+    while True:
+        kind, value = out.get()
+        if kind == "done":
+            return
+        if kind == "error":
+            raise value
+        for row in value:
+            yield row
+
+
+def _iter_arrivals(out, shard_count):
+    remaining = shard_count
+    while remaining:
+        kind, value = out.get()
+        if kind == "done":
+            remaining -= 1
+        elif kind == "error":
+            raise value
+        else:
+            for row in value:
+                yield row
+
+
+class _MergeEntry(object):
+    """The next row of one of the iterables merged by ``_merge``, ordered for ``heapq``."""
+
+    __slots__ = ("key", "order", "row", "rows", "reverse")
+
+    def __init__(self, key, order, row, rows, reverse):
+        self.key = key
+        self.order = order
+        self.row = row
+        self.rows = rows
+        self.reverse = reverse
+
+    def __lt__(self, other):
+        if self.key == other.key:
+            # Rows with equal keys come in the order of their iterables, like heapq.merge.
+            return self.order < other.order
+        if self.reverse:
+            return other.key < self.key
+        return self.key < other.key
+
+
+def _merge(iterables, key, reverse=False):
+    """Merges iterables each sorted by ``key`` into one sorted iterable.
+
+    Like ``heapq.merge``, whose ``key`` and ``reverse`` arguments Python 2 lacks.
+    """
+    heap = []
+    for order, rows in enumerate(iterables):
+        rows = iter(rows)
+        for row in rows:
+            heap.append(_MergeEntry(key(row), order, row, rows, reverse))
+            break
+    heapq.heapify(heap)
+    while heap:
+        entry = heap[0]
+        yield entry.row
+        for row in entry.rows:
+            heapq.heapreplace(heap, _MergeEntry(key(row), entry.order, row, entry.rows, reverse))
+            break
+        else:
+            heapq.heappop(heap)
+
+
+def _gather(query, sources, parameters, key, reverse, limit, batch_size):
+    stop = threading.Event()
+    if key is None:
+        shared = queue.Queue(maxsize=2 * len(sources))
+        outs = [shared] * len(sources)
+        rows = _iter_arrivals(shared, len(sources))
+    else:
+        outs = [queue.Queue(maxsize=2) for _ in sources]
+        rows = _merge([_iter_shard(out) for out in outs], key, reverse)
+
+    threads = [
+        threading.Thread(
+            target=_scan_shard, args=(query, source, parameters, out, stop, batch_size)
+        )
+        for source, out in zip(sources, outs)
+    ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    try:
+        for row in itertools.islice(rows, limit):
+            yield row
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
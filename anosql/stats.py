@@ -0,0 +1,268 @@
+import bisect
+import threading
+from collections import OrderedDict
+
+from .core import (
+    QueryObserver,
+    SQLOperationType,
+    query_names,
+    register_observer,
+    unregister_observer,
+)
+
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+"""Default upper bounds of the rows per call histogram buckets."""
+
+BYTE_BUCKETS = (1024, 16 * 1024, 256 * 1024, 1024 * 1024, 16 * 1024 * 1024)
+"""Default upper bounds of the bytes per call histogram buckets."""
+
+_NUMBER_SIZE = 8
+
+
+def approximate_size(row):
+    """Returns the approximate payload size of a row in bytes.
+
+    Strings and bytes count their length, ``None`` counts nothing and any other value counts
+    eight bytes. Rows are sequences of values, or mappings of column names to values.
+    """
+    values = row.values() if isinstance(row, dict) else row
+    size = 0
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, (str, bytes, bytearray)):
+            size += len(value)
+        else:
+            size += _NUMBER_SIZE
+    return size
+
+
+class QueryStats(object):
+    """Rows and bytes returned by the calls of one query.
+
+    Attributes:
+        calls (int): Calls recorded.
+        rows (int): Rows returned by all calls.
+        bytes (int): Approximate payload size of all rows returned.
+        max_rows (int): Most rows returned by one call.
+        row_counts (list(int)): Calls per rows histogram bucket, the last one for calls above
+                                every bucket.
+        byte_counts (list(int)): Calls per bytes histogram bucket, likewise.
+    """
+
+    __slots__ = ("calls", "rows", "bytes", "max_rows", "row_counts", "byte_counts")
+
+    def __init__(self, row_buckets, byte_buckets):
+        self.calls = 0
+        self.rows = 0
+        self.bytes = 0
+        self.max_rows = 0
+        self.row_counts = [0] * (len(row_buckets) + 1)
+        self.byte_counts = [0] * (len(byte_buckets) + 1)
+
+    def __repr__(self):
+        return "QueryStats(calls={}, rows={}, bytes={}, max_rows={})".format(
+            self.calls, self.rows, self.bytes, self.max_rows
+        )
+
+
+class CountingCursor(object):
+    """Wraps a driver cursor to count the rows, and optionally bytes, fetched from it.
+
+    Args:
+        cursor: The driver cursor.
+        measure (callable): Returns the size of a row, ``approximate_size`` by default, or
+                            ``None`` to only count rows.
+    """
+
+    def __init__(self, cursor, measure=approximate_size):
+        self._cursor = cursor
+        self._measure = measure
+        self.rows = 0
+        self.bytes = 0
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _count(self, rows):
+        self.rows += len(rows)
+        if self._measure is not None:
+            self.bytes += sum(self._measure(row) for row in rows)
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count((row,))
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        return self._count(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def __iter__(self):
+        measure = self._measure
+        for row in self._cursor:
+            self.rows += 1
+            if measure is not None:
+                self.bytes += measure(row)
+            yield row
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._cursor.__exit__(*exc_info)
+
+
+class StatsCollector(QueryObserver):
+    """Collects how many rows, and roughly how many bytes, each select query returns.
+
+    Once installed every select query call is recorded, by dot-separated query name when the
+    ``queries`` are given, else by bare query name. Rows read from
+    ``<name>_cursor`` cursors are counted as they are fetched and recorded when the cursor's block
+    exits. Queries which fail are not recorded.
+
+    Args:
+        row_buckets (tuple(int)): Upper bounds of the rows per call histogram buckets.
+        byte_buckets (tuple(int)): Upper bounds of the bytes per call histogram buckets.
+        queries (Queries): The queries recorded, to record their dot-separated names rather than
+                           their bare names, which queries of different child queries can share.
+
+    Example:
+        Find the queries returning the most rows::
+
+            collector = StatsCollector(queries=queries).install()
+            ...
+            stats = collector.as_dict()
+            for name in sorted(stats, key=lambda name: -stats[name]["rows"])[:10]:
+                print(name, stats[name]["rows"], stats[name]["bytes"])
+    """
+
+    def __init__(self, row_buckets=ROW_BUCKETS, byte_buckets=BYTE_BUCKETS, queries=None):
+        self.row_buckets = tuple(row_buckets)
+        self.byte_buckets = tuple(byte_buckets)
+        self._names = query_names(queries) if queries is not None else {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def install(self):
+        """Starts collecting statistics for all queries. Returns the collector."""
+        register_observer(self)
+        return self
+
+    def uninstall(self):
+        """Stops collecting statistics. Statistics collected so far are kept."""
+        unregister_observer(self)
+
+    def cursor(self, query, state, cursor):
+        return CountingCursor(cursor)
+
+    def after(self, query, state, result, error):
+        if error is not None:
+            return
+        name = self._names.get(id(query), query.name)
+        if isinstance(result, CountingCursor):
+            self.record(name, result.rows, result.bytes)
+        elif query.op_type == SQLOperationType.SELECT:
+            self.record(name, len(result), sum(approximate_size(row) for row in result))
+        elif query.op_type == SQLOperationType.SELECT_ONE_ROW:
+            if result is None:
+                self.record(name, 0, 0)
+            else:
+                self.record(name, 1, approximate_size(result))
+
+    def record(self, query_name, rows, size):
+        """Records a call of a query.
+
+        Args:
+            query_name (str): The name of the query.
+            rows (int): Rows returned.
+            size (int): Approximate payload size of the rows in bytes.
+        """
+        with self._lock:
+            stats = self._stats.get(query_name)
+            if stats is None:
+                stats = self._stats[query_name] = QueryStats(self.row_buckets, self.byte_buckets)
+            stats.calls += 1
+            stats.rows += rows
+            stats.bytes += size
+            stats.max_rows = max(stats.max_rows, rows)
+            stats.row_counts[bisect.bisect_left(self.row_buckets, rows)] += 1
+            stats.byte_counts[bisect.bisect_left(self.byte_buckets, size)] += 1
+
+    def reset(self):
+        """Forgets the statistics collected so far."""
+        with self._lock:
+            self._stats = {}
+
+    def as_dict(self):
+        """Returns the statistics of every query.
+
+        Returns:
+            dict: By query name, a dict with ``calls``, ``rows``, ``bytes``, ``max_rows``, and
+                  ``row_buckets`` and ``byte_buckets`` mapping each bucket's upper bound to the
+                  number of calls that returned at most that many, like Prometheus buckets. The
+                  last bucket's bound is ``"+Inf"``.
+        """
+        with self._lock:
+            return dict(
+                (
+                    query_name,
+                    {
+                        "calls": stats.calls,
+                        "rows": stats.rows,
+                        "bytes": stats.bytes,
+                        "max_rows": stats.max_rows,
+                        "row_buckets": _cumulative(self.row_buckets, stats.row_counts),
+                        "byte_buckets": _cumulative(self.byte_buckets, stats.byte_counts),
+                    },
+                )
+                for query_name, stats in self._stats.items()
+            )
+
+    def to_prometheus(self, prefix="anosql_query"):
+        """Returns the statistics as histograms in the Prometheus text exposition format.
+
+        Args:
+            prefix (str): Prefix of the metric names, ``<prefix>_rows`` and ``<prefix>_bytes``.
+
+        Returns:
+            str: The metrics, labelled by query name.
+        """
+        stats = self.as_dict()
+        lines = []
+        for metric, buckets, help_text in (
+            ("rows", "row_buckets", "Rows returned per query call."),
+            ("bytes", "byte_buckets", "Approximate bytes returned per query call."),
+        ):
+            name = "{}_{}".format(prefix, metric)
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} histogram".format(name))
+            for query_name in sorted(stats):
+                query_stats = stats[query_name]
+                label = _escape_label(query_name)
+                for bound, count in query_stats[buckets].items():
+                    lines.append('{}_bucket{{query="{}",le="{}"}} {}'.format(
+                        name, label, bound, count
+                    ))
+                lines.append('{}_sum{{query="{}"}} {}'.format(name, label, query_stats[metric]))
+                lines.append('{}_count{{query="{}"}} {}'.format(
+                    name, label, query_stats["calls"]
+                ))
+        return "\n".join(lines) + "\n"
+
+
+def _cumulative(buckets, counts):
+    cumulative = OrderedDict()
+    total = 0
+    for bound, count in zip(list(buckets) + ["+Inf"], counts):
+        total += count
+        cumulative[bound] = total
+    return cumulative
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,173 @@
+import threading
+
+from .core import ConnectionRouter, Queries, Query, QueryMethod
+from .parallel import open_connection
+
+
+class ThreadLocalConnections(ConnectionRouter):
+    """Gives each thread its own connection from a connection source, opened on first use.
+
+    Pass it to query methods in place of a connection, or use it through ``Queries.bind``. The
+    connection of the calling thread stays open until the thread calls ``release``, or until
+    ``close`` releases the connections of all threads.
+
+    The object commits, rolls back, and works as a context manager like the connection of the
+    calling thread.
+
+    Args:
+        source (object): A connection pool or connection factory, see
+                         :func:`anosql.parallel.open_connection`.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._local = threading.local()
+        # (connection, release function) of every thread's open connection.
+        self._open = []
+        self._lock = threading.Lock()
+
+    def connection(self):
+        """Returns the connection of the calling thread, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn, release = open_connection(self.source)
+            self._local.conn = conn
+            with self._lock:
+                self._open.append((conn, release))
+        return conn
+
+    def route(self, query):
+        return self.connection()
+
+    def release(self):
+        """Releases the connection of the calling thread, if it has one. The thread gets a new
+        connection on its next query."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            for i, (open_conn, release) in enumerate(self._open):
+                if open_conn is conn:
+                    del self._open[i]
+                    break
+            else:
+                return
+        release()
+
+    def close(self):
+        """Releases the connections of all threads.
+
+        Threads which run queries afterwards open new connections. Some drivers, like ``sqlite3``
+        unless connecting with ``check_same_thread=False``, only let the thread which opened a
+        connection close it, in which case each thread should call ``release`` instead.
+        """
+        with self._lock:
+            opened, self._open = self._open, []
+        # The other threads' locals can't be reset from here, forget connections by identity.
+        self._local = threading.local()
+        for _, release in opened:
+            release()
+
+    def commit(self):
+        self.connection().commit()
+
+    def rollback(self):
+        self.connection().rollback()
+
+    def __enter__(self):
+        self.connection().__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.connection().__exit__(exc_type, exc_value, traceback)
+
+
+class BoundQueries(object):
+    """Runs the queries of a ``Queries`` object on the connection of the calling thread.
+
+    Every query of the wrapped ``Queries`` is available with the same dot-separated name, but
+    called without a connection. Usually created with ``Queries.bind``.
+
+    Args:
+        queries (Queries): The loaded queries.
+        connections (ThreadLocalConnections): The connections of each thread.
+
+    Example:
+        Share bound queries between the threads of a web server::
+
+            queries = anosql.from_path("sql", "sqlite3").bind(
+                functools.partial(sqlite3.connect, "blog.db")
+            )
+
+            def handle(request):
+                queries.blogs.publish_blog(userid=1, title="Hi", content="...")
+                queries.commit()
+                return queries.blogs.get_user_blogs(userid=1)
+    """
+
+    def __init__(self, queries, connections):
+        self.queries = queries
+        self.connections = connections
+
+    def __getattr__(self, name):
+        attr = getattr(self.queries, name)
+        if isinstance(attr, Queries):
+            return BoundQueries(attr, self.connections)
+        if isinstance(attr, (Query, QueryMethod)):
+            return BoundQuery(attr, self.connections)
+        raise AttributeError("Only queries can be bound, not {}".format(name))
+
+    @property
+    def available_queries(self):
+        """Returns listing of all the available bound queries.
+
+        Returns:
+            list(str): List of dot-separated method accessor names.
+        """
+        return self.queries.available_queries
+
+    def commit(self):
+        """Commits the transaction of the calling thread's connection."""
+        self.connections.commit()
+
+    def rollback(self):
+        """Rolls back the transaction of the calling thread's connection."""
+        self.connections.rollback()
+
+    def release(self):
+        """Releases the connection of the calling thread, see ``ThreadLocalConnections``."""
+        self.connections.release()
+
+    def close(self):
+        """Releases the connections of all threads, see ``ThreadLocalConnections``."""
+        self.connections.close()
+
+    def __repr__(self):
+        return "BoundQueries(" + self.available_queries.__repr__() + ")"
+
+
+class BoundQuery(object):
+    """A query of ``BoundQueries``, see there."""
+
+    def __init__(self, query, connections):
+        self.query = query
+        self.connections = connections
+
+    def __repr__(self):
+        return "<BoundQuery {}>".format(self.query.__name__)
+
+    @property
+    def __doc__(self):
+        return self.query.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.query(self.connections, *args, **kwargs)
+
+    def cursor(self, *args, **kwargs):
+        """Runs a select query, see ``Query.cursor``."""
+        return self.query.cursor(self.connections, *args, **kwargs)
+
+    def pages(self, page_size, **kwargs):
+        """Reads a query declared with ``@paginate`` page by page, see ``Query.pages``."""
+        return self.query.pages(self.connections, page_size, **kwargs)
@@ -0,0 +1,47 @@
+import math
+
+try:
+    from time import perf_counter
+except ImportError:  # Python 2
+    from time import time as perf_counter
+
+__all__ = ["perf_counter", "percentile", "latency_summary"]
+
+PERCENTILES = (50, 90, 99)
+"""Percentiles reported by :func:`latency_summary`."""
+
+
+def percentile(sorted_samples, pct):
+    """Returns the nearest-rank percentile of sorted samples.
+
+    Args:
+        sorted_samples (list): Samples in ascending order.
+        pct (float): The percentile, from 0 to 100.
+
+    Returns:
+        float: The sample at that percentile, or 0.0 without samples.
+    """
+    if not sorted_samples:
+        return 0.0
+    rank = int(math.ceil(pct * len(sorted_samples) / 100.0))
+    return sorted_samples[min(max(rank, 1), len(sorted_samples)) - 1]
+
+
+def latency_summary(samples):
+    """Summarizes latency samples in seconds.
+
+    Returns:
+        dict: ``count``, ``total``, ``mean``, ``min``, ``max`` and ``p50``, ``p90``, ``p99``.
+    """
+    samples = sorted(samples)
+    total = sum(samples)
+    summary = {
+        "count": len(samples),
+        "total": total,
+        "mean": total / len(samples) if samples else 0.0,
+        "min": samples[0] if samples else 0.0,
+        "max": samples[-1] if samples else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary["p{}".format(pct)] = percentile(samples, pct)
+    return summary
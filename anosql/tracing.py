@@ -0,0 +1,175 @@
+from collections import namedtuple
+
+from .core import QueryObserver, SQLOperationType, register_observer, unregister_observer
+from .stats import CountingCursor
+from .timing import perf_counter
+
+OP_TYPE_NAMES = dict(
+    (value, name.lower())
+    for name, value in vars(SQLOperationType).items()
+    if not name.startswith("_")
+)
+"""Names of the ``SQLOperationType`` values, as reported in spans."""
+
+
+class FinishedSpan(
+    namedtuple("FinishedSpan", ["name", "op_type", "source", "rows", "duration", "error"])
+):
+    """A query call recorded by ``InMemoryExporter``.
+
+    Attributes:
+        name (str): The name of the query.
+        op_type (str): The name of its ``SQLOperationType``, like ``select``.
+        source (QuerySource): Where the query was defined, or ``None``.
+        rows (int): Rows returned by a select query, or ``None``.
+        duration (float): Seconds the call took, up to the end of the block for cursors.
+        error (Exception): The error raised, or ``None``.
+    """
+
+    __slots__ = ()
+
+
+def span_attributes(query):
+    """Returns the attributes describing a query in a span."""
+    attributes = {
+        "db.anosql.query": query.name,
+        "db.anosql.op_type": OP_TYPE_NAMES.get(query.op_type, str(query.op_type)),
+    }
+    source = query.source
+    if source is not None:
+        if source.path is not None:
+            attributes["code.filepath"] = source.path
+        attributes["code.lineno"] = source.lineno
+    return attributes
+
+
+class NoopExporter(object):
+    """Exporter which records nothing. ``TracingObserver.install`` doesn't register itself with
+    it, so queries run as fast as untraced ones.
+    """
+
+    def start(self, query):
+        return None
+
+    def finish(self, span, rows, error):
+        pass
+
+
+class InMemoryExporter(object):
+    """Exporter which keeps the spans of finished calls in memory, for tests.
+
+    Attributes:
+        spans (list(FinishedSpan)): The spans, in the order the calls finished.
+    """
+
+    def __init__(self):
+        self.spans = []
+
+    def start(self, query):
+        return query, perf_counter()
+
+    def finish(self, span, rows, error):
+        query, started = span
+        self.spans.append(FinishedSpan(
+            query.name,
+            OP_TYPE_NAMES.get(query.op_type, str(query.op_type)),
+            query.source,
+            rows,
+            perf_counter() - started,
+            error,
+        ))
+
+    def clear(self):
+        """Forgets the spans recorded so far."""
+        self.spans = []
+
+
+class OpenTelemetryExporter(object):
+    """Exporter which creates OpenTelemetry client spans, when ``opentelemetry-api`` is installed.
+
+    Spans are started in the current context, so they're children of the span active when the
+    query is called.
+
+    Args:
+        tracer: An OpenTelemetry tracer, ``opentelemetry.trace.get_tracer("anosql")`` by default.
+    """
+
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer("anosql")
+
+    def start(self, query):
+        return self.tracer.start_span(
+            query.name, kind=self._trace.SpanKind.CLIENT, attributes=span_attributes(query)
+        )
+
+    def finish(self, span, rows, error):
+        if rows is not None:
+            span.set_attribute("db.response.returned_rows", rows)
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, str(error)))
+        span.end()
+
+
+def default_exporter():
+    """Returns an ``OpenTelemetryExporter`` if OpenTelemetry is installed, or a ``NoopExporter``."""
+    try:
+        return OpenTelemetryExporter()
+    except ImportError:
+        return NoopExporter()
+
+
+class TracingObserver(QueryObserver):
+    """Creates a span for every query call and ``<name>_cursor`` block.
+
+    Spans carry the query name, operation type and source location, and for select queries the
+    rows returned. Exporters implement ``start(query)``, returning a span, and
+    ``finish(span, rows, error)``.
+
+    Args:
+        exporter: Where spans go, ``default_exporter()`` by default.
+
+    Example:
+        Record the spans of a test::
+
+            exporter = InMemoryExporter()
+            observer = TracingObserver(exporter).install()
+            queries.get_user_blogs(conn, userid=1)
+            observer.uninstall()
+            assert [span.name for span in exporter.spans] == ["get_user_blogs"]
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter if exporter is not None else default_exporter()
+
+    def install(self):
+        """Starts tracing all queries, unless the exporter is a ``NoopExporter``. Returns the
+        observer.
+        """
+        if not isinstance(self.exporter, NoopExporter):
+            register_observer(self)
+        return self
+
+    def uninstall(self):
+        """Stops tracing."""
+        unregister_observer(self)
+
+    def before(self, query, parameters):
+        return self.exporter.start(query)
+
+    def cursor(self, query, state, cursor):
+        return CountingCursor(cursor, measure=None)
+
+    def after(self, query, state, result, error):
+        rows = None
+        if error is None:
+            if isinstance(result, CountingCursor):
+                rows = result.rows
+            elif query.op_type == SQLOperationType.SELECT:
+                rows = len(result)
+            elif query.op_type == SQLOperationType.SELECT_ONE_ROW:
+                rows = 0 if result is None else 1
+        self.exporter.finish(state, rows, error)
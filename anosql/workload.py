@@ -0,0 +1,340 @@
+import io
+import json
+import threading
+import time
+from collections import namedtuple
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping
+
+from .core import (
+    Query,
+    QueryMethod,
+    QueryObserver,
+    SQLOperationType,
+    query_names,
+    register_observer,
+    unregister_observer,
+)
+from .parallel import open_connection
+from .timing import latency_summary, perf_counter
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+
+class WorkloadCall(
+    namedtuple("WorkloadCall", ["timestamp", "duration", "name", "args", "kwargs", "error"])
+):
+    """A query call read from a workload file.
+
+    Attributes:
+        timestamp (float): When the call started, in seconds since the epoch.
+        duration (float): Seconds the call took when it was recorded.
+        name (str): Dot-separated name of the query, ending with ``_cursor`` for cursor calls.
+        args (list): Positional arguments after the connection.
+        kwargs (dict): Keyword arguments.
+        error (str): Name of the error the call raised, or ``None``.
+    """
+
+    __slots__ = ()
+
+
+def _redacted(value):
+    """Returns a stand-in for a redacted value: as many ``x`` for strings, else ``None``."""
+    if isinstance(value, str):
+        return "x" * len(value)
+    return None
+
+
+def _redact_values(values, names, parameters):
+    """Redacts the named values of a mapping, or of a sequence of values of the ``parameters``."""
+    if isinstance(values, Mapping):
+        return dict(
+            (name, _redacted(value) if name in names else value) for name, value in values.items()
+        )
+    return [
+        _redacted(value) if i < len(parameters) and parameters[i] in names else value
+        for i, value in enumerate(values)
+    ]
+
+
+def _redact_names(names):
+    names = frozenset(names)
+
+    def redact(query, args, kwargs):
+        if query.op_type == SQLOperationType.INSERT_UPDATE_DELETE_MANY and args:
+            rows = [_redact_values(row, names, query.parameters) for row in args[0]]
+            args = [rows] + list(args[1:])
+        else:
+            # Positional values bind to the named parameters in order of first appearance.
+            args = _redact_values(args, names, query.parameters)
+        return args, _redact_values(kwargs, names, ())
+
+    return redact
+
+
+class WorkloadRecorder(QueryObserver):
+    """Appends every query call to a workload file, for ``replay`` to run again.
+
+    Each call is a line of JSON: ``[timestamp, duration, name, args, kwargs]``, with the name of the
+    error as a sixth item for calls which failed. Parameter values JSON can't represent are stored
+    as strings. ``*!`` calls are only recorded when their rows are a list or tuple, since other
+    iterables can only be read once.
+
+    Args:
+        path (str): The workload file, appended to.
+        queries (Queries): The queries recorded, to record their dot-separated names rather than
+                           their bare names.
+        redact: Names of parameters whose values aren't recorded, or a function called with the
+                query name, args and kwargs, returning the args and kwargs to record. Names are
+                matched in keyword arguments, in the rows of ``*!`` calls, and in positional
+                arguments of queries with named parameters. Positional values of queries without
+                named parameters can't be matched and need a function. Redacted strings are
+                recorded as as many ``x``, so replayed rows keep their size, and other values as
+                ``null``.
+
+    Example:
+        Record a production workload without passwords::
+
+            recorder = WorkloadRecorder("workload.jsonl", queries, redact=["password"]).install()
+    """
+
+    def __init__(self, path, queries=None, redact=None):
+        self.path = path
+        self._names = query_names(queries) if queries is not None else {}
+        if redact is None or callable(redact):
+            self._redact = redact
+            self._redact_names = None
+        else:
+            self._redact = None
+            self._redact_names = _redact_names(redact)
+        self._fp = None
+        self._lock = threading.Lock()
+
+    def install(self):
+        """Opens the workload file and starts recording all queries. Returns the recorder."""
+        # Line buffered, so calls recorded before the process dies are in the file.
+        self._fp = io.open(self.path, "a", encoding="utf-8", buffering=1)
+        register_observer(self)
+        return self
+
+    def uninstall(self):
+        """Stops recording and closes the workload file."""
+        unregister_observer(self)
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+
+    def before(self, query, parameters):
+        # Timestamp, start, name, args and kwargs, filled in by the other methods.
+        return [time.time(), perf_counter(), self._names.get(id(query), query.name), None, None]
+
+    def arguments(self, query, state, args, kwargs):
+        if (
+            query.op_type == SQLOperationType.INSERT_UPDATE_DELETE_MANY
+            and args
+            and not isinstance(args[0], (list, tuple))
+        ):
+            return
+        if self._redact_names is not None:
+            args, kwargs = self._redact_names(query, args, kwargs)
+        elif self._redact is not None:
+            args, kwargs = self._redact(state[2], args, kwargs)
+        state[3] = list(args)
+        state[4] = kwargs
+
+    def cursor(self, query, state, cursor):
+        state[2] += "_cursor"
+        return cursor
+
+    def after(self, query, state, result, error):
+        timestamp, started, name, args, kwargs = state
+        if args is None:
+            return
+        entry = [round(timestamp, 6), round(perf_counter() - started, 6), name, args, kwargs]
+        if error is not None:
+            entry.append(type(error).__name__)
+        line = json.dumps(entry, default=str, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._fp is not None:
+                self._fp.write(line)
+
+
+def read_workload(path):
+    """Reads the calls of a workload file, in the order they were recorded.
+
+    Args:
+        path (str): The workload file.
+
+    Returns:
+        generator: ``WorkloadCall`` tuples.
+    """
+    with io.open(path, encoding="utf-8") as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            error = entry[5] if len(entry) > 5 else None
+            yield WorkloadCall(entry[0], entry[1], entry[2], entry[3], entry[4], error)
+
+
+class ReplayReport(object):
+    """The results of replaying a workload.
+
+    Attributes:
+        elapsed (float): Seconds the replay took.
+        queries (dict): By query name, the ``latency_summary`` of its calls, with the number of
+                        ``errors``.
+        lag (dict): ``latency_summary`` of how late calls started compared to the workload's
+                    schedule, for telling whether the database kept up.
+    """
+
+    __slots__ = ("elapsed", "queries", "lag")
+
+    def __init__(self, elapsed, queries, lag):
+        self.elapsed = elapsed
+        self.queries = queries
+        self.lag = lag
+
+    @property
+    def calls(self):
+        """Number of calls replayed."""
+        return sum(summary["count"] for summary in self.queries.values())
+
+    @property
+    def errors(self):
+        """Number of calls which failed."""
+        return sum(summary["errors"] for summary in self.queries.values())
+
+    @property
+    def throughput(self):
+        """Calls per second."""
+        return self.calls / self.elapsed if self.elapsed else 0.0
+
+
+def _resolve(queries, name):
+    """Returns the query of a workload call name, and whether it's a cursor call."""
+    obj = queries.find_query(name)
+    if isinstance(obj, Query):
+        return obj, False
+    if isinstance(obj, QueryMethod) and obj.method == "cursor":
+        return obj.query, True
+    raise LookupError("Unknown query in workload: {}".format(name))
+
+
+def _run_call(query, cursor, conn, call):
+    if cursor:
+        with query.cursor(conn, *call.args, **call.kwargs) as cur:
+            cur.fetchall()
+        return
+    query(conn, *call.args, **call.kwargs)
+    if query.op_type not in (SQLOperationType.SELECT, SQLOperationType.SELECT_ONE_ROW):
+        if hasattr(conn, "commit"):
+            conn.commit()
+
+
+def _replay_worker(source, tasks, schedule, results, lock, failures):
+    try:
+        conn, release = open_connection(source)
+    except Exception as e:
+        failures.append(e)
+        return
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            query, cursor, call, due = task
+            wait = due - (perf_counter() - schedule[0])
+            if wait > 0:
+                time.sleep(wait)
+            started = perf_counter()
+            failed = False
+            try:
+                _run_call(query, cursor, conn, call)
+            except Exception:
+                failed = True
+                if hasattr(conn, "rollback"):
+                    conn.rollback()
+            finished = perf_counter()
+            with lock:
+                samples, lags, errors = results.setdefault(call.name, ([], [], [0]))
+                samples.append(finished - started)
+                lags.append(max(0.0, started - schedule[0] - due))
+                errors[0] += failed
+    finally:
+        release()
+
+
+def replay(path, queries, source, concurrency=1, speed=1.0):
+    """Runs the calls of a workload file again, on the same schedule or faster.
+
+    Calls start in the recorded order, each at its recorded offset from the first call divided by
+    ``speed``, on one of ``concurrency`` connections. With a ``speed`` of 0 they run as fast as
+    the connections allow. Writes are committed after each call, and calls which fail are rolled
+    back and counted as errors.
+
+    Args:
+        path (str): The workload file, see ``WorkloadRecorder``.
+        queries (Queries): The queries to run, loaded for the target database.
+        source (object): A connection pool or connection factory, see
+                         :func:`anosql.parallel.open_connection`.
+        concurrency (int): Number of connections running calls at the same time.
+        speed (float): Speed multiplier of the schedule, or 0 for no schedule.
+
+    Returns:
+        ReplayReport: Latency percentiles and errors by query name.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1, got {}".format(concurrency))
+    if speed < 0:
+        raise ValueError("speed must not be negative, got {}".format(speed))
+    calls = list(read_workload(path))
+    calls.sort(key=lambda call: call.timestamp)
+
+    tasks = queue.Queue()
+    resolved = {}
+    first = calls[0].timestamp if calls else 0.0
+    for call in calls:
+        if call.name not in resolved:
+            resolved[call.name] = _resolve(queries, call.name)
+        query, cursor = resolved[call.name]
+        due = (call.timestamp - first) / speed if speed else 0.0
+        tasks.put((query, cursor, call, due))
+    for _ in range(concurrency):
+        tasks.put(None)
+
+    results = {}
+    failures = []
+    lock = threading.Lock()
+    # The start of the schedule, set just before the workers start.
+    schedule = [0.0]
+    threads = [
+        threading.Thread(
+            target=_replay_worker, args=(source, tasks, schedule, results, lock, failures)
+        )
+        for _ in range(concurrency)
+    ]
+    schedule[0] = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = perf_counter() - schedule[0]
+    if failures:
+        raise failures[0]
+
+    summaries = {}
+    all_lags = []
+    for name, (samples, lags, errors) in results.items():
+        summary = latency_summary(samples)
+        summary["errors"] = errors[0]
+        summaries[name] = summary
+        all_lags.extend(lags)
+    return ReplayReport(elapsed, summaries, latency_summary(all_lags))
@@ -0,0 +1,48 @@
+"""Measure how long ``import anosql`` takes in a fresh interpreter.
+
+Each statement runs in a new interpreter, after a first run to write the bytecode caches, and the
+fastest of the runs is reported. ``eager adapters`` imports every builtin adapter, as importing
+``anosql`` used to.
+
+Usage::
+
+    python benchmarks/import_time.py [number_of_runs]
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = [
+    ("import anosql", "import anosql"),
+    (
+        "first sqlite3 query",
+        "import anosql; anosql.from_str('-- name: q\\nselect 1;', 'sqlite3')",
+    ),
+    (
+        "eager adapters",
+        "import anosql, anosql.adapters.apsw, anosql.adapters.psycopg, "
+        "anosql.adapters.sqlite3",
+    ),
+]
+
+TIMER = "from timeit import default_timer as t; s = t(); {}; print(t() - s)"
+
+
+def time_statement(statement, runs):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    command = [sys.executable, "-c", TIMER.format(statement)]
+    subprocess.check_output(command, env=env)
+    return min(float(subprocess.check_output(command, env=env)) for _ in range(runs))
+
+
+def main(runs):
+    print("{:<22} {:>8}".format("ms", "min"))
+    for name, statement in STATEMENTS:
+        print("{:<22} {:>8.2f}".format(name, time_statement(statement, runs) * 1e3))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
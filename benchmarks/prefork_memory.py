@@ -0,0 +1,110 @@
+"""Measure the private memory of pre-forked workers using many queries.
+
+Each mode runs in a fresh interpreter which forks the workers. Every worker touches all queries,
+runs a full garbage collection, and reports the memory it no longer shares with the parent
+(``Private_Clean`` + ``Private_Dirty`` of ``/proc/self/smaps_rollup``, Linux only).
+
+Modes:
+
+* ``load-after-fork``: every worker loads the queries itself.
+* ``load-before-fork``: the parent loads the queries, the workers share them.
+* ``preload``: the parent uses ``anosql.preload.preload``, with the collector disabled early in
+  the parent and enabled again in the workers.
+
+Usage::
+
+    python benchmarks/prefork_memory.py [number_of_queries] [number_of_workers]
+"""
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+
+MODES = ("load-after-fork", "load-before-fork", "preload")
+
+
+def build_sql(count):
+    return "\n".join(
+        "-- name: get-item-{0}\n-- Get item {0}.\n"
+        "select id, value, updated from items_{0} where id = :id and value <> :value;\n".format(i)
+        for i in range(count)
+    )
+
+
+def private_kib():
+    private = 0
+    with open("/proc/self/smaps_rollup") as fp:
+        for line in fp:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                private += int(line.split()[1])
+    return private
+
+
+def touch(queries):
+    total = 0
+    for name in queries.available_queries:
+        total += len(getattr(queries, name).sql)
+    return total
+
+
+def run_mode(mode, sql_path, workers):
+    if mode == "preload":
+        gc.disable()
+    import anosql
+    import anosql.preload
+
+    queries = None
+    if mode == "load-before-fork":
+        queries = anosql.from_path(sql_path, "sqlite3")
+    elif mode == "preload":
+        queries = anosql.preload.preload(sql_path, "sqlite3")
+
+    pids = []
+    read_fd, write_fd = os.pipe()
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            gc.enable()
+            worker_queries = queries or anosql.from_path(sql_path, "sqlite3")
+            touch(worker_queries)
+            gc.collect()
+            os.write(write_fd, "{}\n".format(private_kib()).encode())
+            os._exit(0)
+        pids.append(pid)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as fp:
+        results = [int(line) for line in fp]
+    for pid in pids:
+        os.waitpid(pid, 0)
+    print(sum(results) / len(results))
+
+
+def main(count, workers):
+    with tempfile.NamedTemporaryFile("w", suffix=".sql", delete=False) as fp:
+        fp.write(build_sql(count))
+    try:
+        print("{} queries, {} workers".format(count, workers))
+        print("{:<18} {:>22}".format("mode", "private KiB / worker"))
+        for mode in MODES:
+            output = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), "--mode", mode, fp.name, str(workers)],
+                env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(
+                    os.path.abspath(__file__)
+                ))),
+            )
+            print("{:<18} {:>22.0f}".format(mode, float(output)))
+    finally:
+        os.unlink(fp.name)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--mode"]:
+        run_mode(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+        )
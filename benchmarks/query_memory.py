@@ -0,0 +1,49 @@
+"""Measure the memory retained per loaded query.
+
+Usage::
+
+    python benchmarks/query_memory.py [number_of_queries]
+"""
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import anosql  # noqa: E402
+
+
+def build_sql(count):
+    parts = []
+    for i in range(count):
+        if i % 2:
+            parts.append(
+                "-- name: get-item-{0}\n-- Get item {0}.\n"
+                "select * from items where id = :id;\n".format(i)
+            )
+        else:
+            parts.append(
+                "-- name: set-item-{0}!\n-- Set item {0}.\n"
+                "update items set value = :value where id = :id;\n".format(i)
+            )
+    return "\n".join(parts)
+
+
+def main(count):
+    sql = build_sql(count)
+    anosql.from_str(sql, "sqlite3")  # warm up imports and caches
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    queries = anosql.from_str(sql, "sqlite3")
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print("queries loaded:     {}".format(count))
+    print("methods available:  {}".format(len(queries.available_queries)))
+    print("bytes per query:    {:.0f}".format((after - before) / count))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,127 @@
+"""Compare the per-call overhead of the ``sqlite3`` and ``apsw`` driver adapters.
+
+Both adapters run the blogdb test queries against copies of the same database file.
+
+Usage::
+
+    python benchmarks/sqlite_adapters.py [number_of_calls]
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import anosql  # noqa: E402
+from anosql.timing import latency_summary, perf_counter  # noqa: E402
+from tests.conftest import populate_sqlite3_db  # noqa: E402
+
+SQL_PATH = os.path.join(ROOT, "tests", "blogdb", "sql")
+
+
+def connect_sqlite3(path):
+    return sqlite3.connect(path)
+
+
+def connect_apsw(path):
+    import apsw
+
+    return apsw.Connection(path)
+
+
+@contextmanager
+def transaction(conn):
+    """Runs writes in one transaction, implicit with ``sqlite3`` and explicit with ``apsw``."""
+    if isinstance(conn, sqlite3.Connection):
+        yield
+        conn.commit()
+    else:
+        with conn:
+            yield
+
+
+def time_adapter(driver_name, connect, db_path, number):
+    queries = anosql.from_path(SQL_PATH, driver_name)
+    conn = connect(db_path)
+    results = []
+    try:
+        for name, workload in _workloads(queries, conn, number):
+            workload()  # warm up statement caches
+            samples = []
+            for _ in range(5):
+                started = perf_counter()
+                workload()
+                samples.append(perf_counter() - started)
+            results.append((name, latency_summary(samples)["min"] / number))
+    finally:
+        conn.close()
+    return results
+
+
+def _workloads(queries, conn, number):
+    def select():
+        for _ in range(number):
+            queries.blogs.get_user_blogs(conn, userid=1)
+
+    def delete():
+        with transaction(conn):
+            for _ in range(number):
+                queries.blogs.remove_blog(conn, blogid=-1)
+
+    def select_cursor():
+        for _ in range(number):
+            with queries.blogs.get_user_blogs_cursor(conn, userid=1) as cur:
+                for _row in cur:
+                    pass
+
+    def insert_returning():
+        with transaction(conn):
+            for _ in range(number):
+                queries.blogs.publish_blog(
+                    conn, userid=2, title="Title", content="Content", published="2020-01-01"
+                )
+
+    def insert_many():
+        with transaction(conn):
+            queries.blogs.sqlite_bulk_publish(
+                conn, [(2, "Title", "Content", "2020-01-01")] * number
+            )
+
+    return [
+        ("select", select),
+        ("select cursor", select_cursor),
+        ("delete", delete),
+        ("insert returning", insert_returning),
+        ("insert many", insert_many),
+    ]
+
+
+def main(number):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(tmpdir, "blogdb.db")
+        populate_sqlite3_db(db_path)
+        shutil.copy(db_path, db_path + ".apsw")
+
+        baseline = time_adapter("sqlite3", connect_sqlite3, db_path, number)
+        try:
+            fast = time_adapter("apsw", connect_apsw, db_path + ".apsw", number)
+        except ImportError:
+            print("apsw is not installed")
+            return
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print("{:<18} {:>12} {:>12} {:>8}".format("us per call", "sqlite3", "apsw", "speedup"))
+    for (name, sqlite3_seconds), (_, apsw_seconds) in zip(baseline, fast):
+        print("{:<18} {:>12.2f} {:>12.2f} {:>7.2f}x".format(
+            name, sqlite3_seconds * 1e6, apsw_seconds * 1e6, sqlite3_seconds / apsw_seconds
+        ))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
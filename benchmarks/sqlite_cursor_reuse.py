@@ -0,0 +1,122 @@
+"""Compare calls per second of the ``sqlite3`` adapter with and without cursor reuse.
+
+``new cursor`` creates and closes a cursor per call, as the adapter used to, ``conn.execute`` is
+the default adapter, and ``reused cursor`` keeps one cursor per connection. All of them run the
+blogdb test queries against the same database file.
+
+Usage::
+
+    python benchmarks/sqlite_cursor_reuse.py [number_of_calls]
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import anosql  # noqa: E402
+from anosql.adapters.sqlite3 import SQLite3DriverAdapter  # noqa: E402
+from anosql.timing import perf_counter  # noqa: E402
+from tests.conftest import populate_sqlite3_db  # noqa: E402
+
+SQL_PATH = os.path.join(ROOT, "tests", "blogdb", "sql")
+
+
+class Connection(sqlite3.Connection):
+    """Connections of a subclass take attributes, so their cursor can be stored and reused."""
+
+
+class NewCursorAdapter(SQLite3DriverAdapter):
+    def select(self, conn, _query_name, sql, parameters):
+        cur = conn.cursor()
+        cur.execute(sql, parameters)
+        results = cur.fetchall()
+        cur.close()
+        return results
+
+    def insert_returning(self, conn, _query_name, sql, parameters):
+        cur = conn.cursor()
+        cur.execute(sql, parameters)
+        results = cur.lastrowid
+        cur.close()
+        return results
+
+
+ADAPTERS = [
+    ("new cursor", NewCursorAdapter),
+    ("conn.execute", SQLite3DriverAdapter),
+    ("reused cursor", lambda: SQLite3DriverAdapter(reuse_cursors=True)),
+]
+
+
+def calls_per_second(db_path, number):
+    """Runs each workload with every adapter in turn, for machine noise to hit them alike."""
+    runs = []
+    for index, (_, adapter) in enumerate(ADAPTERS):
+        driver_name = "benchmark-{}".format(index)
+        anosql.core.register_driver_adapter(driver_name, adapter)
+        queries = anosql.from_path(SQL_PATH, driver_name)
+        conn = sqlite3.connect(db_path, factory=Connection)
+        runs.append((conn, _workloads(queries, conn, number)))
+
+    results = []
+    try:
+        for position, (name, _) in enumerate(runs[0][1]):
+            best = [0.0] * len(runs)
+            for _ in range(7):
+                for index, (conn, workloads) in enumerate(runs):
+                    workload = workloads[position][1]
+                    started = perf_counter()
+                    workload()
+                    best[index] = max(best[index], number / (perf_counter() - started))
+                    conn.rollback()
+            results.append((name, best))
+    finally:
+        for conn, _ in runs:
+            conn.close()
+    return results
+
+
+def _workloads(queries, conn, number):
+    def select():
+        for _ in range(number):
+            queries.blogs.get_user_blogs(conn, userid=1)
+
+    def select_one_row():
+        for _ in range(number):
+            queries.blogs.sqlite_get_blogs_published_after(conn, published="2018-01-01")
+
+    def insert_returning():
+        for _ in range(number):
+            queries.blogs.publish_blog(
+                conn, userid=2, title="Title", content="Content", published="2020-01-01"
+            )
+
+    return [
+        ("select", select),
+        ("select published", select_one_row),
+        ("insert returning", insert_returning),
+    ]
+
+
+def main(number):
+    tmpdir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(tmpdir, "blogdb.db")
+        populate_sqlite3_db(db_path)
+        results = calls_per_second(db_path, number)
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print("{:<18}".format("calls per second") + "".join(
+        " {:>14}".format(name) for name, _ in ADAPTERS
+    ))
+    for name, best in results:
+        print("{:<18}".format(name) + "".join(" {:>14.0f}".format(value) for value in best))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -15,5 +15,10 @@ setup(
     maintainer='Honza Pokorny',
     maintainer_email='me@honza.ca',
     packages=find_packages(),
-    include_package_data=True
+    include_package_data=True,
+    entry_points={
+        'console_scripts': [
+            'anosql = anosql.cli:main',
+        ],
+    },
 )
@@ -74,6 +74,14 @@ def sqlite3_conn(sqlite3_db_path):
     conn.close()
 
 
+@pytest.fixture()
+def apsw_conn(sqlite3_db_path):
+    apsw = pytest.importorskip("apsw")
+    conn = apsw.Connection(sqlite3_db_path)
+    yield conn
+    conn.close()
+
+
 @pytest.fixture
 def pg_conn(postgresql):
     with postgresql:
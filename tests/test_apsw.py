@@ -0,0 +1,85 @@
+import os
+
+import anosql
+import pytest
+
+
+@pytest.fixture()
+def queries():
+    dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql")
+    return anosql.from_path(dir_path, "apsw")
+
+
+def test_parameterized_query(apsw_conn, queries):
+    actual = queries.blogs.get_user_blogs(apsw_conn, userid=1)
+    expected = [("How to make a pie.", "2018-11-23"), ("What I did Today", "2017-07-28")]
+    assert actual == expected
+
+
+def test_select_one_row(apsw_conn, queries):
+    assert queries.users.get_all(apsw_conn)[0] == (1, "bobsmith", "Bob", "Smith")
+
+
+def test_select_cursor_context_manager(apsw_conn, queries):
+    with queries.blogs.get_user_blogs_cursor(apsw_conn, userid=1) as cursor:
+        assert [column[0] for column in cursor.description] == ["title", "published"]
+        assert cursor.fetchmany(1) == [("How to make a pie.", "2018-11-23")]
+        assert cursor.fetchall() == [("What I did Today", "2017-07-28")]
+
+    with queries.blogs.get_user_blogs_cursor(apsw_conn, userid=42) as cursor:
+        assert cursor.description is None
+        assert cursor.fetchmany(10) == []
+
+
+def test_insert_returning(apsw_conn, queries):
+    blogid = queries.blogs.publish_blog(
+        apsw_conn,
+        userid=2,
+        title="My first blog",
+        content="Hello, World!",
+        published="2018-12-04",
+    )
+    actual = apsw_conn.execute("select title from blogs where blogid = ?", (blogid,)).fetchall()
+    assert actual == [("My first blog",)]
+
+
+def test_delete(apsw_conn, queries):
+    assert queries.blogs.remove_blog(apsw_conn, blogid=2) is None
+    assert queries.blogs.get_user_blogs(apsw_conn, userid=3) == []
+
+
+def test_insert_many(apsw_conn, queries):
+    blogs = [
+        (2, "Blog Part 1", "content - 1", "2018-12-04"),
+        (2, "Blog Part 2", "content - 2", "2018-12-05"),
+        (2, "Blog Part 3", "content - 3", "2018-12-06"),
+    ]
+    assert queries.blogs.sqlite_bulk_publish(apsw_conn, blogs) is None
+    assert queries.blogs.get_user_blogs(apsw_conn, userid=2) == [
+        ("Blog Part 3", "2018-12-06"),
+        ("Blog Part 2", "2018-12-05"),
+        ("Blog Part 1", "2018-12-04"),
+    ]
+
+
+def test_insert_many_is_atomic(apsw_conn, queries):
+    blogs = [(2, "Blog Part 1", "content - 1", "2018-12-04"), (2, None, None, None)]
+    with pytest.raises(Exception):
+        queries.blogs.sqlite_bulk_publish(apsw_conn, blogs)
+    assert queries.blogs.get_user_blogs(apsw_conn, userid=2) == []
+
+
+def test_script(apsw_conn):
+    q = anosql.from_str(
+        "-- name: setup#\ncreate table t (a);\nselect 1;\ninsert into t values (1);", "apsw"
+    )
+    assert q.setup(apsw_conn) is None
+    assert apsw_conn.execute("select a from t").fetchall() == [(1,)]
+
+
+def test_pages(apsw_conn):
+    q = anosql.from_str(
+        "-- name: users\n-- @paginate: userid\nselect userid, username from users;", "apsw"
+    )
+    pages = list(q.users_pages(apsw_conn, 2))
+    assert pages == [[(1, "bobsmith"), (2, "johndoe")], [(3, "janedoe")]]
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from anosql.cli import main
+
+SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql")
+
+
+def test_list(capsys):
+    assert main(["list", SQL_PATH]) == 0
+    out = capsys.readouterr()[0].splitlines()
+    assert "blogs.get_user_blogs  (select)  Get blogs authored by a user." in out
+    assert "blogs.remove_blog  (insert/update/delete)  Remove a blog from the database" in out
+    assert "users.get_all  (select)  Get all user records" in out
+    assert not any("_cursor" in line for line in out)
+
+
+def test_run_select(sqlite3_db_path, capsys):
+    args = ["run", SQL_PATH, "blogs.get_user_blogs", "userid=1", "--sqlite", sqlite3_db_path]
+    assert main(args) == 0
+    assert capsys.readouterr()[0] == (
+        "How to make a pie.\t2018-11-23\nWhat I did Today\t2017-07-28\n"
+    )
+
+
+def test_run_write_commits(sqlite3_db_path, capsys):
+    database = ["--sqlite", sqlite3_db_path]
+    assert main(["run", SQL_PATH, "blogs.remove_blog", "blogid=1"] + database) == 0
+    main(["run", SQL_PATH, "blogs.get_user_blogs", "userid=1"] + database)
+    assert capsys.readouterr()[0] == "How to make a pie.\t2018-11-23\n"
+
+
+def test_run_invalid_parameters(sqlite3_db_path):
+    database = ["--sqlite", sqlite3_db_path]
+    with pytest.raises(SystemExit):
+        main(["run", SQL_PATH, "blogs.get_user_blogs", "userid=1", "2"] + database)
+
+
+def test_bench(sqlite3_db_path, capsys):
+    args = [
+        "bench", SQL_PATH, "users.get_all", "--sqlite", sqlite3_db_path, "-n", "20", "--warmup", "2"
+    ]
+    assert main(args) == 0
+    out = capsys.readouterr()[0]
+    assert out.startswith("users.get_all: 20 runs after 2 warmup runs\n")
+    for label in ("mean", "p50", "p90", "p99", "max", "rows/s"):
+        assert label in out
+
+
+def test_module_entry_point():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output(
+        [sys.executable, "-m", "anosql", "list", SQL_PATH], cwd=root
+    )
+    assert b"users.get_one  (select one row)" in output
+
+
+def test_plans(sqlite3_db_path, tmpdir, capsys):
+    baseline = tmpdir.join("plans.json").strpath
+    args = ["plans", SQL_PATH, "--sqlite", sqlite3_db_path, "--baseline", baseline]
+    with pytest.raises(SystemExit):
+        main(args)
+
+    assert main(args + ["--update-baseline", "--min-rows", "100"]) == 1
+    out = capsys.readouterr()[0]
+    # Queries written for PostgreSQL can't be explained by SQLite, the others all can.
+    assert "users.get_one: could not be explained" in out
+    assert "blogs.pg_get_blogs_published_after: could not be explained" in out
+    assert "Checked 11 queries, 2 problems" in out
+    assert "full scan" not in out
+
+    assert main(args + ["--min-rows", "3"]) == 1
+    assert "users.get_all: full scan of users (3 rows)" in capsys.readouterr()[0]
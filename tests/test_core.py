@@ -0,0 +1,237 @@
+import os
+import pydoc
+import subprocess
+import sys
+
+import anosql
+import pytest
+
+BLOGS_SQL_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql", "blogs", "blogs.sql"
+)
+
+
+@pytest.fixture()
+def queries():
+    dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql")
+    return anosql.from_path(dir_path, "sqlite3")
+
+
+def test_source_of_file_query(queries):
+    source = queries.source_of("blogs.remove_blog")
+    assert source.path == BLOGS_SQL_PATH
+    assert source.lineno == 15
+
+    with open(BLOGS_SQL_PATH, "rb") as fp:
+        fp.seek(source.offset)
+        block = fp.read(source.length)
+    assert block.startswith(b"-- name: remove-blog!\n")
+    assert block.endswith(b"\n\n\n")
+
+
+def test_source_of_cursor_method(queries):
+    assert queries.source_of("blogs.get_user_blogs_cursor").lineno == 20
+
+
+def test_source_of_unknown_query(queries):
+    with pytest.raises(ValueError):
+        queries.source_of("blogs.nope")
+
+
+def test_find_query(queries):
+    assert queries.find_query("blogs.remove_blog") is queries.blogs.remove_blog
+    assert queries.find_query("blogs.get_user_blogs_cursor").query is (
+        queries.blogs.get_user_blogs
+    )
+    assert queries.find_query("blogs") is None
+    assert queries.find_query("blogs.nope") is None
+    assert queries.find_query("blogs.remove_blog.sql") is None
+    assert queries.find_query("merge") is None
+
+
+def test_source_of_string_query_counts_bytes():
+    sql = "-- name: café\nselect 'é';\n\n-- name: two\nselect 2;\n"
+    q = anosql.from_str(sql, "sqlite3")
+    source = q.source_of("two")
+    assert source.path is None
+    assert source.lineno == 4
+    assert source.offset == len(sql[:sql.index("-- name: two")].encode("utf-8"))
+    assert source.length == len(b"-- name: two\nselect 2;\n")
+
+
+def test_parse_error_reports_location(tmpdir):
+    path = tmpdir.join("bad.sql")
+    path.write("-- name: good\nselect 1;\n\n-- name: +bad\nselect 2;\n")
+    with pytest.raises(anosql.SQLParseException) as excinfo:
+        anosql.from_path(path.strpath, "sqlite3")
+    assert "bad.sql:4" in str(excinfo.value)
+
+
+def test_memory_mapped_file_matches_read_file(monkeypatch):
+    read = anosql.from_path(BLOGS_SQL_PATH, "sqlite3")
+    monkeypatch.setattr(anosql.core, "MMAP_MIN_SIZE", 1)
+    mapped = anosql.from_path(BLOGS_SQL_PATH, "sqlite3")
+
+    assert mapped.available_queries == read.available_queries
+    for name in read.available_queries:
+        assert getattr(mapped, name).sql == getattr(read, name).sql
+        assert mapped.source_of(name) == read.source_of(name)
+
+
+def test_memory_mapped_file_peak_memory(tmpdir, monkeypatch):
+    tracemalloc = pytest.importorskip("tracemalloc")
+    monkeypatch.setattr(anosql.core, "MMAP_MIN_SIZE", 1)
+    path = tmpdir.join("seed.sql")
+    query = "".join("insert into t values ({}, 'seed value');\n".format(i) for i in range(200))
+    path.write("".join("-- name: seed-{}#\n{}\n".format(i, query) for i in range(200)))
+
+    tracemalloc.start()
+    try:
+        queries = anosql.from_path(path.strpath, "sqlite3")
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Loading keeps every query, but never holds more than a few queries worth of copies on top.
+    assert len(queries.available_queries) == 200
+    assert peak - current < 10 * len(query)
+
+
+def test_queries_are_query_objects(queries):
+    query = queries.blogs.get_user_blogs
+    assert isinstance(query, anosql.core.Query)
+    assert query.__name__ == "get_user_blogs"
+    assert query.__doc__ == "Get blogs authored by a user."
+    assert query.op_type == anosql.SQLOperationType.SELECT
+    assert "Get blogs authored by a user." in pydoc.render_doc(query)
+
+
+def test_cursor_method_is_a_view_of_the_select_query(queries):
+    cursor_method = queries.blogs.get_user_blogs_cursor
+    assert cursor_method.__name__ == "get_user_blogs_cursor"
+    assert cursor_method.__doc__ == queries.blogs.get_user_blogs.__doc__
+    assert cursor_method.sql is queries.blogs.get_user_blogs.sql
+    assert "get_user_blogs_cursor" not in vars(queries.blogs)
+
+
+def test_only_select_queries_have_cursor_methods(queries):
+    assert "blogs.remove_blog_cursor" not in queries.available_queries
+    assert "users.get_one_cursor" not in queries.available_queries
+    with pytest.raises(AttributeError):
+        queries.blogs.remove_blog_cursor
+
+
+def test_query_parameters_are_parsed_at_load_time():
+    sql = (
+        "-- name: find\n"
+        "select * from t where a = :a and b in (:b,:a) and c = ':c' and d = :d::int;\n"
+        "-- name: pyformat!\n"
+        "update t set a = %(a)s where b = %(b)s;\n"
+        "-- name: positional\n"
+        "select * from t where a = ?;\n"
+    )
+    q = anosql.from_str(sql, "psycopg2")
+    assert q.find.parameters == ("a", "b", "d")
+    assert q.find.sql == (
+        "select * from t where a = %(a)s and b in (%(b)s,%(a)s) and c = ':c' and d = %(d)s::int;"
+    )
+    assert q.pyformat.parameters == ("a", "b")
+    assert q.positional.parameters == ()
+    assert q.positional.binding is None
+
+
+def test_invalid_parameters_raise_before_execution(sqlite3_conn, queries):
+    with pytest.raises(anosql.SQLParameterException) as excinfo:
+        queries.blogs.publish_blog(sqlite3_conn, userid=2, title="t", contents="c")
+    assert "Missing: content, published." in str(excinfo.value)
+    assert "Unexpected: contents." in str(excinfo.value)
+
+
+def test_binding_compares_names_as_sets():
+    class ListKeysDict(dict):
+        # Like a Python 2 dict, whose keys() is a list.
+        def keys(self):
+            return list(dict.keys(self))
+
+    plan = anosql.core.BindingPlan(frozenset(["a", "b"]))
+    kwargs = ListKeysDict(a=1, b=2)
+    assert plan.bind("q", kwargs) is kwargs
+    with pytest.raises(anosql.SQLParameterException) as excinfo:
+        plan.bind("q", ListKeysDict(a=1, c=2))
+    assert str(excinfo.value) == "q got invalid parameters. Missing: b. Unexpected: c."
+
+
+def test_parameter_names_end_at_minus_sign(sqlite3_conn):
+    sql = "-- name: prev\nselect :page-1;"
+    q = anosql.from_str(sql, "sqlite3")
+    assert q.prev.parameters == ("page",)
+    assert q.prev(sqlite3_conn, page=3) == [(2,)]
+    assert anosql.from_str(sql, "psycopg2").prev.sql == "select %(page)s-1;"
+
+
+def test_positional_paramstyle_binds_tuples():
+    calls = []
+
+    class PositionalAdapter(object):
+        paramstyle = "qmark"
+
+        @staticmethod
+        def process_sql(_query_name, _op_type, sql):
+            return anosql.patterns.var_pattern.sub(lambda m: m.group(0)[0] + "?", sql)
+
+        @staticmethod
+        def select(conn, query_name, sql, parameters):
+            calls.append((sql, parameters))
+            return []
+
+        @staticmethod
+        def insert_update_delete_many(conn, query_name, sql, parameters):
+            calls.append((sql, list(parameters)))
+
+    anosql.core.register_driver_adapter("positional", PositionalAdapter)
+    q = anosql.from_str(
+        "-- name: get\nselect :b, :a, :b;\n\n-- name: put*!\ninsert into t values (:a, :b);",
+        "positional",
+    )
+    q.get(None, a=1, b=2)
+    q.put(None, [{"a": 1, "b": 2}, (3, 4)])
+    assert calls == [
+        ("select ?, ?, ?;", (2, 1, 2)),
+        ("insert into t values (?, ?);", [(1, 2), (3, 4)]),
+    ]
+
+
+def test_adapters_are_imported_on_first_use():
+    code = (
+        "import sys, anosql; "
+        "assert not [m for m in sys.modules if m.startswith('anosql.adapters')]; "
+        "anosql.from_str('-- name: q\\nselect 1;', 'sqlite3'); "
+        "assert 'anosql.adapters.sqlite3' in sys.modules; "
+        "assert 'anosql.adapters.psycopg2' not in sys.modules"
+    )
+    subprocess.check_call([sys.executable, "-c", code])
+
+
+def test_adapter_instances_are_cached():
+    adapter = anosql.core.get_driver_adapter("sqlite3")
+    assert anosql.core.get_driver_adapter("sqlite3") is adapter
+
+    anosql.core.register_driver_adapter("dotted", "anosql.adapters.sqlite3:SQLite3DriverAdapter")
+    assert type(anosql.core.get_driver_adapter("dotted")) is type(adapter)
+
+
+def test_adapters_are_discovered_from_entry_points(monkeypatch):
+    class EntryPoint(object):
+        name = "plugged"
+
+        def load(self):
+            return type(anosql.core.get_driver_adapter("sqlite3"))
+
+    monkeypatch.setattr(anosql.core, "_iter_entry_points", lambda group: [EntryPoint()])
+    monkeypatch.setattr(anosql.core, "_entry_points_loaded", False)
+    monkeypatch.setattr(anosql.core, "_ADAPTERS", dict(anosql.core._ADAPTERS))
+
+    q = anosql.from_str("-- name: get-one\nselect 1;", "plugged")
+    assert q.get_one.driver_adapter is anosql.core.get_driver_adapter("plugged")
+    with pytest.raises(ValueError):
+        anosql.core.get_driver_adapter("missing")
@@ -0,0 +1,102 @@
+import anosql
+import pytest
+
+SQL = """
+-- fragment: blog-columns
+-- The columns of blog listings.
+b.title, u.username
+
+-- name: find-blogs
+-- Find blogs, optionally by author and date.
+select {{blog-columns}}
+  from blogs b join users u on u.userid = b.userid
+ where 1 = 1
+   [[and b.userid = :userid]]
+   [[and b.published >= :published]]
+ order by b.blogid;
+
+-- fragment: by-user
+where u.userid = :userid
+
+-- name: get-user-blogs
+select {{ blog-columns }}
+  from blogs b join users u on u.userid = b.userid
+ {{by-user}};
+"""
+
+
+@pytest.fixture()
+def queries():
+    return anosql.from_str(SQL, "sqlite3")
+
+
+def test_fragments_are_included(queries):
+    assert queries.available_queries == [
+        "find_blogs", "find_blogs_cursor", "get_user_blogs", "get_user_blogs_cursor"
+    ]
+    assert queries.get_user_blogs.sql == (
+        "select b.title, u.username\n"
+        "  from blogs b join users u on u.userid = b.userid\n"
+        " where u.userid = :userid;"
+    )
+    assert queries.get_user_blogs.parameters == ("userid",)
+    assert queries.source_of("get_user_blogs").lineno == 18
+
+
+def test_conditional_clauses(sqlite3_conn, queries):
+    find_blogs = queries.find_blogs
+    assert find_blogs.parameters == ("userid", "published")
+    assert find_blogs.optional_parameters == frozenset(["userid", "published"])
+
+    assert len(find_blogs(sqlite3_conn)) == 3
+    assert find_blogs(sqlite3_conn, userid=1) == [
+        ("What I did Today", "bobsmith"), ("How to make a pie.", "bobsmith")
+    ]
+    assert find_blogs(sqlite3_conn, userid=None, published="2018-01-01") == [
+        ("Testing", "janedoe"), ("How to make a pie.", "bobsmith")
+    ]
+    assert find_blogs(sqlite3_conn, userid=1, published="2018-01-01") == [
+        ("How to make a pie.", "bobsmith")
+    ]
+
+
+def test_conditional_variants_are_precompiled():
+    q = anosql.from_str(
+        "-- name: find\nselect * from t where a = :a [[and b = :b]] [[and c = :c]];", "psycopg2"
+    )
+    assert q.find._prepare((), {"a": 1, "c": None}) == (
+        "select * from t where a = %(a)s  ;", {"a": 1}
+    )
+    sql, parameters = q.find._prepare((), {"a": 1, "c": 3})
+    assert sql == "select * from t where a = %(a)s  and c = %(c)s;"
+    assert sql is q.find._prepare((), {"a": 2, "c": 4})[0]
+
+
+def test_conditional_parameters_are_checked(sqlite3_conn, queries):
+    with pytest.raises(anosql.SQLParameterException) as excinfo:
+        queries.find_blogs(sqlite3_conn, author=1)
+    assert "Unexpected: author." in str(excinfo.value)
+    with pytest.raises(anosql.SQLParameterException):
+        queries.find_blogs(sqlite3_conn, 1)
+
+
+@pytest.mark.parametrize(
+    "sql, message",
+    [
+        ("-- name: q\nselect {{nope}};", 'unknown fragment "nope"'),
+        (
+            "-- fragment: a\n{{b}}\n-- fragment: b\n{{a}}\n-- name: q\nselect {{a}};",
+            'fragment "a" includes itself',
+        ),
+        ("-- name: q*!\ninsert into t values (:a) [[:b]];", "not supported by q queries"),
+        ("-- name: q\nselect * from t where a in (:*a) [[and b = :b]];", "list parameters"),
+        (
+            "-- name: q\nselect 1 {}".format(" ".join("[[+ :p{}]]".format(i) for i in range(7))),
+            "more than 6 conditional clauses",
+        ),
+    ],
+)
+def test_invalid_fragments_and_clauses(sql, message):
+    with pytest.raises(anosql.SQLParseException) as excinfo:
+        anosql.from_str(sql, "sqlite3")
+    assert message in str(excinfo.value)
@@ -0,0 +1,138 @@
+import json
+import os
+import sqlite3
+
+import anosql
+import pytest
+from anosql.cli import main
+from anosql.importer import import_file, import_rows
+
+from .conftest import BLOGS_DATA_PATH, USERS_DATA_PATH
+
+SQL = """
+-- name: insert-users*!
+insert into users (username, firstname, lastname) values (?, ?, ?);
+
+-- name: insert-users-named*!
+insert into users (username, firstname, lastname) values (:username, :firstname, :lastname);
+
+-- name: insert-blogs*!
+insert into blogs (userid, title, content, published) values (?, ?, ?, ?);
+
+-- name: count-users?
+select count(*) from users;
+"""
+
+
+@pytest.fixture()
+def sql_path(tmpdir):
+    path = tmpdir.join("import.sql")
+    path.write(SQL)
+    return path.strpath
+
+
+@pytest.fixture()
+def queries(sql_path):
+    return anosql.from_path(sql_path, "sqlite3")
+
+
+def test_import_csv_in_batches(sqlite3_conn, queries):
+    reported = []
+    stats = import_file(
+        queries.insert_blogs,
+        sqlite3_conn,
+        BLOGS_DATA_PATH,
+        batch_size=2,
+        progress=lambda s: reported.append((s.rows, s.batches)),
+    )
+    assert (stats.rows, stats.batches) == (3, 2)
+    assert reported == [(2, 1), (3, 2)]
+    assert len(queries.count_users(sqlite3_conn)) == 1
+    assert sqlite3_conn.execute("select count(*) from blogs").fetchone() == (6,)
+
+
+def test_import_jsonl_with_mapping(sqlite3_conn, queries, tmpdir):
+    path = tmpdir.join("users.jsonl")
+    path.write(
+        "\n".join(
+            json.dumps({"login": "user{}".format(i), "first": "F", "last": "L"})
+            for i in range(10)
+        )
+        + "\n\n"
+    )
+    stats = import_file(
+        queries.insert_users_named,
+        sqlite3_conn,
+        path.strpath,
+        mapping={"username": "login", "firstname": "first", "lastname": "last"},
+        batch_size=4,
+    )
+    assert (stats.rows, stats.batches) == (10, 3)
+    assert queries.count_users(sqlite3_conn) == (13,)
+
+
+def test_import_rows_streams_without_commit(sqlite3_conn, queries):
+    consumed = []
+
+    def rows():
+        for i in range(5):
+            consumed.append(i)
+            yield ("user{}".format(i), "F", "L")
+
+    stats = import_rows(
+        queries.insert_users,
+        sqlite3_conn,
+        rows(),
+        batch_size=2,
+        commit=False,
+        progress=lambda s: consumed.append("batch"),
+    )
+    assert consumed == [0, 1, "batch", 2, 3, "batch", 4, "batch"]
+    assert stats.rows == 5
+    sqlite3_conn.rollback()
+    assert queries.count_users(sqlite3_conn) == (3,)
+
+
+def test_import_requires_bulk_query(sqlite3_conn, queries):
+    with pytest.raises(ValueError):
+        import_rows(queries.count_users, sqlite3_conn, [])
+
+
+def test_cli_load(sqlite3_db_path, sql_path, capsys):
+    code = main(
+        [
+            "load",
+            sql_path,
+            "insert_users",
+            USERS_DATA_PATH,
+            "--sqlite",
+            sqlite3_db_path,
+            "--map",
+            "0",
+            "--map",
+            "2",
+            "--map",
+            "1",
+            "--batch-size",
+            "2",
+        ]
+    )
+    assert code == 0
+    out, err = capsys.readouterr()
+    assert out.startswith("Loaded 3 rows in 2 batches")
+    assert "3 rows in 2 batches" in err
+
+    conn = sqlite3.connect(sqlite3_db_path)
+    assert conn.execute("select * from users where userid = 4").fetchone() == (
+        4,
+        "bobsmith",
+        "Smith",
+        "Bob",
+    )
+    conn.close()
+
+
+def test_cli_load_unknown_query(sqlite3_db_path, sql_path):
+    with pytest.raises(SystemExit):
+        main(["load", sql_path, "nope", USERS_DATA_PATH, "--sqlite", sqlite3_db_path])
+    assert os.path.exists(sqlite3_db_path)
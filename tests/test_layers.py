@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+import anosql
+from anosql.core import Queries, clear_shared_queries
+from anosql.exceptions import SQLLoadException
+from anosql.retry import RetryPolicy
+
+
+@pytest.fixture()
+def layers(tmpdir):
+    base = tmpdir.mkdir("base")
+    base.mkdir("users").join("users.sql").write(
+        "-- name: get-all\nselect * from users;\n\n"
+        "-- name: get-by-id\nselect * from users where userid = :userid;\n"
+    )
+    base.join("misc.sql").write("-- name: ping\nselect 1;\n")
+    service = tmpdir.mkdir("service")
+    service.mkdir("users").join("users.sql").write(
+        "-- name: get-by-id\nselect * from users where userid = :userid and active;\n"
+    )
+    service.join("extra.sql").write("-- name: pong\nselect 2;\n")
+    yield str(base), str(service)
+    clear_shared_queries()
+
+
+def test_later_layers_override(layers):
+    base, service = layers
+    queries = anosql.from_path([base, service], "sqlite3")
+
+    assert queries.users.get_by_id.sql.endswith("and active;")
+    assert queries.users.get_all.sql == "select * from users;"
+    assert queries.ping.sql == "select 1;"
+    assert queries.pong.sql == "select 2;"
+    assert queries.source_of("users.get_by_id").path.startswith(service)
+
+
+def test_layers_share_parsed_queries(layers):
+    base, service = layers
+    first = anosql.from_path([base, service], "sqlite3")
+    second = anosql.from_path([base], "sqlite3")
+
+    assert second.users.get_all is not first.users.get_all
+    assert second.users.get_all.sql is first.users.get_all.sql
+    assert anosql.from_path([base], "sqlite3").users.get_by_id.binding is (
+        second.users.get_by_id.binding
+    )
+    # Plain loads still parse their own queries.
+    assert anosql.from_path(base, "sqlite3").users.get_all.sql is not first.users.get_all.sql
+
+
+def test_layered_loads_keep_their_own_settings(layers):
+    base, service = layers
+    first = anosql.from_path([base, service], "sqlite3")
+    second = anosql.from_path([base], "sqlite3")
+
+    first.set_retry_policy(RetryPolicy(attempts=9), idempotent_only=False)
+    first.users.get_all.timeout = 5
+    assert first.users.get_all.retry_policy.attempts == 9
+    assert second.users.get_all.retry_policy is None
+    assert second.users.get_all.timeout is None
+    assert anosql.from_path([base], "sqlite3").ping.retry_policy is None
+
+
+def test_changed_layers_are_parsed_again(layers):
+    base, _ = layers
+    first = anosql.from_path([base], "sqlite3")
+    path = os.path.join(base, "misc.sql")
+    with open(path, "w") as fp:
+        fp.write("-- name: ping\nselect 'changed';\n")
+
+    assert anosql.from_path([base], "sqlite3").ping.sql == "select 'changed';"
+    assert first.ping.sql == "select 1;"
+
+    clear_shared_queries()
+    assert anosql.from_path([base], "sqlite3").ping is not first.ping
+
+
+def test_merge_conflicts():
+    base = anosql.from_str("-- name: users\nselect 1;\n", "sqlite3")
+    child = Queries()
+    child.add_child_queries("users", Queries())
+
+    with pytest.raises(SQLLoadException):
+        base.merge(child)
+    with pytest.raises(SQLLoadException):
+        child.merge(base)
+
+
+def test_missing_layer(layers):
+    with pytest.raises(SQLLoadException):
+        anosql.from_path([layers[0], "does/not/exist"], "sqlite3")
@@ -0,0 +1,72 @@
+import sqlite3
+
+import anosql
+import pytest
+
+SQL = """
+-- name: count-forever
+-- @timeout: 50ms
+with recursive n(i) as (select 1 union all select i + 1 from n) select count(*) from n;
+
+-- name: get-blogs
+-- @max-rows: 2
+-- @timeout: 2s
+select title from blogs where userid >= :userid order by blogid;
+"""
+
+
+@pytest.fixture()
+def queries():
+    return anosql.from_str(SQL, "sqlite3")
+
+
+def test_timeout_interrupts_statement(sqlite3_conn, queries):
+    assert queries.count_forever.timeout == 0.05
+    with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+        queries.count_forever(sqlite3_conn)
+
+    # The progress handler is removed after the call.
+    queries = anosql.from_str("-- name: count\nselect count(*) from blogs;", "sqlite3")
+    assert queries.count(sqlite3_conn) == [(3,)]
+
+
+def test_timeout_bounds_cursor(sqlite3_conn, queries):
+    queries = anosql.from_str(
+        "-- name: numbers\n-- @timeout: 50ms\n"
+        "with recursive n(i) as (select 1 union all select i + 1 from n) select i from n;",
+        "sqlite3",
+    )
+    with pytest.raises(sqlite3.OperationalError, match="interrupted"):
+        with queries.numbers_cursor(sqlite3_conn) as cur:
+            for _row in cur:
+                pass
+
+
+def test_max_rows(sqlite3_conn, queries):
+    assert queries.get_blogs(sqlite3_conn, userid=2) == [("Testing",)]
+    with pytest.raises(anosql.SQLRowLimitException, match="get_blogs returned more than 2 rows"):
+        queries.get_blogs(sqlite3_conn, userid=1)
+    with queries.get_blogs_cursor(sqlite3_conn, userid=1) as cur:
+        assert len(cur.fetchall()) == 3
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "-- name: q\n-- @timeout: soon\nselect 1;",
+        "-- name: q\n-- @timeout: 0s\nselect 1;",
+        "-- name: q\n-- @max-rows: -1\nselect 1;",
+        "-- name: q!\n-- @max-rows: 10\ndelete from blogs;",
+    ],
+)
+def test_invalid_limits(sql):
+    with pytest.raises(anosql.SQLParseException):
+        anosql.from_str(sql, "sqlite3")
+
+
+def test_apsw_timeout(apsw_conn):
+    apsw = pytest.importorskip("apsw")
+    queries = anosql.from_str(SQL, "apsw")
+    with pytest.raises(apsw.InterruptError):
+        queries.count_forever(apsw_conn)
+    assert queries.get_blogs(apsw_conn, userid=3) == [("Testing",)]
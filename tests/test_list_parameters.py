@@ -0,0 +1,81 @@
+import anosql
+import pytest
+
+SQL = """
+-- name: get-users-by-id
+select username from users where userid in (:*ids) order by userid;
+
+-- name: count-users-by-name?
+select count(*) from users where username in (:*names) and lastname = :lastname;
+"""
+
+
+@pytest.fixture()
+def queries():
+    return anosql.from_str(SQL, "sqlite3")
+
+
+def test_list_parameter_expansion(sqlite3_conn, queries):
+    assert queries.get_users_by_id(sqlite3_conn, ids=[3, 1]) == [("bobsmith",), ("janedoe",)]
+    assert queries.get_users_by_id(sqlite3_conn, ids=(2,)) == [("johndoe",)]
+    assert queries.get_users_by_id(sqlite3_conn, ids={1, 2, 3}) == [
+        ("bobsmith",),
+        ("johndoe",),
+        ("janedoe",),
+    ]
+
+
+def test_list_parameter_with_other_parameters(sqlite3_conn, queries):
+    count = queries.count_users_by_name(
+        sqlite3_conn, names=["janedoe", "johndoe", "bobsmith"], lastname="Doe"
+    )
+    assert count == (2,)
+    assert queries.count_users_by_name.parameters == ("names", "lastname")
+
+
+def test_list_lengths_are_bucketed(sqlite3_conn, queries):
+    for size in range(1, 18):
+        queries.get_users_by_id(sqlite3_conn, ids=list(range(size)))
+
+    assert sorted(queries.get_users_by_id._shapes) == [(1,), (2,), (4,), (8,), (16,), (32,)]
+    sql, _ = queries.get_users_by_id._shapes[(4,)]
+    assert sql == (
+        "select username from users where userid in (:ids__0, :ids__1, :ids__2, :ids__3) "
+        "order by userid;"
+    )
+
+
+def test_list_parameter_psycopg2_sql():
+    q = anosql.from_str(SQL, "psycopg2")
+    sql, parameters = q.get_users_by_id._prepare((), {"ids": [7, 8, 9]})
+    assert sql == (
+        "select username from users where userid in "
+        "(%(ids__0)s, %(ids__1)s, %(ids__2)s, %(ids__3)s) order by userid;"
+    )
+    assert parameters == {"ids__0": 7, "ids__1": 8, "ids__2": 9, "ids__3": 9}
+
+
+def test_list_parameter_names_end_at_minus_sign(sqlite3_conn):
+    q = anosql.from_str("-- name: get\nselect :*ids-1;", "sqlite3")
+    assert q.get.list_parameters == ("ids",)
+    assert q.get.parameters == ("ids",)
+    assert q.get(sqlite3_conn, ids=[3]) == [(2,)]
+
+
+@pytest.mark.parametrize(
+    "args, kwargs",
+    [
+        (([1, 2],), {}),
+        ((), {"ids": []}),
+        ((), {"ids": "abc"}),
+        ((), {"ids": [1], "extra": 2}),
+    ],
+)
+def test_invalid_list_parameters(sqlite3_conn, queries, args, kwargs):
+    with pytest.raises(anosql.SQLParameterException):
+        queries.get_users_by_id(sqlite3_conn, *args, **kwargs)
+
+
+def test_list_parameters_not_supported_in_bulk_queries():
+    with pytest.raises(anosql.SQLParseException):
+        anosql.from_str("-- name: bulk*!\ndelete from users where userid in (:*ids);", "sqlite3")
@@ -0,0 +1,87 @@
+import sqlite3
+
+import anosql
+import pytest
+
+SQL = """
+-- name: get-blogs
+-- Get blogs published after a date.
+-- @paginate: blogid
+select blogid, title from blogs where published >= :published order by blogid;
+
+-- name: get-users-newest-first
+-- @paginate: lastname desc, userid desc
+select userid, lastname, username from users;
+"""
+
+
+@pytest.fixture()
+def queries():
+    return anosql.from_str(SQL, "sqlite3")
+
+
+@pytest.fixture()
+def many_blogs_conn(sqlite3_conn):
+    with sqlite3_conn:
+        sqlite3_conn.executemany(
+            "insert into blogs (userid, title, content, published) values (1, ?, '', ?)",
+            [("Blog {}".format(i), "2019-01-01") for i in range(10)],
+        )
+    return sqlite3_conn
+
+
+def test_pages(many_blogs_conn, queries):
+    pages = list(queries.get_blogs_pages(many_blogs_conn, 4, published="2018-01-01"))
+    assert [len(page) for page in pages] == [4, 4, 4]
+    rows = [row for page in pages for row in page]
+    assert rows == queries.get_blogs(many_blogs_conn, published="2018-01-01")
+    assert [blogid for blogid, _ in rows] == [2, 3] + list(range(4, 14))
+
+
+def test_pages_exact_multiple_of_page_size(many_blogs_conn, queries):
+    pages = list(queries.get_blogs.pages(many_blogs_conn, 6, published="2018-01-01"))
+    assert [len(page) for page in pages] == [6, 6]
+
+
+def test_pages_descending_composite_key_with_records(sqlite3_conn, queries):
+    sqlite3_conn.row_factory = sqlite3.Row
+    pages = list(queries.get_users_newest_first_pages(sqlite3_conn, 1))
+    assert [[tuple(row) for row in page] for page in pages] == [
+        [(1, "Smith", "bobsmith")],
+        [(3, "Doe", "janedoe")],
+        [(2, "Doe", "johndoe")],
+    ]
+
+
+def test_pages_method_is_listed(queries):
+    assert "get_blogs_pages" in queries.available_queries
+    assert queries.get_blogs.pagination.keys == ("blogid",)
+    assert queries.get_blogs.__doc__ == "Get blogs published after a date."
+
+
+def test_pages_checks_parameters(sqlite3_conn, queries):
+    with pytest.raises(anosql.SQLParameterException):
+        list(queries.get_blogs_pages(sqlite3_conn, 2))
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "-- name: q\n-- @paginate: a desc, b\nselect a, b from t;",
+        "-- name: q\n-- @paginate: a sideways\nselect a from t;",
+        "-- name: q!\n-- @paginate: a\ndelete from t;",
+        "-- name: q\n-- @pagniate: a\nselect a from t;",
+    ],
+)
+def test_invalid_paginate_directives(sql):
+    with pytest.raises(anosql.SQLParseException):
+        anosql.from_str(sql, "sqlite3")
+
+
+def test_pages_psycopg2_sql():
+    q = anosql.from_str(SQL, "psycopg2")
+    assert q.get_users_newest_first.pagination.next_sql == (
+        "select * from (\nselect userid, lastname, username from users\n) anosql_page "
+        "where (lastname, userid) < (%(anosql_last_0)s, %(anosql_last_1)s) "
+        "order by lastname desc, userid desc limit %(anosql_page_size)s"
+    )
@@ -0,0 +1,74 @@
+import functools
+import os
+import sqlite3
+import threading
+
+import anosql
+import pytest
+
+
+@pytest.fixture()
+def queries():
+    dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql")
+    return anosql.from_path(dir_path, "sqlite3")
+
+
+@pytest.fixture()
+def connect(sqlite3_db_path):
+    return functools.partial(sqlite3.connect, sqlite3_db_path)
+
+
+def test_map_preserves_order(connect, queries):
+    params = [{"userid": userid} for userid in [3, 1, 2, 1, 3] * 20]
+    actual = list(queries.blogs.get_user_blogs.map(connect, params, workers=3))
+
+    expected = [queries.blogs.get_user_blogs(connect(), **p) for p in params]
+    assert actual == expected
+
+
+def test_map_positional_parameters_and_one_row(connect):
+    sql = "-- name: get-user?\nselect username from users where userid = ?;"
+    q = anosql.from_str(sql, "sqlite3")
+    actual = list(q.get_user.map(connect, [(1,), (2,), (4,), (3,)], workers=2))
+    assert actual == [("bobsmith",), ("johndoe",), None, ("janedoe",)]
+
+
+def test_map_uses_one_connection_per_worker(connect, queries):
+    opened = []
+    lock = threading.Lock()
+
+    def counting_connect():
+        with lock:
+            opened.append(threading.current_thread().name)
+        return connect()
+
+    list(queries.users.get_all.map(counting_connect, [()] * 50, workers=4))
+    assert len(opened) == 4
+    assert len(set(opened)) == 4
+
+
+def test_map_bounds_in_flight_parameters(connect, queries):
+    consumed = []
+
+    def params():
+        for i in range(100):
+            consumed.append(i)
+            yield {"userid": 1}
+
+    results = queries.blogs.get_user_blogs.map(connect, params(), workers=2, max_pending=3)
+    next(results)
+    assert len(consumed) <= 4
+    results.close()
+
+
+def test_map_raises_errors_in_order(connect, queries):
+    params = [{"userid": 1}, {"wrong": 1}, {"userid": 2}]
+    results = queries.blogs.get_user_blogs.map(connect, params, workers=2)
+    assert len(next(results)) == 2
+    with pytest.raises(anosql.SQLParameterException):
+        next(results)
+
+
+def test_map_only_on_select_queries(connect, queries):
+    with pytest.raises(ValueError):
+        queries.blogs.remove_blog.map(connect, [{"blogid": 1}])
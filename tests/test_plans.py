@@ -0,0 +1,90 @@
+import anosql
+import pytest
+from anosql.plans import (
+    check_plans,
+    explain_query,
+    load_baseline,
+    placeholder_parameters,
+    save_baseline,
+)
+
+SQL = """
+-- name: user-blogs
+select title from blogs where userid = :userid;
+
+-- name: blog-authors
+select b.title, u.username from blogs b join users u on b.userid = u.userid;
+
+-- name: by-ids
+select * from blogs where blogid in (:*blogids);
+
+-- name: by-id-positional
+select * from blogs where blogid = ? and title <> '?';
+
+-- name: add-blog*!
+insert into blogs (userid, title, content) values (:userid, :title, :content);
+
+-- name: broken
+select * from nope;
+
+-- name: setup#
+create table t (a);
+"""
+
+
+@pytest.fixture()
+def queries():
+    return anosql.from_str(SQL, "sqlite3")
+
+
+def test_reports_full_scans_of_large_tables(sqlite3_conn, queries):
+    report = check_plans(queries, sqlite3_conn, min_table_rows=3)
+    assert report.large_scans == [("blog_authors", "blogs", 3), ("user_blogs", "blogs", 3)]
+    assert "user_blogs: full scan of blogs (3 rows)" in report.problems
+
+    assert check_plans(queries, sqlite3_conn, min_table_rows=4).large_scans == []
+
+    sqlite3_conn.execute("create index blogs_userid on blogs (userid)")
+    report = check_plans(queries, sqlite3_conn, min_table_rows=3)
+    assert report.large_scans == [("blog_authors", "blogs", 3)]
+
+
+def test_explains_without_running(sqlite3_conn, queries):
+    report = check_plans(queries, sqlite3_conn)
+    assert report.plans["by_ids"].lines == [
+        "SEARCH blogs USING INTEGER PRIMARY KEY (rowid=?)"
+    ]
+    assert report.plans["by_id_positional"].lines == [
+        "SEARCH blogs USING INTEGER PRIMARY KEY (rowid=?)"
+    ]
+    assert placeholder_parameters(queries.by_id_positional) == (None,)
+    assert report.plans["add_blog"].lines == []
+    assert "setup" not in report.plans
+    assert sqlite3_conn.execute("select count(*) from blogs").fetchone() == (3,)
+
+
+def test_reports_errors(sqlite3_conn, queries):
+    report = check_plans(queries, sqlite3_conn)
+    assert [query_name for query_name, _ in report.errors] == ["broken"]
+    assert report.problems == ["broken: could not be explained: no such table: nope"]
+
+
+def test_sample_parameters(sqlite3_conn, queries):
+    steps = explain_query(queries.by_ids, sqlite3_conn, {"blogids": [1, 2, 3]})
+    assert [step.table for step in steps] == ["blogs"]
+    assert not steps[0].full_scan
+
+
+def test_baseline_reports_plan_changes(sqlite3_conn, queries, tmpdir):
+    path = tmpdir.join("plans.json").strpath
+    save_baseline(check_plans(queries, sqlite3_conn).plans, path)
+    assert "broken" not in load_baseline(path)
+    assert check_plans(queries, sqlite3_conn, baseline=path).changed == []
+
+    sqlite3_conn.execute("create index blogs_userid on blogs (userid)")
+    report = check_plans(queries, sqlite3_conn, baseline=path)
+    assert report.changed == [(
+        "user_blogs",
+        ["SCAN blogs"],
+        ["SEARCH blogs USING INDEX blogs_userid (userid=?)"],
+    )]
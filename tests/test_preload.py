@@ -0,0 +1,63 @@
+import gc
+import os
+import sqlite3
+
+import pytest
+
+import anosql.preload
+
+SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql")
+
+
+@pytest.fixture()
+def queries():
+    queries = anosql.preload.preload(SQL_PATH, "sqlite3")
+    yield queries
+    if hasattr(gc, "unfreeze"):
+        gc.unfreeze()
+
+
+def test_preload_freezes_queries(queries):
+    assert queries.frozen
+    assert queries.users.frozen
+    with pytest.raises(AttributeError):
+        queries.add_query("extra", queries.users.get_all)
+    with pytest.raises(AttributeError):
+        queries.users.add_query("extra", queries.users.get_all)
+    with pytest.raises(AttributeError):
+        del queries.users
+    assert "users.get_all" in queries.available_queries
+
+
+def test_unfrozen_queries_can_change():
+    queries = anosql.from_path(SQL_PATH, "sqlite3")
+    assert not queries.frozen
+    queries.add_query("extra", queries.users.get_all)
+    assert "extra" in queries.available_queries
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_forked_workers_share_queries(queries, sqlite3_db_path):
+    read_fd, write_fd = os.pipe()
+    pids = []
+    for _ in range(2):
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                os.close(read_fd)
+                conn = sqlite3.connect(sqlite3_db_path)
+                usernames = [row[1] for row in queries.users.get_all(conn)]
+                os.write(write_fd, "{}\n".format(",".join(usernames)).encode())
+                status = 0
+            finally:
+                os._exit(status)
+        pids.append(pid)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as fp:
+        results = fp.read().splitlines()
+    statuses = [os.waitpid(pid, 0)[1] for pid in pids]
+
+    assert statuses == [0, 0]
+    assert results == ["bobsmith,johndoe,janedoe"] * 2
@@ -0,0 +1,110 @@
+import os
+from datetime import date
+
+import anosql
+import pytest
+from anosql.adapters.psycopg import copy_statement
+
+
+@pytest.fixture()
+def queries():
+    dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql")
+    return anosql.from_path(dir_path, "psycopg")
+
+
+@pytest.fixture()
+def psycopg_conn(pg_dsn):
+    psycopg = pytest.importorskip("psycopg")
+    with psycopg.connect(pg_dsn) as conn:
+        yield conn
+
+
+def test_copy_statement():
+    assert copy_statement(
+        "insert into blogs (userid, title)\nvalues (%(userid)s, %(title)s);"
+    ) == ("COPY blogs (userid, title) FROM STDIN", ("userid", "title"))
+    assert copy_statement("INSERT INTO t(a, b, c) VALUES (%s, %s, %s)") == (
+        "COPY t (a, b, c) FROM STDIN",
+        (0, 1, 2),
+    )
+
+
+def test_copy_statement_only_for_plain_inserts():
+    assert copy_statement("insert into t (a, b) values (%(a)s, now())") is None
+    assert copy_statement("insert into t (a) values (%(a)s) on conflict do nothing") is None
+    assert copy_statement("insert into t (a) values (%(a)s) returning a") is None
+    assert copy_statement("insert into t (a, b) values (%(a)s, %s)") is None
+    assert copy_statement("update t set a = %(a)s") is None
+
+
+def test_bulk_publish_is_copied(queries):
+    assert copy_statement(queries.blogs.pg_bulk_publish.sql) == (
+        "COPY blogs (userid, title, content, published) FROM STDIN",
+        ("userid", "title", "content", "published"),
+    )
+
+
+def test_parameterized_query(psycopg_conn, queries):
+    actual = queries.blogs.get_user_blogs(psycopg_conn, userid=1)
+    expected = [("How to make a pie.", date(2018, 11, 23)), ("What I did Today", date(2017, 7, 28))]
+    assert actual == expected
+
+
+def test_parameterized_record_query(psycopg_conn, queries):
+    from psycopg.rows import dict_row
+
+    psycopg_conn.row_factory = dict_row
+    actual = queries.blogs.pg_get_blogs_published_after(psycopg_conn, published=date(2018, 1, 1))
+    assert actual == [
+        {"title": "How to make a pie.", "username": "bobsmith", "published": "2018-11-23 00:00"},
+        {"title": "Testing", "username": "janedoe", "published": "2018-01-01 00:00"},
+    ]
+
+
+def test_select_cursor_context_manager(psycopg_conn, queries):
+    with queries.blogs.get_user_blogs_cursor(psycopg_conn, userid=1) as cursor:
+        assert cursor.fetchall() == [
+            ("How to make a pie.", date(2018, 11, 23)),
+            ("What I did Today", date(2017, 7, 28)),
+        ]
+
+
+def test_insert_returning(psycopg_conn, queries):
+    blogid, title = queries.blogs.pg_publish_blog(
+        psycopg_conn,
+        userid=2,
+        title="My first blog",
+        content="Hello, World!",
+        published=date(2018, 12, 4),
+    )
+    assert title == "My first blog"
+    assert queries.users.get_one(psycopg_conn, 2)[0] == "johndoe"
+    assert blogid > 3
+
+
+def test_delete(psycopg_conn, queries):
+    assert queries.blogs.remove_blog(psycopg_conn, blogid=2) is None
+    assert queries.blogs.get_user_blogs(psycopg_conn, userid=3) == []
+
+
+def test_insert_many_copies(psycopg_conn, queries):
+    blogs = [
+        {"userid": 2, "title": "Part 1", "content": "content - 1", "published": date(2018, 12, 4)},
+        {"userid": 2, "title": "Part 2", "content": "content - 2", "published": date(2018, 12, 5)},
+    ]
+    assert queries.blogs.pg_bulk_publish(psycopg_conn, blogs) is None
+    assert queries.blogs.get_user_blogs(psycopg_conn, userid=2) == [
+        ("Part 2", date(2018, 12, 5)),
+        ("Part 1", date(2018, 12, 4)),
+    ]
+
+
+def test_insert_many_executemany(psycopg_conn):
+    q = anosql.from_str(
+        "-- name: touch*!\nupdate users set lastname = lastname || :suffix where userid = :userid",
+        "psycopg",
+    )
+    q.touch(psycopg_conn, [{"userid": 1, "suffix": "!"}, {"userid": 2, "suffix": "?"}])
+    with psycopg_conn.cursor() as cur:
+        cur.execute("select lastname from users where userid in (1, 2) order by userid")
+        assert cur.fetchall() == [("Smith!",), ("Doe?",)]
@@ -121,3 +121,38 @@ def test_insert_many(pg_conn, queries):
             ("Blog Part 2", date(2018, 12, 5)),
             ("Blog Part 1", date(2018, 12, 4)),
         ]
+
+
+def test_statement_timeout(pg_conn):
+    queries = anosql.from_str(
+        "-- name: sleep\n-- @timeout: 50ms\nselect pg_sleep(:seconds);\n\n"
+        "-- name: get-timeout?\nselect current_setting('statement_timeout');",
+        "psycopg2",
+    )
+    queries.sleep(pg_conn, seconds=0)
+    assert queries.get_timeout(pg_conn) == ("0",)
+
+    with pytest.raises(psycopg2.extensions.QueryCanceledError):
+        queries.sleep(pg_conn, seconds=1)
+    pg_conn.rollback()
+    assert queries.get_timeout(pg_conn) == ("0",)
+
+
+def test_transient_errors():
+    class Error(Exception):
+        def __init__(self, pgcode):
+            self.pgcode = pgcode
+
+    class Connection(object):
+        def __init__(self, transaction_status):
+            self.info = type("Info", (object,), {"transaction_status": transaction_status})
+
+    adapter = anosql.core.get_driver_adapter("psycopg2")
+    idle, failed = Connection(psycopg2.extensions.TRANSACTION_STATUS_IDLE), Connection(
+        psycopg2.extensions.TRANSACTION_STATUS_INERROR
+    )
+    assert adapter.is_transient_error(idle, Error("40001"))
+    assert adapter.is_transient_error(idle, Error("40P01"))
+    assert not adapter.is_transient_error(idle, Error("23505"))
+    # Only the whole transaction can be run again, after a rollback.
+    assert not adapter.is_transient_error(failed, Error("40001"))
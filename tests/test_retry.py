@@ -0,0 +1,115 @@
+import sqlite3
+
+import anosql
+import pytest
+from anosql.core import QueryObserver, register_observer, unregister_observer
+from anosql.retry import RetryPolicy, retry_transaction
+
+SQL = """
+-- name: remove-blog!
+-- @idempotent
+delete from blogs where blogid = :blogid;
+
+-- name: publish-blog<!
+insert into blogs (userid, title, content) values (:userid, :title, 'Content');
+"""
+
+
+class ReleasingObserver(QueryObserver):
+    """Releases the lock held by another connection when a query is retried."""
+
+    def __init__(self, locking_conn):
+        self.locking_conn = locking_conn
+        self.retries = []
+
+    def retry(self, query, state, attempt, error, delay):
+        self.retries.append((query.name, attempt, str(error)))
+        self.locking_conn.rollback()
+
+
+@pytest.fixture()
+def locked(sqlite3_db_path):
+    locking_conn = sqlite3.connect(sqlite3_db_path)
+    locking_conn.execute("begin exclusive")
+    conn = sqlite3.connect(sqlite3_db_path, timeout=0)
+    yield locking_conn, conn
+    conn.close()
+    locking_conn.close()
+
+
+def test_idempotent_queries_are_retried(locked):
+    locking_conn, conn = locked
+    queries = anosql.from_str(SQL, "sqlite3")
+    queries.set_retry_policy(RetryPolicy(attempts=3, base_delay=0))
+    assert queries.remove_blog.retry_policy is not None
+    assert queries.publish_blog.retry_policy is None
+
+    observer = ReleasingObserver(locking_conn)
+    register_observer(observer)
+    try:
+        queries.remove_blog(conn, blogid=1)
+    finally:
+        unregister_observer(observer)
+    conn.commit()
+
+    assert observer.retries == [("remove_blog", 1, "database is locked")]
+    assert conn.execute("select count(*) from blogs").fetchone() == (2,)
+
+
+def test_retries_give_up(locked):
+    _, conn = locked
+    queries = anosql.from_str(SQL, "sqlite3")
+    queries.set_retry_policy(RetryPolicy(attempts=2, base_delay=0), idempotent_only=False)
+
+    with pytest.raises(sqlite3.OperationalError, match="database is locked"):
+        queries.publish_blog(conn, userid=1, title="Locked")
+
+
+def test_other_errors_are_not_retried(sqlite3_conn):
+    calls = []
+    policy = RetryPolicy(attempts=5, base_delay=0)
+
+    def fail():
+        calls.append(1)
+        raise sqlite3.IntegrityError("constraint failed")
+
+    adapter = anosql.core.get_driver_adapter("sqlite3")
+    with pytest.raises(sqlite3.IntegrityError):
+        policy.run(fail, lambda error: adapter.is_transient_error(sqlite3_conn, error))
+    assert calls == [1]
+
+
+def test_backoff_is_bounded():
+    policy = RetryPolicy(base_delay=0.1, max_delay=0.3, multiplier=2)
+    for attempt, bound in [(1, 0.1), (2, 0.2), (3, 0.3), (10, 0.3)]:
+        assert all(0 <= policy.backoff(attempt) <= bound for _ in range(50))
+
+
+def test_retry_transaction(sqlite3_db_path):
+    queries = anosql.from_str(SQL, "sqlite3")
+    conn = sqlite3.connect(sqlite3_db_path)
+    attempts = []
+
+    def transaction(conn):
+        attempts.append(1)
+        blogid = queries.publish_blog(conn, userid=1, title="Retried")
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return blogid
+
+    retries = []
+    blogid = retry_transaction(
+        conn,
+        transaction,
+        "sqlite3",
+        RetryPolicy(base_delay=0),
+        on_retry=lambda attempt, error, delay: retries.append(attempt),
+    )
+    conn.close()
+
+    assert retries == [1]
+    conn = sqlite3.connect(sqlite3_db_path)
+    assert conn.execute("select blogid from blogs where title = 'Retried'").fetchall() == [
+        (blogid,)
+    ]
+    conn.close()
@@ -0,0 +1,72 @@
+import os
+import shutil
+import sqlite3
+
+import anosql
+import pytest
+from anosql.routing import ReadWriteRouter
+
+
+@pytest.fixture()
+def queries():
+    dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql")
+    return anosql.from_path(dir_path, "sqlite3")
+
+
+@pytest.fixture()
+def connections(sqlite3_db_path, tmpdir):
+    replica_path = os.path.join(tmpdir.strpath, "replica.db")
+    shutil.copy(sqlite3_db_path, replica_path)
+    primary = sqlite3.connect(sqlite3_db_path)
+    replica = sqlite3.connect(replica_path)
+    yield primary, replica
+    primary.close()
+    replica.close()
+
+
+def test_reads_go_to_replicas(connections, queries):
+    primary, replica = connections
+    replica.execute("delete from blogs where userid = 1")
+    router = ReadWriteRouter(primary, [replica])
+
+    assert queries.blogs.get_user_blogs(router, userid=1) == []
+    with queries.blogs.get_user_blogs_cursor(router, userid=1) as cur:
+        assert cur.fetchall() == []
+    assert queries.users.get_all(router) == queries.users.get_all(replica)
+
+
+def test_writes_go_to_primary(connections, queries):
+    primary, replica = connections
+    router = ReadWriteRouter(primary, [replica])
+
+    with router:
+        queries.blogs.remove_blog(router, blogid=1)
+
+    assert len(queries.blogs.get_user_blogs(primary, userid=1)) == 1
+    assert len(queries.blogs.get_user_blogs(router, userid=1)) == 2
+
+
+def test_read_your_writes_window(connections, queries):
+    primary, replica = connections
+    router = ReadWriteRouter(primary, [replica], read_your_writes=60)
+
+    assert len(queries.blogs.get_user_blogs(router, userid=1)) == 2
+    queries.blogs.remove_blog(router, blogid=1)
+    router.commit()
+    assert len(queries.blogs.get_user_blogs(router, userid=1)) == 1
+
+
+def test_replicas_are_used_in_turn(connections, queries):
+    primary, replica = connections
+    used = []
+
+    class Recorder(ReadWriteRouter):
+        def route(self, query):
+            conn = super(Recorder, self).route(query)
+            used.append(conn)
+            return conn
+
+    router = Recorder(primary, [replica, primary])
+    for _ in range(4):
+        queries.users.get_all(router)
+    assert used == [replica, primary, replica, primary]
@@ -0,0 +1,106 @@
+import functools
+import operator
+import os
+import sqlite3
+
+import anosql
+import pytest
+from anosql.sharding import ShardedQueries, _merge
+
+SQL = """
+-- name: create-schema#
+create table users (userid integer primary key, username text not null);
+
+-- name: add-user!
+insert into users (userid, username) values (:userid, :username);
+
+-- name: get-user?
+select userid, username from users where userid = :userid;
+
+-- name: get-users
+select userid, username from users where userid >= :min_userid order by userid;
+
+-- name: get-users-desc
+select userid, username from users order by userid desc;
+"""
+
+
+@pytest.fixture()
+def queries():
+    return anosql.from_str(SQL, "sqlite3")
+
+
+@pytest.fixture()
+def sharded(tmpdir, queries):
+    shards = {}
+    for i in range(3):
+        path = os.path.join(tmpdir.strpath, "shard-{}.db".format(i))
+        conn = sqlite3.connect(path)
+        queries.create_schema(conn)
+        conn.close()
+        shards[i] = functools.partial(sqlite3.connect, path)
+
+    sharded = ShardedQueries(queries, shards, lambda params: params["userid"] % 3)
+    for userid in range(1, 21):
+        sharded.add_user(userid=userid, username="user{}".format(userid))
+    return sharded
+
+
+def test_routed_calls(sharded):
+    assert sharded.get_user(userid=7) == (7, "user7")
+    assert sharded.get_user.on(1, userid=7) == (7, "user7")
+    assert sharded.get_user.on(0, userid=7) is None
+
+
+def test_gather_unsorted(sharded):
+    rows = list(sharded.get_users.gather({"min_userid": 5}, batch_size=2))
+    assert sorted(rows) == [(i, "user{}".format(i)) for i in range(5, 21)]
+
+
+def test_gather_sorted_and_limited(sharded):
+    rows = list(sharded.get_users.gather({"min_userid": 0}, key=lambda row: row[0], limit=10))
+    assert rows == [(i, "user{}".format(i)) for i in range(1, 11)]
+
+    rows = list(sharded.get_users_desc.gather(key=lambda row: row[0], reverse=True, limit=3))
+    assert rows == [(20, "user20"), (19, "user19"), (18, "user18")]
+
+
+def test_merge():
+    shards = [[(1, "a"), (3, "a"), (3, "b")], [], [(0, "c"), (3, "c"), (9, "c")]]
+    key = operator.itemgetter(0)
+    assert list(_merge(shards, key)) == [
+        (0, "c"), (1, "a"), (3, "a"), (3, "b"), (3, "c"), (9, "c")
+    ]
+    assert list(_merge([list(reversed(rows)) for rows in shards], key, reverse=True)) == [
+        (9, "c"), (3, "b"), (3, "a"), (3, "c"), (1, "a"), (0, "c")
+    ]
+
+
+def test_gather_one_row_query(sharded):
+    assert list(sharded.get_user.gather({"userid": 4})) == [(4, "user4")]
+
+
+def test_gather_errors_are_raised(sharded):
+    with pytest.raises(anosql.SQLParameterException):
+        list(sharded.get_users.gather({"wrong": 0}))
+
+
+def test_gather_only_selects(sharded):
+    with pytest.raises(ValueError):
+        sharded.add_user.gather({"userid": 1, "username": "x"})
+
+
+def test_failed_write_rolls_back(sharded):
+    with pytest.raises(sqlite3.IntegrityError):
+        sharded.add_user(userid=3, username="again")
+    assert sharded.get_user(userid=3) == (3, "user3")
+
+
+def test_available_queries(sharded):
+    assert sharded.available_queries == [
+        "add_user",
+        "create_schema",
+        "get_user",
+        "get_users",
+        "get_users_desc",
+    ]
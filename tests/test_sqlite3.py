@@ -1,7 +1,11 @@
+import gc
 import os
+import sqlite3
+import weakref
 
 import anosql
 import pytest
+from anosql.adapters.sqlite3 import SQLite3DriverAdapter
 
 
 def dict_factory(cursor, row):
@@ -106,3 +110,32 @@ def test_insert_many(sqlite3_conn, queries):
             ("Blog Part 2", "2018-12-05"),
             ("Blog Part 1", "2018-12-04"),
         ]
+
+
+def test_reused_cursors(sqlite3_db_path):
+    class Connection(sqlite3.Connection):
+        pass
+
+    adapter = SQLite3DriverAdapter(reuse_cursors=True)
+    conn = sqlite3.connect(sqlite3_db_path, factory=Connection)
+    select = "select title from blogs where userid = :userid order by blogid"
+
+    assert adapter.select(conn, "q", select, {"userid": 1}) == [
+        ("What I did Today",), ("How to make a pie.",)
+    ]
+    cursor = adapter._cursor(conn)
+    conn.row_factory = dict_factory
+    assert adapter.select(conn, "q", select, {"userid": 3}) == [{"title": "Testing"}]
+    assert adapter._cursor(conn) is cursor
+    insert = "insert into blogs (userid, title, content) values (:userid, 'T', 'C')"
+    assert adapter.insert_returning(conn, "q", insert, {"userid": 2}) == 4
+
+    conn_ref = weakref.ref(conn)
+    del conn, cursor
+    gc.collect()
+    assert conn_ref() is None
+
+    # Plain sqlite3 connections, which don't take attributes, run on new cursors.
+    plain_conn = sqlite3.connect(sqlite3_db_path)
+    assert adapter.select(plain_conn, "q", select, {"userid": 3}) == [("Testing",)]
+    plain_conn.close()
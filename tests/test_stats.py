@@ -0,0 +1,82 @@
+import os
+
+import anosql
+import pytest
+from anosql.stats import StatsCollector, approximate_size
+
+
+@pytest.fixture()
+def queries():
+    dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql")
+    return anosql.from_path(dir_path, "sqlite3")
+
+
+@pytest.fixture()
+def collector():
+    collector = StatsCollector(row_buckets=(0, 1, 2), byte_buckets=(10, 100)).install()
+    yield collector
+    collector.uninstall()
+
+
+def test_approximate_size():
+    assert approximate_size(("abc", b"de", None, 42, 1.5)) == 3 + 2 + 0 + 8 + 8
+    assert approximate_size({"a": "xyz"}) == 3
+
+
+def test_records_select_queries(sqlite3_conn, queries, collector):
+    queries.blogs.get_user_blogs(sqlite3_conn, userid=1)
+    queries.blogs.get_user_blogs(sqlite3_conn, userid=3)
+    queries.blogs.get_user_blogs(sqlite3_conn, userid=42)
+    queries.blogs.remove_blog(sqlite3_conn, blogid=1)
+
+    stats = collector.as_dict()
+    assert list(stats) == ["get_user_blogs"]
+    blogs = stats["get_user_blogs"]
+    assert (blogs["calls"], blogs["rows"], blogs["max_rows"]) == (3, 3, 2)
+    assert blogs["bytes"] == len(
+        "How to make a pie.2018-11-23What I did Today2017-07-28Testing2018-01-01"
+    )
+    assert list(blogs["row_buckets"].items()) == [(0, 1), (1, 2), (2, 3), ("+Inf", 3)]
+    assert list(blogs["byte_buckets"].items()) == [(10, 1), (100, 3), ("+Inf", 3)]
+
+
+def test_records_rows_fetched_from_cursors(sqlite3_conn, queries, collector):
+    with queries.users.get_all_cursor(sqlite3_conn) as cur:
+        assert cur.fetchone()[1] == "bobsmith"
+        assert len(list(cur)) == 2
+        assert cur.description[0][0] == "userid"
+
+    stats = collector.as_dict()["get_all"]
+    assert (stats["calls"], stats["rows"], stats["max_rows"]) == (1, 3, 3)
+
+
+def test_records_dot_separated_names(sqlite3_conn, queries):
+    queries.add_child_queries("archive", anosql.from_str("-- name: get-all\nselect 1;", "sqlite3"))
+    collector = StatsCollector(queries=queries).install()
+    try:
+        queries.users.get_all(sqlite3_conn)
+        queries.archive.get_all(sqlite3_conn)
+    finally:
+        collector.uninstall()
+
+    stats = collector.as_dict()
+    assert sorted(stats) == ["archive.get_all", "users.get_all"]
+    assert (stats["users.get_all"]["calls"], stats["users.get_all"]["rows"]) == (1, 3)
+    assert (stats["archive.get_all"]["calls"], stats["archive.get_all"]["rows"]) == (1, 1)
+
+
+def test_uninstalled_collector_records_nothing(sqlite3_conn, queries):
+    collector = StatsCollector().install()
+    collector.uninstall()
+    queries.users.get_all(sqlite3_conn)
+    assert collector.as_dict() == {}
+
+
+def test_prometheus_format(sqlite3_conn, queries, collector):
+    queries.users.get_all(sqlite3_conn)
+    text = collector.to_prometheus()
+    assert "# TYPE anosql_query_rows histogram\n" in text
+    assert 'anosql_query_rows_bucket{query="get_all",le="2"} 0\n' in text
+    assert 'anosql_query_rows_bucket{query="get_all",le="+Inf"} 1\n' in text
+    assert 'anosql_query_rows_sum{query="get_all"} 3\n' in text
+    assert 'anosql_query_bytes_count{query="get_all"} 1\n' in text
@@ -0,0 +1,138 @@
+import functools
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import anosql
+from anosql.core import Queries
+from anosql.threadlocal import BoundQueries, ThreadLocalConnections
+
+SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql")
+THREADS = 8
+ITERATIONS = 50
+
+ADD_USER_SQL = """
+-- name: add-user!
+insert into users (username, firstname, lastname) values (:username, :firstname, :lastname);
+
+-- name: count-users?
+select count(*) from users;
+"""
+
+
+@pytest.fixture()
+def queries():
+    queries = anosql.from_path(SQL_PATH, "sqlite3")
+    return queries.merge(anosql.from_str(ADD_USER_SQL, "sqlite3"))
+
+
+def run_threads(target, count=THREADS):
+    errors = []
+    start = threading.Event()
+
+    def run(i):
+        start.wait()
+        try:
+            target(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def test_each_thread_gets_its_own_connection(queries, sqlite3_db_path):
+    bound = queries.bind(functools.partial(sqlite3.connect, sqlite3_db_path))
+    assert isinstance(bound, BoundQueries)
+    connections = {}
+
+    def run(i):
+        assert len(bound.users.get_all()) == 3
+        connections[i] = bound.connections.connection()
+        assert bound.connections.connection() is connections[i]
+        bound.release()
+
+    run_threads(run, 4)
+    assert len(set(map(id, connections.values()))) == 4
+    assert bound.connections._open == []
+
+
+def test_bound_methods(queries, sqlite3_db_path):
+    bound = queries.bind(functools.partial(sqlite3.connect, sqlite3_db_path))
+    assert len(bound.blogs.get_user_blogs(userid=1)) == 2
+    with bound.users.get_all_sorted.cursor() as cur:
+        assert len(cur.fetchall()) == 3
+    with bound.users.get_all_cursor() as cur:
+        assert len(cur.fetchall()) == 3
+    assert "users.get_all" in bound.available_queries
+    with pytest.raises(AttributeError):
+        bound.available
+    bound.close()
+
+
+def test_shared_connections(queries, sqlite3_db_path):
+    connections = ThreadLocalConnections(
+        functools.partial(sqlite3.connect, sqlite3_db_path, check_same_thread=False)
+    )
+    users = queries.users.bind(connections)
+    blogs = queries.blogs.bind(connections)
+    users.get_all()
+    blogs.get_user_blogs(userid=1)
+    assert len(connections._open) == 1
+
+    run_threads(lambda i: users.get_all(), 2)
+    assert len(connections._open) == 3
+    connections.close()
+    assert connections._open == []
+
+
+def test_concurrent_adds(queries):
+    shared = Queries()
+    query = queries.users.get_all
+
+    def run(i):
+        for j in range(200):
+            if i % 2:
+                shared.add_query("q_{}_{}".format(i, j), query)
+            else:
+                shared.available_queries
+
+    run_threads(run)
+    # Half the threads added 200 queries, each listed with its _cursor method.
+    assert len(shared.available_queries) == (THREADS // 2) * 200 * 2
+
+
+def test_stress(queries, sqlite3_db_path):
+    bound = queries.bind(functools.partial(sqlite3.connect, sqlite3_db_path, timeout=30))
+    shared = Queries()
+    query = queries.users.get_all
+
+    def run(i):
+        try:
+            for j in range(ITERATIONS):
+                bound.add_user(username="user-{}-{}".format(i, j), firstname="A", lastname="B")
+                bound.commit()
+                assert len(bound.users.get_all()) >= 3
+                shared.add_query("q_{}_{}".format(i, j), query)
+                shared.add_child_queries("c_{}_{}".format(i, j), Queries([("q", query)]))
+                shared.merge(Queries([("m_{}".format(j), query)]))
+                shared.available_queries
+        finally:
+            bound.release()
+
+    run_threads(run)
+
+    assert bound.count_users()[0] == 3 + THREADS * ITERATIONS
+    available = [name for name in shared.available_queries if not name.endswith("_cursor")]
+    assert len([name for name in available if name.startswith("q_")]) == THREADS * ITERATIONS
+    assert len([name for name in available if name.startswith("c_")]) == THREADS * ITERATIONS
+    assert len([name for name in available if name.startswith("m_")]) == ITERATIONS
+    bound.release()
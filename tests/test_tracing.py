@@ -0,0 +1,88 @@
+import os
+
+import anosql
+import pytest
+from anosql.stats import StatsCollector
+from anosql.tracing import InMemoryExporter, NoopExporter, TracingObserver
+
+BLOGS_SQL_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql", "blogs", "blogs.sql"
+)
+
+
+@pytest.fixture()
+def queries():
+    dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql")
+    return anosql.from_path(dir_path, "sqlite3")
+
+
+@pytest.fixture()
+def exporter():
+    exporter = InMemoryExporter()
+    observer = TracingObserver(exporter).install()
+    yield exporter
+    observer.uninstall()
+
+
+def test_spans(sqlite3_conn, queries, exporter):
+    queries.blogs.get_user_blogs(sqlite3_conn, userid=1)
+    queries.blogs.remove_blog(sqlite3_conn, blogid=3)
+    with pytest.raises(anosql.SQLParameterException):
+        queries.blogs.get_user_blogs(sqlite3_conn, userid=1, extra=2)
+    with pytest.raises(AttributeError):
+        queries.users.get_all(None)
+
+    get_user_blogs, remove_blog, get_all = exporter.spans
+    assert get_user_blogs.name == "get_user_blogs"
+    assert get_user_blogs.op_type == "select"
+    assert get_user_blogs.rows == 2
+    assert get_user_blogs.source.path == BLOGS_SQL_PATH
+    assert get_user_blogs.duration > 0
+    assert get_user_blogs.error is None
+    assert remove_blog.op_type == "insert_update_delete"
+    assert remove_blog.rows is None
+    # Invalid parameters raise before the query runs, so they leave no span.
+    assert get_all.name == "get_all"
+    assert isinstance(get_all.error, AttributeError)
+
+
+def test_cursor_spans_count_rows_per_observer(sqlite3_conn, queries, exporter):
+    collector = StatsCollector().install()
+    try:
+        with queries.blogs.get_user_blogs_cursor(sqlite3_conn, userid=1) as cur:
+            assert len(list(cur)) == 2
+    finally:
+        collector.uninstall()
+
+    (span,) = exporter.spans
+    assert (span.name, span.rows) == ("get_user_blogs", 2)
+    stats = collector.as_dict()["get_user_blogs"]
+    assert stats["rows"] == 2 and stats["bytes"] > 0
+
+
+def test_noop_exporter_is_not_installed():
+    observer = TracingObserver(NoopExporter()).install()
+    assert observer not in anosql.core._OBSERVERS
+
+
+def test_opentelemetry_exporter(sqlite3_conn, queries):
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from anosql.tracing import OpenTelemetryExporter
+
+    spans = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(spans))
+    observer = TracingObserver(OpenTelemetryExporter(provider.get_tracer("test"))).install()
+    try:
+        queries.blogs.get_user_blogs(sqlite3_conn, userid=1)
+    finally:
+        observer.uninstall()
+
+    (span,) = spans.get_finished_spans()
+    assert span.name == "get_user_blogs"
+    assert span.attributes["db.anosql.op_type"] == "select"
+    assert span.attributes["db.response.returned_rows"] == 2
+    assert span.attributes["code.filepath"] == BLOGS_SQL_PATH
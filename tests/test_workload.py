@@ -0,0 +1,110 @@
+import os
+import sqlite3
+
+import anosql
+import pytest
+from anosql.cli import main
+from anosql.workload import WorkloadRecorder, read_workload, replay
+
+SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blogdb", "sql")
+
+
+@pytest.fixture()
+def queries():
+    return anosql.from_path(SQL_PATH, "sqlite3")
+
+
+@pytest.fixture()
+def workload_path(tmpdir, sqlite3_conn, queries):
+    path = tmpdir.join("workload.jsonl").strpath
+    recorder = WorkloadRecorder(path, queries, redact=["content"]).install()
+    try:
+        queries.blogs.get_user_blogs(sqlite3_conn, userid=1)
+        with queries.blogs.get_user_blogs_cursor(sqlite3_conn, userid=3) as cur:
+            cur.fetchall()
+        queries.blogs.publish_blog(
+            sqlite3_conn, userid=2, title="Recorded", content="secret", published="2020-01-01"
+        )
+        with pytest.raises(sqlite3.ProgrammingError):
+            queries.blogs.sqlite_bulk_publish(sqlite3_conn, [(2, "Title", "Content")] * 2)
+        queries.blogs.sqlite_bulk_publish(sqlite3_conn, iter([]))
+        sqlite3_conn.commit()
+    finally:
+        recorder.uninstall()
+    return path
+
+
+def test_record(workload_path):
+    calls = list(read_workload(workload_path))
+    assert [call.name for call in calls] == [
+        "blogs.get_user_blogs",
+        "blogs.get_user_blogs_cursor",
+        "blogs.publish_blog",
+        "blogs.sqlite_bulk_publish",
+    ]
+    get_user_blogs, cursor, publish_blog, bulk_publish = calls
+    assert get_user_blogs.kwargs == {"userid": 1}
+    assert get_user_blogs.duration > 0 and get_user_blogs.error is None
+    assert cursor.kwargs == {"userid": 3}
+    assert publish_blog.kwargs["content"] == "xxxxxx"
+    assert publish_blog.kwargs["title"] == "Recorded"
+    assert bulk_publish.args == [[[2, "Title", "Content"]] * 2]
+    assert bulk_publish.error == "ProgrammingError"
+    assert get_user_blogs.timestamp <= cursor.timestamp <= publish_blog.timestamp
+
+
+def test_redact_positional_and_many(tmpdir, sqlite3_conn):
+    queries = anosql.from_str(
+        "-- name: add!\ninsert into accounts values (:name, :password);\n\n"
+        "-- name: add-many*!\ninsert into accounts values (:name, :password);\n\n"
+        "-- name: add-qmark!\ninsert into accounts values (?, ?);\n",
+        "sqlite3",
+    )
+    sqlite3_conn.execute("create table accounts (name text, password text)")
+    path = tmpdir.join("workload.jsonl").strpath
+    recorder = WorkloadRecorder(path, redact=["password"]).install()
+    try:
+        queries.add(sqlite3_conn, "a", "secret1")
+        queries.add_many(sqlite3_conn, [{"name": "b", "password": "secret2"}, ("c", "secret3")])
+        queries.add_qmark(sqlite3_conn, "d", "public")
+    finally:
+        recorder.uninstall()
+
+    with open(path) as fp:
+        assert "secret" not in fp.read()
+    add, add_many, add_qmark = read_workload(path)
+    assert add.args == ["a", "xxxxxxx"]
+    assert add_many.args == [[{"name": "b", "password": "xxxxxxx"}, ["c", "xxxxxxx"]]]
+    # Without named parameters, positional values can't be matched to names.
+    assert add_qmark.args == ["d", "public"]
+
+
+def test_replay(workload_path, sqlite3_db_path, queries):
+    report = replay(
+        workload_path, queries, lambda: sqlite3.connect(sqlite3_db_path), concurrency=2, speed=0
+    )
+    assert report.calls == 4
+    assert report.queries["blogs.get_user_blogs"]["count"] == 1
+    assert report.queries["blogs.get_user_blogs_cursor"]["errors"] == 0
+    assert report.queries["blogs.sqlite_bulk_publish"]["errors"] == 1
+    assert report.errors == 1
+    assert report.throughput > 0
+
+    conn = sqlite3.connect(sqlite3_db_path)
+    assert conn.execute("select count(*) from blogs where title = 'Recorded'").fetchone() == (2,)
+    conn.close()
+
+
+def test_replay_unknown_query(tmpdir, sqlite3_db_path, queries):
+    path = tmpdir.join("workload.jsonl")
+    path.write('[1.0,0.001,"blogs.missing",[],{}]\n')
+    with pytest.raises(LookupError):
+        replay(path.strpath, queries, lambda: sqlite3.connect(sqlite3_db_path))
+
+
+def test_cli_replay(workload_path, sqlite3_db_path, capsys):
+    args = ["replay", SQL_PATH, workload_path, "--sqlite", sqlite3_db_path, "--speed", "0"]
+    assert main(args) == 0
+    out = capsys.readouterr()[0].splitlines()
+    assert out[0].startswith("4 calls in ")
+    assert any(line.startswith("blogs.publish_blog ") for line in out)